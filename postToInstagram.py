@@ -1,7 +1,15 @@
 import os
+import sys
 import json
-import requests
-from dotenv import load_dotenv
+import time
+import threading
+import traceback
+from datetime import datetime
+from dotenv import load_dotenv, dotenv_values
+from pxlProjectStore import ProjectStore, is_project_db, post_doc, write_text_atomic
+from pxlGraphApi import GraphClient, GraphApiError, is_video, is_not_ready, make_session
+from pxlPublishScheduler import PublishScheduler, ContainerPoller, Pending, ScheduleIndex, parse_scheduled_time
+from pxlPostingLedger import PostingLedger, ledger_path_for
 
 # Load variables from .env
 load_dotenv()
@@ -9,172 +17,660 @@ load_dotenv()
 
 # === CONFIG ===
 ACCESS_TOKEN = os.getenv("ACCESS_TOKEN")
-INSTAGRAM_ACCOUNT_ID = os.getenv("INSTAGRAM_ACCOUNT_ID")  # the IG Business/account id
-JSON_FILE = "projectDataStruct.json"
-POSTED_DIR = "posted"
-
-# Instagram Graph API base
-GRAPH_API_URL = "https://graph.facebook.com/v21.0"
+# the IG Business/account id; IG_USER_ID in .env_base, INSTAGRAM_ACCOUNT_ID in older .env files
+INSTAGRAM_ACCOUNT_ID = os.getenv("IG_USER_ID") or os.getenv("INSTAGRAM_ACCOUNT_ID")
+JSON_FILE = os.getenv("JSON_FILE", "projectDataStruct.json")
+POSTED_DIR = os.getenv("POSTED_DIR", "posted")
+
+# Instagram Graph API base; can point at a local stand-in server for testing
+GRAPH_API_URL = os.getenv("GRAPH_API_URL", "https://graph.facebook.com/v21.0")
+# carousel children created at once, per account
+GRAPH_MAX_WORKERS = int(os.getenv("GRAPH_MAX_WORKERS", "4"))
+# Instagram's content publishing limit; the account's real usage is read from the API when it answers
+PUBLISH_LIMIT = int(os.getenv("PUBLISH_LIMIT", "25"))
+# daemon mode ( python postToInstagram.py --daemon [project] )
+DAEMON_WATCH_INTERVAL = float(os.getenv("DAEMON_WATCH_INTERVAL", "10"))  # seconds between checks of the project file
+MISSED_GRACE_MINUTES = float(os.getenv("MISSED_GRACE_MINUTES", "60"))  # later than this, a scheduled post was missed
+MISSED_SCHEDULE = os.getenv("MISSED_SCHEDULE", "post").lower()  # missed posts are "post"ed late or "skip"ped
+# batch mode ( --batch ): containers for every due post are made up front in Graph API batch requests
+GRAPH_BATCH = os.getenv("GRAPH_BATCH", "").lower() in ("1", "true", "yes")
+
+USAGE = """Usage: python postToInstagram.py [--daemon] [--batch] [project]
+       python postToInstagram.py [--daemon] [--batch] --accounts <account .env> [<account .env> ...]
+
+  --batch makes the containers of every due post in Graph API batch requests, up to 50
+  calls per request, instead of one request each. Or set GRAPH_BATCH=1.
+
+  Each account .env is laid out like .env_base ( ACCESS_TOKEN, IG_USER_ID, JSON_FILE, POSTED_DIR ),
+  with paths relative to the .env file. All accounts publish at once, each on its own budget."""
 
 
 def load_json(path=JSON_FILE):
     if not os.path.exists(path):
         raise FileNotFoundError(f"JSON file not found: {path}")
+    if is_project_db(path):
+        # SQLite project from pxlPostPrepper; same post dicts as the json file
+        store = ProjectStore(path)
+        try:
+            return store.load_posts()
+        finally:
+            store.close()
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
 
 
+def load_docs(path):
+    """Each post's json text, without parsing the posts of a SQLite project."""
+    if is_project_db(path):
+        store = ProjectStore(path)
+        try:
+            return [doc for batch in store.iter_docs() for doc in batch], True
+        finally:
+            store.close()
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return [post_doc(p) for p in (data if isinstance(data, list) else [data])], isinstance(data, list)
+
+
 def save_json(path, data):
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+    if is_project_db(path):
+        # only the posts that changed ( ie were just marked posted ) are rewritten
+        store = ProjectStore(path)
+        try:
+            store.save_post_dicts(data if isinstance(data, list) else [data])
+        finally:
+            store.close()
+        return
+    write_text_atomic(path, json.dumps(data, indent=2))
 
 
-def create_media_container(account_id, media):
+class Account:
     """
-    Create a media container for a single image or video.
-    Uses public URLs (media['URL']). The Graph API requires media to be reachable.
+    One Instagram account: its credentials, project file, Graph API client and posting ledger.
 
-    Returns container id string on success, otherwise None.
+    Accounts publishing from one process share a requests session ( and its connection pool );
+    rate limit state, publishing budget and ledger are each account's own.
     """
-    if not media.get("URL"):
-        print("Skipping media without public URL:", media.get("file_path"))
-        return None
-
-    url = f"{GRAPH_API_URL}/{account_id}/media"
-    payload = {"access_token": ACCESS_TOKEN}
-
-    mtype = media.get("type", "image").lower()
-    if mtype == "image":
-        payload["image_url"] = media["URL"]
-    elif mtype == "video":
-        payload["video_url"] = media["URL"]
-    else:
-        print("Unsupported media type:", mtype)
-        return None
 
-    # Per-child caption/description (note: Graph API historically prefers a single caption on the parent for carousels)
-    if media.get("description"):
-        payload["caption"] = media["description"]
+    def __init__(self, account_id, access_token, project_path=JSON_FILE, posted_dir=POSTED_DIR,
+                 name=None, publish_limit=PUBLISH_LIMIT, session=None, batch=GRAPH_BATCH):
+        if not account_id or not access_token:
+            raise RuntimeError(f"Missing IG_USER_ID or ACCESS_TOKEN{f' for {name}' if name else ' in environment'}")
+        self.account_id = account_id
+        self.project_path = project_path
+        self.posted_dir = posted_dir
+        self.name = name or account_id
+        self.publish_limit = publish_limit
+        self.batch = batch
+        # prefix output with the account when several publish at once
+        self.log = (lambda text: print(f"[{name}] {text}")) if name else print
+        self.client = GraphClient(access_token, GRAPH_API_URL, max_workers=GRAPH_MAX_WORKERS,
+                                  log=self.log, session=session)
+        self.ledger = None
+        self.scheduler = None
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def from_env_file(cls, env_path, session=None):
+        """An account from a .env laid out like .env_base; relative paths are from its folder."""
+        values = dotenv_values(env_path)
+        base = os.path.dirname(os.path.abspath(env_path))
+        name = values.get("ACCOUNT_NAME") or os.path.basename(env_path)
+        if name.startswith(".env") and len(name) > 5:
+            name = name[5:]  # .env.frayedfables -> frayedfables
+        elif name.endswith(".env") and len(name) > 4:
+            name = name[:-4]  # frayedfables.env -> frayedfables
+        project = values.get("JSON_FILE") or JSON_FILE
+        posted = values.get("POSTED_DIR") or POSTED_DIR
+        return cls(values.get("IG_USER_ID") or values.get("INSTAGRAM_ACCOUNT_ID"), values.get("ACCESS_TOKEN"),
+                   os.path.join(base, project), os.path.join(base, posted), name=name,
+                   publish_limit=int(values.get("PUBLISH_LIMIT") or PUBLISH_LIMIT), session=session)
+
+    def use_ledger(self):
+        """Record containers and publishes in the project's posting ledger, so an
+        interrupted run resumes where it stopped ( see pxlPostingLedger )."""
+        self.ledger = PostingLedger(ledger_path_for(self.project_path))
+        self.client.containers = self.ledger
+        return self.ledger
+
+    def stop(self):
+        if self.scheduler is not None:
+            self.scheduler.stop()
+
+
+_default_account = None
+
+
+def default_account():
+    # the account from .env, for single account runs
+    global _default_account
+    if _default_account is None:
+        _default_account = Account(INSTAGRAM_ACCOUNT_ID, ACCESS_TOKEN)
+    return _default_account
+
+
+def get_client():
+    # one pooled client for the whole run
+    return default_account().client
 
-    # Accessibility / alt text
-    if media.get("alt_text"):
-        # Graph API param name: accessibility_caption (some SDKs/versions accept 'accessibility_caption')
-        payload["accessibility_caption"] = media["alt_text"]
 
-    # User tags (Graph API expects user ids; here we pass a best-effort JSON string and note requirements)
-    if media.get("user_tags"):
-        # expected format: {"in": [{"user_id": "<id>", "x": 0.5, "y": 0.5}, ...]}
-        # Caller currently may provide username; mapping to user_id is required before posting.
-        try:
-            payload["user_tags"] = json.dumps({"in": media["user_tags"]})
-        except Exception:
-            pass
-
-    # Location id (if present)
-    if media.get("location") and media["location"].get("id"):
-        payload["location_id"] = media["location"]["id"]
+def create_media_container(account_id, media):
+    """
+    Create a media container for a single image or video.
+    Uses public URLs (media['URL']). The Graph API requires media to be reachable.
 
-    resp = requests.post(url, data=payload)
-    result = resp.json()
-    print("create_media_container ->", result)
-    return result.get("id")
+    Returns container id string on success, otherwise None.
+    """
+    return get_client().create_media_container(account_id, media)
 
 
 def create_carousel(account_id, post):
     """
     For carousels: create child containers first, then create a parent container with children list, then publish.
+    Children are created concurrently.
     """
-    children = []
-    for media in post.get("media", []):
-        cid = create_media_container(account_id, media)
-        if cid:
-            children.append(cid)
-
-    if not children:
-        print("No valid children created for carousel")
-        return None
-
-    # Parent container
-    create_url = f"{GRAPH_API_URL}/{account_id}/media"
-    payload = {
-        "access_token": ACCESS_TOKEN,
-        "children": ",".join(children)
-    }
-    if post.get("caption"):
-        payload["caption"] = post["caption"]
-
-    resp = requests.post(create_url, data=payload)
-    result = resp.json()
-    print("create_carousel ->", result)
-    return result.get("id")
+    return get_client().create_carousel(account_id, post)
 
 
 def publish_container(account_id, creation_id):
-    url = f"{GRAPH_API_URL}/{account_id}/media_publish"
-    payload = {"creation_id": creation_id, "access_token": ACCESS_TOKEN}
-    resp = requests.post(url, data=payload)
-    print("publish_container ->", resp.json())
-    return resp.json()
-
+    return get_client().publish_container(account_id, creation_id)
+
+
+def _video_seconds(media_list):
+    # longest probed video duration, to pace the first status check
+    return max([(m.get("metadata") or {}).get("duration") or 0 for m in media_list if is_video(m)] or [0])
+
+
+def publish_when_ready(account, creation_id, key=None):
+    client, account_id = account.client, account.account_id
+    ledger = account.ledger if key is not None else None
+    if ledger is not None:
+        prior = ledger.container_result(account_id, creation_id)
+        if prior:
+            return prior
+        if ledger.attempted(account_id, creation_id):
+            # an earlier run started this publish and never saw the answer; don't repeat it blindly
+            code, text = client.container_status([creation_id]).get(creation_id, (None, ""))
+            if code == "PUBLISHED":
+                result = {"id": creation_id}
+                ledger.record_result(account_id, key, creation_id, result)
+                account.log(f"Publish from an earlier run went through; container {creation_id}")
+                return result
+            if code == "IN_PROGRESS":
+                return Pending([creation_id], lambda: publish_when_ready(account, creation_id, key))
+            if code in ("ERROR", "EXPIRED"):
+                # never published; the next run makes a fresh container
+                result = {"error": {"message": f"Container {creation_id} {code.lower()} {text}".strip()}}
+                ledger.record_result(account_id, key, creation_id, result, resolved=True)
+                return result
+            if code != "FINISHED":
+                return {"error": {"message": f"Container {creation_id} was being published when a run stopped "
+                                             "and its state can't be read; check the account before retrying"}}
+        ledger.publishing(account_id, key, creation_id)
+    result = client.publish_container(account_id, creation_id)
+    if is_not_ready(result):
+        # still processing; publish once its status is FINISHED
+        return Pending([creation_id], lambda: publish_when_ready(account, creation_id, key))
+    if ledger is not None:
+        ledger.record_result(account_id, key, creation_id, result)
+    return result
+
+
+def process_post(post, account=None):
+    """
+    Create the post's containers and publish it, on account ( the .env account by default ).
 
-def process_post(post):
+    Returns the publish result, None if no container could be made, or a Pending
+    while video containers process; the scheduler resumes it once they're FINISHED.
+    """
     kind = post.get("post_kind", post.get("type", "single")).lower()
-    account_id = INSTAGRAM_ACCOUNT_ID
-    if not account_id or not ACCESS_TOKEN:
-        raise RuntimeError("Missing INSTAGRAM_ACCOUNT_ID or ACCESS_TOKEN in environment")
+    account = account or default_account()
+    client, account_id, ledger, log = account.client, account.account_id, account.ledger, account.log
+    media = post.get("media", [])
+    key = post_key(post)
+    if ledger is not None:
+        prior = ledger.post_result(account_id, key)
+        if prior:
+            # published by a run that stopped before saving the project
+            log(f"Already published ( posting ledger ), id= {prior.get('id')}")
+            return prior
+        attempt = ledger.attempt_for(account_id, key)
+        if attempt:
+            # settle a publish an earlier run never saw the answer to before making anything new
+            return publish_when_ready(account, attempt, key)
 
     if kind == "carousel":
-        creation_id = create_carousel(account_id, post)
+        children = client.create_children(account_id, media)
+        ids = [cid for cid in children if cid]
+        if not ids:
+            log("No valid children created for carousel")
+            return None
+
+        def finish():
+            # children are ready; the parent still processes briefly when it holds videos
+            creation_id = client.create_carousel_parent(account_id, post, ids)
+            if not creation_id:
+                log("No creation id obtained; aborting publish")
+                return None
+            return publish_when_ready(account, creation_id, key)
+
+        # video children must be FINISHED before the parent container can be made
+        videos = [cid for cid, m in zip(children, media) if cid and is_video(m)]
+        if videos:
+            return Pending(videos, finish, _video_seconds(media))
+        return finish()
     elif kind in ("single", "image", "video"):
         # single media expected in media[0]
-        media = post.get("media", [])
         if not media:
-            print("No media found for single post")
+            log("No media found for single post")
             return None
-        creation_id = create_media_container(account_id, media[0])
+        creation_id = client.create_media_container(account_id, media[0])
     else:
-        print("Unsupported post kind:", kind)
+        log(f"Unsupported post kind: {kind}")
         return None
 
     if not creation_id:
-        print("No creation id obtained; aborting publish")
+        log("No creation id obtained; aborting publish")
         return None
 
-    return publish_container(account_id, creation_id)
+    if is_video(media[0]):
+        return Pending([creation_id], lambda: publish_when_ready(account, creation_id, key), _video_seconds(media[:1]))
+    return publish_when_ready(account, creation_id, key)
+
+
+def prepare_containers(account, posts):
+    """
+    Batch mode: make the containers posts will ask for, grouped into batch requests.
+
+    Carousel children and single media of every post go in the first batches, then the
+    parents of carousels without videos ( video children must finish processing first ).
+    process_post then picks each result up without a request of its own; a media's
+    error is logged against it here and again when its post is published.
+    """
+    client, account_id, ledger = account.client, account.account_id, account.ledger
+    before = (client.api_calls, client.round_trips)
+    singles, carousels = [], []
+    for post in posts:
+        key = post_key(post)
+        if ledger is not None and (ledger.post_result(account_id, key) or ledger.attempt_for(account_id, key)):
+            continue  # process_post settles these without new containers
+        kind = post.get("post_kind", post.get("type", "single")).lower()
+        media = post.get("media", []) or []
+        name = _describe(post)[:40]
+        if kind == "carousel":
+            items = [(client.media_container_payload(m, carousel_item=True), f"{name} : media {i + 1}")
+                     for i, m in enumerate(media)]
+            carousels.append((post, [item for item in items if item[0] is not None]))
+        elif kind in ("single", "image", "video") and media:
+            payload = client.media_container_payload(media[0])
+            if payload is not None:
+                singles.append((payload, f"{name} : media 1"))
+    children = [item for _, items in carousels for item in items]
+    if not children and not singles:
+        return
+    try:
+        ids = client.create_containers(account_id, children + singles)
+        parents = []
+        n = 0
+        for post, items in carousels:
+            child_ids = [cid for cid in ids[n:n + len(items)] if cid]
+            n += len(items)
+            if child_ids and not any(is_video(m) for m in post.get("media", []) or []):
+                parents.append((client.carousel_parent_payload(post, child_ids), f"{_describe(post)[:40]} : carousel"))
+        if parents:
+            client.create_containers(account_id, parents)
+    except GraphApiError as e:
+        # whatever wasn't made is made one request at a time when its post publishes
+        account.log(f"Batch container creation stopped: {e}")
+    calls, trips = client.api_calls - before[0], client.round_trips - before[1]
+    account.log(f"Batch mode: {calls} container calls in {trips} requests ( {calls - trips} round trips saved )")
+
+
+def mark_posted(data, post, result, path=JSON_FILE, posted_dir=POSTED_DIR, log=print, save=True):
+    """save=False leaves writing the project to the caller; the posting ledger already
+    holds the publish, so a run that stops before saving still won't post it again."""
+    post["posted"] = True
+    if save:
+        save_json(path, data)
+
+    # Move local files if present (best-effort)
+    os.makedirs(posted_dir, exist_ok=True)
+    for m in post.get("media", []):
+        fp = m.get("file_path")
+        # files in pxlPostPrepper's media store stay there; other posts may share them
+        if m.get("media_hash"):
+            continue
+        if fp and os.path.exists(fp):
+            try:
+                dest = os.path.join(posted_dir, os.path.basename(fp))
+                os.replace(fp, dest)
+            except Exception:
+                pass
+
+    log(f"Post published, id= {result.get('id')}")
 
 
-def main():
-    data = load_json()
+def post_priority(index, post):
+    # scheduled posts first, earliest first; then project order
+    scheduled = post.get("scheduled_time") or ""
+    return (0 if scheduled else 1, scheduled, index)
+
+
+def post_key(post):
+    """A post's identity across edits, for the posting ledger and the daemon.
+
+    pxlPostPrepper gives every post a local_data.post_id; older projects fall back to the
+    post kind and caption along with its media, so the same media posted again is still a new post.
+    """
+    post_id = (post.get("local_data") or {}).get("post_id")
+    if post_id:
+        return ("post_id", post_id)
+    media = tuple(m.get("media_hash") or m.get("file_path") or m.get("URL") or "" for m in post.get("media", []) or [])
+    return (post.get("post_kind", post.get("type", "single")).lower(), post.get("caption") or "") + media
+
+
+def schedule_action(post, now=None):
+    """
+    What to do with an unposted post given its scheduled_time, and the due time:
+    "now" ( unscheduled or due ), "wait", "late" ( missed, post anyway ) or "skip" ( missed ).
+    """
+    due = parse_scheduled_time(post.get("scheduled_time"))
+    now = time.time() if now is None else now
+    if due is None:
+        return "now", None
+    if due > now:
+        return "wait", due
+    if now - due > MISSED_GRACE_MINUTES * 60:
+        return ("skip" if MISSED_SCHEDULE == "skip" else "late"), due
+    return "now", due
+
+
+def _describe(post):
+    return post.get("caption") or post.get("title") or "(no caption)"
+
+
+def _when(due):
+    return datetime.fromtimestamp(due).strftime("%Y-%m-%d %H:%M")
+
+
+def _publish(post, account):
+    account.log(f"Posting: {_describe(post)}")
+    return process_post(post, account)
+
+
+def make_scheduler(account, done):
+    scheduler = PublishScheduler(_publish, done, limit=account.publish_limit, log=account.log,
+                                 poller=ContainerPoller(account.client, log=account.log))
+    try:
+        quota = account.client.publishing_limit(account.account_id)
+    except GraphApiError as e:
+        quota = None
+        account.log(f"Couldn't read the publishing limit: {e}")
+    if quota:
+        used, total, window = quota
+        scheduler.seed(account, used, total, window)
+        account.log(f"Publishing limit: {used} of {total or account.publish_limit} used")
+    account.scheduler = scheduler
+    return scheduler
+
+
+def publish_project(account):
+    """Publish every unposted post of the account's project that's due, then return."""
+    data = load_json(account.project_path)
 
     # minimal contract: data is a single post object OR a list of posts
     posts = data if isinstance(data, list) else [data]
+    published = []
 
-    for post in posts:
+    def done(post, result):
+        if result and result.get("id"):
+            # the project is written once at the end; the ledger covers a run that dies first
+            mark_posted(data, post, result, account.project_path, account.posted_dir, account.log, save=False)
+            published.append(post)
+        else:
+            account.log(f"Failed to publish post: {result}")
+
+    scheduler = make_scheduler(account, done)
+
+    later = 0
+    queued = []
+    for i, post in enumerate(posts):
         if post.get("posted"):
             continue
+        action, due = schedule_action(post)
+        if action == "wait":
+            later += 1
+            continue
+        if action == "skip":
+            account.log(f"Skipping post scheduled for {_when(due)}; missed by more than {MISSED_GRACE_MINUTES:.0f} min : {_describe(post)}")
+            continue
+        scheduler.add(post, account, post_priority(i, post))
+        queued.append((post_priority(i, post), post))
+    if later:
+        account.log(f"{later} posts are scheduled for later; run with --daemon to post them on time")
+    if account.batch and queued:
+        # only as many posts as the publishing limit lets out now; containers expire in 24 hours
+        queued.sort(key=lambda q: q[0])
+        prepare_containers(account, [post for _, post in queued[:scheduler.bucket(account).available()]])
+
+    try:
+        scheduler.run()
+    finally:
+        account.client.clear_prepared()
+        if published:
+            save_json(account.project_path, data)
+    if scheduler.stopped():
+        account.log(f"Stopped; {len(scheduler)} posts still queued, {len(scheduler.poller)} containers processing")
+    client = account.client
+    account.log(f"Graph API: {client.api_calls} calls in {client.round_trips} requests")
+
+
+class PostingDaemon:
+    """
+    Publishes posts at their scheduled_time until stopped ( Ctrl+C ).
 
-        print("Posting:", post.get("caption") or post.get("title") or "(no caption)")
-        result = process_post(post)
+    Unposted posts wait in a ScheduleIndex heap and the loop sleeps until the next one
+    is due, waking every DAEMON_WATCH_INTERVAL only to stat the project file.
+    When the file changes, only the posts whose json changed are re-indexed.
+    """
 
-        if result and result.get("id"):
-            post["posted"] = True
-            save_json(JSON_FILE, data)
-
-            # Move local files if present (best-effort)
-            os.makedirs(POSTED_DIR, exist_ok=True)
-            for m in post.get("media", []):
-                fp = m.get("file_path")
-                if fp and os.path.exists(fp):
-                    try:
-                        dest = os.path.join(POSTED_DIR, os.path.basename(fp))
-                        os.replace(fp, dest)
-                    except Exception:
-                        pass
-
-            print("Post published, id=", result.get("id"))
-        else:
-            print("Failed to publish post:", result)
+    def __init__(self, account):
+        self.account = account
+        self.path = account.project_path
+        self.log = account.log
+        self.posts = []
+        self.is_list = True
+        self.docs = {}  # id(post) -> its json when loaded, to spot changed posts
+        self.stamp = None
+        self.index = ScheduleIndex()
+        self.in_flight = {}  # post_key -> post handed to the scheduler
+        self.queued = []  # posts handed to the scheduler since the last batch, in batch mode
+        self.scheduler = make_scheduler(account, self._done)
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def reload(self):
+        stamp = self._file_stamp()
+        if stamp is None or stamp == self.stamp:
+            return
+        try:
+            docs, self.is_list = load_docs(self.path)
+        except (OSError, ValueError) as e:
+            # likely caught mid-save; try again on the next check
+            self.log(f"Couldn't read project: {e}")
+            return
+        self.stamp = stamp
+        unchanged = {}
+        for post in self.posts:
+            unchanged.setdefault(self.docs[id(post)], []).append(post)
+        posts = []
+        changed = []
+        for doc in docs:
+            same = unchanged.get(doc)
+            if same:
+                post = same.pop()
+            else:
+                post = json.loads(doc)
+                changed.append(post)
+            posts.append(post)
+        for gone in unchanged.values():
+            for post in gone:
+                self.index.discard(post)
+        self.posts = posts
+        self.docs = {id(p): doc for p, doc in zip(posts, docs)}
+        for post in changed:
+            self._schedule(post)
+        if changed:
+            nxt = self.index.next_due()
+            self.log(f"Loaded {len(changed)} new or changed posts; {len(self.index)} scheduled"
+                     + (f", next at {_when(nxt)}" if nxt else ""))
+
+    def _schedule(self, post):
+        if post.get("posted") or post_key(post) in self.in_flight:
+            return
+        action, due = schedule_action(post)
+        if action == "wait":
+            self.index.add(post, due)
+            return
+        self.index.discard(post)
+        if action == "skip":
+            self.log(f"Skipping post scheduled for {_when(due)}; missed by more than {MISSED_GRACE_MINUTES:.0f} min : {_describe(post)}")
+            return
+        if action == "late":
+            self.log(f"Post scheduled for {_when(due)} was missed; posting now : {_describe(post)}")
+        self.in_flight[post_key(post)] = post
+        self.scheduler.add(post, self.account, (due or 0,))
+        if self.account.batch:
+            self.queued.append(post)
+
+    def _done(self, post, result):
+        if not (result and result.get("id")):
+            self.in_flight.pop(post_key(post), None)
+            self.log(f"Failed to publish post: {result}")
+            return
+        # pick up edits made while it was publishing before writing the file back
+        self.reload()
+        target = post if id(post) in self.docs else None
+        if target is None:
+            # edited meanwhile; the reloaded copy is the same post if it has the same post_key
+            target = next((p for p in self.posts if not p.get("posted") and post_key(p) == post_key(post)), None)
+        self.in_flight.pop(post_key(post), None)
+        if target is None:
+            self.log(f"Published post is no longer in the project; nothing to mark, id= {result.get('id')}")
+            return
+        self.index.discard(target)
+        mark_posted(self.posts if self.is_list else self.posts[0], target, result, self.path,
+                    self.account.posted_dir, self.log)
+        self.docs[id(target)] = post_doc(target)
+        self.stamp = self._file_stamp()
+
+    def run(self):
+        self.reload()
+        self.log(f"Watching {self.path}")
+        while not self.scheduler.stopped():
+            for _, post in self.index.pop_due(time.time()):
+                self._schedule(post)
+            if self.queued:
+                prepare_containers(self.account, self.queued[:self.scheduler.bucket(self.account).available()])
+                self.queued = []
+            wait = DAEMON_WATCH_INTERVAL
+            nxt = self.index.next_due()
+            if nxt is not None:
+                wait = min(wait, max(0.0, nxt - time.time()))
+            self.scheduler.run(until=time.monotonic() + wait)
+            self.account.client.clear_prepared()
+            self.reload()
+        self.log(f"Stopped; {len(self.index)} posts scheduled, {len(self.in_flight)} were publishing")
+
+
+def run_account(account, daemon=False):
+    if not os.path.exists(account.project_path):
+        raise FileNotFoundError(f"JSON file not found: {account.project_path}")
+    account.use_ledger()
+    if daemon:
+        PostingDaemon(account).run()
+    else:
+        publish_project(account)
+
+
+def run_accounts(accounts, daemon=False):
+    """
+    Publish several accounts at once, one thread each.
+    A failure in one account is reported and leaves the others running.
+    """
+    failed = {}
+
+    def work(account):
+        try:
+            run_account(account, daemon)
+        except Exception as e:
+            failed[account.name] = e
+            account.log(f"Account stopped : {e!r}")
+            traceback.print_exc()
+
+    threads = [threading.Thread(target=work, args=(a,), name=f"publish-{a.name}", daemon=True) for a in accounts]
+    for t in threads:
+        t.start()
+    try:
+        for t in threads:
+            while t.is_alive():
+                t.join(0.5)
+    except KeyboardInterrupt:
+        print("Stopping; waiting for posts in progress")
+        for a in accounts:
+            a.stop()
+        for t in threads:
+            t.join()
+    return failed
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    args = [a for a in argv if not a.startswith("--")]
+    daemon = "--daemon" in argv
+    batch = "--batch" in argv or GRAPH_BATCH
+    if "--help" in argv or "-h" in argv:
+        print(USAGE)
+        return 0
+
+    if "--accounts" in argv:
+        if not args:
+            print(USAGE)
+            return 1
+        # one connection pool for every account's workers
+        session = make_session(len(args) * (GRAPH_MAX_WORKERS + 1))
+        accounts = []
+        failed = {}
+        for path in args:
+            try:
+                accounts.append(Account.from_env_file(path, session))
+                accounts[-1].batch = batch
+            except Exception as e:
+                failed[path] = e
+                print(f"Skipping account {path} : {e}")
+        failed.update(run_accounts(accounts, daemon))
+        if failed:
+            print(f"{len(failed)} of {len(args)} accounts failed: {', '.join(failed)}")
+        return 1 if failed else 0
+
+    account = default_account()
+    account.batch = batch
+    if args:
+        account.project_path = args[0]
+    try:
+        run_account(account, daemon)
+    except KeyboardInterrupt:
+        account.stop()
+        print("Stopped")
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
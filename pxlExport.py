@@ -0,0 +1,307 @@
+import os
+import sys
+import json
+import shutil
+import hashlib
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from PyQt6.QtGui import QImage, QImageReader, QPainter, QColor
+from PyQt6.QtCore import Qt, QBuffer, QByteArray, QIODevice
+from pxlMediaTools import file_content_hash, probe_mp4, probe_media
+from pxlPostValidator import IMAGE_MIN_ASPECT, IMAGE_MAX_ASPECT, VIDEO_MIN_ASPECT, VIDEO_MAX_ASPECT
+
+# Upload-ready exports for pxlPostPrepper projects
+#
+# Each media file is cropped into Instagram's aspect range, resized, stripped of
+#   metadata and re-encoded under a size budget, in a process pool across all cores.
+# Output names carry a hash of the input file's contents plus the export settings,
+#   so an output that already exists is up to date and is skipped.
+# Videos need ffmpeg on the PATH; without it they're reported and left alone.
+
+EXPORT_VERSION = 2  # bump when the rendering changes, so old outputs are redone
+
+EXPORT_SETTINGS = {
+    'width': 1080,  # Instagram displays at most 1080 wide
+    # the aspect range pxlPostValidator accepts; anything outside is centre-cropped into it
+    'min_aspect': IMAGE_MIN_ASPECT,
+    'max_aspect': IMAGE_MAX_ASPECT,
+    'video_min_aspect': VIDEO_MIN_ASPECT,
+    'video_max_aspect': VIDEO_MAX_ASPECT,
+    'jpeg_quality': 92,
+    'min_jpeg_quality': 60,
+    'image_budget': 8 * 1024 * 1024,
+    'video_budget': 100 * 1024 * 1024,
+    'audio_kbps': 128,
+}
+
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.m4v', '.webm', '.mkv')
+
+
+def read_env(path='.env'):
+    """Key / value pairs from a .env file, using python-dotenv when it's installed."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        from dotenv import dotenv_values
+        return dict(dotenv_values(path))
+    except ImportError:
+        pass
+    values = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#') or '=' not in line:
+                continue
+            key, value = line.split('=', 1)
+            values[key.strip()] = value.strip().strip('"').strip("'")
+    return values
+
+
+def default_export_dir(env_path='.env'):
+    # IMAGE_DIR from the .env, as laid out in .env_base
+    return read_env(env_path).get('IMAGE_DIR') or None
+
+
+def _target_size(width, height, settings, resize=None, video=False):
+    """(crop w, crop h, out w, out h) for a source size.
+
+    resize ( image_processing.resize ) may be [w, h] to force an exact output size.
+    Videos use the wider video aspect range, so 9:16 reels aren't cropped to 4:5.
+    """
+    if resize:
+        if isinstance(resize, dict):
+            out_w, out_h = int(resize.get('width') or 0), int(resize.get('height') or 0)
+        else:
+            out_w, out_h = int(resize[0]), int(resize[1])
+        if out_w > 0 and out_h > 0:
+            aspect = out_w / out_h
+        else:
+            resize = None
+    if not resize:
+        lo, hi = ((settings['video_min_aspect'], settings['video_max_aspect']) if video
+                  else (settings['min_aspect'], settings['max_aspect']))
+        aspect = min(max(width / height, lo), hi)
+        out_w = min(width, settings['width']) if width / height <= aspect else min(round(height * aspect), settings['width'])
+        out_h = round(out_w / aspect)
+    # largest centred crop with the target aspect
+    if width / height > aspect:
+        crop_w, crop_h = round(height * aspect), height
+    else:
+        crop_w, crop_h = width, round(width / aspect)
+    return crop_w, crop_h, out_w, out_h
+
+
+def export_key(content_hash, kind, settings, processing):
+    raw = json.dumps({'input': content_hash, 'kind': kind, 'settings': settings,
+                      'processing': processing or {}, 'version': EXPORT_VERSION}, sort_keys=True)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _write_atomic(path, data):
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _render_image(src, dest, settings, processing):
+    reader = QImageReader(src)
+    # bake the EXIF orientation into the pixels; nothing else from the source is kept
+    reader.setAutoTransform(True)
+    img = reader.read()
+    if img.isNull():
+        raise IOError(reader.errorString())
+    crop_w, crop_h, out_w, out_h = _target_size(img.width(), img.height(), settings, processing.get('resize'))
+    img = img.copy((img.width() - crop_w) // 2, (img.height() - crop_h) // 2, crop_w, crop_h)
+    if (crop_w, crop_h) != (out_w, out_h):
+        img = img.scaled(out_w, out_h, Qt.AspectRatioMode.IgnoreAspectRatio, Qt.TransformationMode.SmoothTransformation)
+    if img.hasAlphaChannel():
+        # JPEG has no alpha; flatten onto white instead of black
+        flat = QImage(img.size(), QImage.Format.Format_RGB888)
+        flat.fill(QColor('white'))
+        painter = QPainter(flat)
+        painter.drawImage(0, 0, img)
+        painter.end()
+        img = flat
+    else:
+        img = img.convertToFormat(QImage.Format.Format_RGB888)
+    # step the quality down until the file fits the budget
+    quality = settings['jpeg_quality']
+    while True:
+        data = QByteArray()
+        buf = QBuffer(data)
+        buf.open(QIODevice.OpenModeFlag.WriteOnly)
+        img.save(buf, 'JPG', quality)
+        buf.close()
+        if data.size() <= settings['image_budget'] or quality <= settings['min_jpeg_quality']:
+            break
+        quality -= 6
+    _write_atomic(dest, bytes(data))
+
+
+def _render_video(src, dest, settings, processing):
+    ffmpeg = shutil.which('ffmpeg')
+    if not ffmpeg:
+        raise RuntimeError('ffmpeg not found on PATH')
+    info = probe_mp4(src) if src.lower().endswith(('.mp4', '.mov', '.m4v')) else None
+    if not info:
+        meta = probe_media(src) or {}
+        info = (meta.get('width'), meta.get('height'), 0, meta.get('duration'))
+    width, height, _, duration = info
+    trim = processing.get('trim') or {}
+    start = trim.get('start_seconds') or 0
+    end = trim.get('end_seconds')
+    length = (end if end is not None else (duration or 0)) - start
+    cmd = [ffmpeg, '-y', '-v', 'error', '-ss', str(start)]
+    if end is not None:
+        cmd += ['-to', str(end)]
+    cmd += ['-i', src, '-map_metadata', '-1']
+    filters = []
+    if width and height:
+        crop_w, crop_h, out_w, out_h = _target_size(width, height, settings, processing.get('resize'), video=True)
+        filters.append(f"crop={crop_w}:{crop_h}")
+        # libx264 wants even dimensions
+        filters.append(f"scale={out_w - out_w % 2}:{out_h - out_h % 2}")
+    if filters:
+        cmd += ['-vf', ','.join(filters)]
+    cmd += ['-c:v', 'libx264', '-preset', 'medium', '-pix_fmt', 'yuv420p']
+    if length > 0:
+        # average bitrate that lands under the budget, leaving room for audio and the container
+        total_kbps = settings['video_budget'] * 8 / 1000 / length * 0.95
+        video_kbps = max(500, int(total_kbps - settings['audio_kbps']))
+        cmd += ['-b:v', f'{video_kbps}k', '-maxrate', f'{video_kbps * 2}k', '-bufsize', f'{video_kbps * 2}k']
+    if processing.get('mute'):
+        cmd += ['-an']
+    else:
+        cmd += ['-c:a', 'aac', '-b:a', f"{settings['audio_kbps']}k"]
+    tmp = dest + '.tmp.mp4'
+    cmd += ['-movflags', '+faststart', tmp]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise RuntimeError(result.stderr.decode('utf-8', 'replace').strip()[-400:])
+    os.replace(tmp, dest)
+
+
+def export_media_job(job):
+    """Render one media file; runs in a pool process.
+
+    job: {'src', 'out_dir', 'video', 'settings', 'processing', 'content_hash'}
+    Returns {'status': 'written' | 'skipped' | 'failed', 'dest', 'key', 'hash', 'error'};
+    hash is the source's content hash, read here if the job didn't have it.
+    """
+    src = job['src']
+    content_hash = None
+    try:
+        content_hash = job.get('content_hash') or file_content_hash(src)
+        kind = 'video' if job['video'] else 'image'
+        key = export_key(content_hash, kind, job['settings'], job['processing'])
+        stem = os.path.splitext(os.path.basename(src))[0]
+        dest = os.path.join(job['out_dir'], f"{stem}-{key[:12]}{'.mp4' if job['video'] else '.jpg'}")
+        if os.path.exists(dest):
+            return {'status': 'skipped', 'dest': dest, 'key': key, 'hash': content_hash, 'error': None}
+        if job['video']:
+            _render_video(src, dest, job['settings'], job['processing'])
+        else:
+            _render_image(src, dest, job['settings'], job['processing'])
+        return {'status': 'written', 'dest': dest, 'key': key, 'hash': content_hash, 'error': None}
+    except Exception as e:
+        return {'status': 'failed', 'dest': None, 'key': None, 'hash': content_hash, 'error': str(e)}
+
+
+def build_export_jobs(posts, out_dir, settings=None, skip_posted=True):
+    """Jobs for every local media file in posts, as (post index, media index, job)."""
+    settings = dict(settings or EXPORT_SETTINGS)
+    jobs = []
+    for p, post in enumerate(posts):
+        local = post.get('local_data', {}) or {}
+        if skip_posted and (post.get('posted') or post.get('has_posted') or local.get('has_posted')):
+            continue
+        for i, m in enumerate(post.get('media', []) or []):
+            src = m.get('file_path') or m.get('file')
+            if not src:
+                continue
+            video = (m.get('type') or 'image').lower() == 'video' or src.lower().endswith(VIDEO_EXTENSIONS)
+            processing = m.get('video_processing' if video else 'image_processing') or {}
+            meta = m.get('metadata') or {}
+            # files in the media store are named by their hash; a hash kept in the metadata
+            #   ( see export_media_job ) is only trusted while the file still matches it
+            content_hash = m.get('media_hash')
+            try:
+                st = os.stat(src)
+            except OSError:
+                st = None
+            if not content_hash and st is not None:
+                if meta.get('hash') and meta.get('bytes') == st.st_size and meta.get('mtime') == st.st_mtime_ns:
+                    content_hash = meta['hash']
+            jobs.append((p, i, {'src': src, 'out_dir': out_dir, 'video': video, 'settings': settings,
+                                'processing': processing, 'content_hash': content_hash,
+                                'bytes': st.st_size if st else None, 'mtime': st.st_mtime_ns if st else None}))
+    return jobs
+
+
+def run_export(jobs, workers=None, progress=None, cancelled=None):
+    """Run export jobs on a process pool; returns results in job order."""
+    results = [None] * len(jobs)
+    if not jobs:
+        return results
+    out_dirs = {job['out_dir'] for _, _, job in jobs}
+    for d in out_dirs:
+        os.makedirs(d, exist_ok=True)
+    workers = workers or os.cpu_count() or 2
+    done = 0
+    # spawn, not fork: the GUI starts exports from a QThread while other threads hold locks
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    stopped = False
+    try:
+        futures = {pool.submit(export_media_job, job): n for n, (_, _, job) in enumerate(jobs)}
+        pending = set(futures)
+        while pending and not stopped:
+            finished, pending = wait(pending, timeout=0.25, return_when=FIRST_COMPLETED)
+            for future in finished:
+                results[futures[future]] = future.result()
+                done += 1
+                if progress:
+                    progress(done, len(jobs))
+            stopped = bool(cancelled and cancelled())
+    finally:
+        # on cancel, drop queued jobs and return without waiting on running encodes
+        pool.shutdown(wait=not stopped, cancel_futures=True)
+    return results
+
+
+def main(argv):
+    if not argv or len(argv) > 2:
+        print("Usage: python pxlExport.py <posts.json | project.db> [output dir]\n"
+              "       output dir defaults to IMAGE_DIR from .env")
+        return 1
+    from pxlProjectStore import ProjectStore, is_project_db
+    project = argv[0]
+    out_dir = argv[1] if len(argv) > 1 else default_export_dir()
+    if not out_dir:
+        print("No output dir given and no IMAGE_DIR in .env")
+        return 1
+    if is_project_db(project):
+        store = ProjectStore(project)
+        posts = store.load_posts()
+        store.close()
+    else:
+        with open(project, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        posts = data if isinstance(data, list) else [data]
+    jobs = build_export_jobs(posts, out_dir)
+    results = run_export(jobs, progress=lambda d, t: print(f"\r{d} / {t}", end='', flush=True))
+    print()
+    counts = {}
+    for (p, i, job), res in zip(jobs, results):
+        counts[res['status']] = counts.get(res['status'], 0) + 1
+        if res['status'] == 'failed':
+            print(f"Post {p + 1} media {i + 1} ( {job['src']} ) : {res['error']}")
+    print(', '.join(f"{n} {status}" for status, n in sorted(counts.items())) or 'Nothing to export')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
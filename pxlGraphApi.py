@@ -0,0 +1,511 @@
+import json
+import time
+import random
+import threading
+from urllib.parse import urlencode
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from pxlPostingLedger import CONTAINER_TTL
+
+# Instagram Graph API client for postToInstagram
+#
+# One pooled requests.Session is shared by every call, so repeated calls reuse
+#   their connections instead of a new TLS handshake each time. Clients for several
+#   accounts can share one session ( make_session ) and its pool.
+# Carousel children are created concurrently, up to max_workers at a time.
+# Every call is logged with its latency.
+# Throttled and transient failures are retried with exponential backoff and jitter,
+#   and the usage headers the API returns slow calls down before it starts refusing them.
+#   Waits longer than RETRY_MAX_DELAY are raised as GraphApiError for the caller to reschedule.
+# Batch mode ( create_containers ) sends up to BATCH_MAX independent container calls in one
+#   batch request, and hands each result to the create_container call that asks for it later.
+
+GRAPH_API_URL = "https://graph.facebook.com/v21.0"
+
+RETRIES = 4
+RETRY_BASE_DELAY = 2.0  # seconds; doubles each attempt
+RETRY_MAX_DELAY = 60.0
+USAGE_SLOWDOWN = 75  # percent of a rate limit used before calls are spaced out
+USAGE_MAX_DELAY = 30.0  # spacing at 100% usage
+BATCH_MAX = 50  # calls per batch request, the Graph API's limit
+
+# Graph API error codes
+THROTTLE_CODES = {4, 17, 32, 613, 80001, 80002, 80005, 80006, 80008}  # app, user, page and business use case limits
+TRANSIENT_CODES = {1, 2}  # unknown error, service temporarily unavailable
+PUBLISH_LIMIT_SUBCODE = 2207042  # the account's posts per 24 hours are used up
+NOT_READY_CODE = 9007  # media_publish on a container still processing
+NOT_READY_SUBCODE = 2207027
+
+
+class GraphApiError(Exception):
+    """A call that can't succeed yet; retry_after is seconds to wait, when the API said."""
+
+    def __init__(self, error, retry_after=None):
+        error = error or {}
+        super().__init__(error.get('message') or 'Graph API error')
+        self.error = error
+        self.code = error.get('code')
+        self.subcode = error.get('error_subcode')
+        self.retry_after = retry_after
+        self.publish_limit = self.subcode == PUBLISH_LIMIT_SUBCODE
+
+
+def backoff_delay(attempt, base=RETRY_BASE_DELAY, cap=RETRY_MAX_DELAY):
+    # exponential, with the upper half jittered so parallel retries spread out
+    delay = min(cap, base * 2 ** (attempt - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def is_video(media):
+    return (media.get("type") or "image").lower() == "video"
+
+
+def is_not_ready(result):
+    """True for a media_publish result refused because the container is still processing."""
+    error = (result or {}).get("error") if isinstance(result, dict) else None
+    return bool(error) and (error.get("code") == NOT_READY_CODE or error.get("error_subcode") == NOT_READY_SUBCODE)
+
+
+def _usage_percent(value):
+    # highest counter in a usage header; X-App-Usage is one dict, X-Business-Use-Case-Usage
+    #   maps business ids to lists of them. Also returns minutes until access is regained.
+    try:
+        usage = json.loads(value)
+    except (TypeError, ValueError):
+        return 0, 0
+    entries = []
+    if isinstance(usage, dict) and any(isinstance(v, list) for v in usage.values()):
+        for v in usage.values():
+            entries.extend(e for e in v if isinstance(e, dict))
+    elif isinstance(usage, dict):
+        entries.append(usage)
+    percent = regain = 0
+    for e in entries:
+        for key in ('call_count', 'total_time', 'total_cputime', 'acc_id_util_pct'):
+            try:
+                percent = max(percent, float(e.get(key) or 0))
+            except (TypeError, ValueError):
+                pass
+        try:
+            regain = max(regain, float(e.get('estimated_time_to_regain_access') or 0))
+        except (TypeError, ValueError):
+            pass
+    return percent, regain
+
+
+def _payload_key(payload):
+    return json.dumps(payload, sort_keys=True)
+
+
+def make_session(pool_size):
+    """A requests.Session keeping up to pool_size connections open per host."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class GraphClient:
+    """Graph API calls for one access token.
+
+    Rate limit state is per client, so each account's throttling only slows that account.
+    """
+
+    def __init__(self, access_token, base_url=GRAPH_API_URL, max_workers=4, timeout=60, log=print,
+                 retries=RETRIES, session=None):
+        self.access_token = access_token
+        self.base_url = base_url.rstrip('/')
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.log = log
+        self.retries = retries
+        # enough pooled connections for every child worker plus the parent call
+        self._owns_session = session is None
+        self.session = session if session is not None else make_session(self.max_workers + 1)
+        self._log_lock = threading.Lock()
+        # rate limit state from the latest response headers, shared by every worker
+        self._usage_lock = threading.Lock()
+        self.usage = 0.0
+        self.blocked_until = 0.0  # time.monotonic()
+        # optional container cache with get / put / discard (account id, payload[, container id]),
+        #   ie a PostingLedger, so containers made by an earlier run can be reused
+        self.containers = None
+        # batch mode results waiting for their create_container call,
+        #   (account id, payload) -> [(result, time made), ...]; see clear_prepared
+        self._batch_lock = threading.Lock()
+        self._prepared = {}
+        # container ids given out by this client; a cached container serves one caller, so the
+        #   same image twice in a carousel, or two identical posts, each get their own
+        self._handed_out = set()
+        # HTTP requests made, and the API calls they carried; more calls than requests is batching
+        self.round_trips = 0
+        self.api_calls = 0
+
+    def close(self):
+        if self._owns_session:
+            self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _log(self, text):
+        if self.log:
+            with self._log_lock:
+                self.log(text)
+
+    def _read_usage(self, headers):
+        percent = regain = 0
+        for name in ('X-App-Usage', 'X-Business-Use-Case-Usage'):
+            if name in headers:
+                p, r = _usage_percent(headers[name])
+                percent, regain = max(percent, p), max(regain, r)
+        retry_after = headers.get('Retry-After')
+        with self._usage_lock:
+            self.usage = percent
+            wait = regain * 60
+            if retry_after and retry_after.isdigit():
+                wait = max(wait, int(retry_after))
+            if wait:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + wait)
+        return wait or None
+
+    def throttle_delay(self):
+        """Seconds to hold off before the next call, from the latest usage headers."""
+        with self._usage_lock:
+            delay = max(0.0, self.blocked_until - time.monotonic())
+            if self.usage >= USAGE_SLOWDOWN:
+                delay = max(delay, USAGE_MAX_DELAY * min(1.0, (self.usage - USAGE_SLOWDOWN) / (100 - USAGE_SLOWDOWN)))
+        return delay
+
+    def _count(self, calls):
+        with self._batch_lock:
+            self.round_trips += 1
+            self.api_calls += calls
+
+    def request(self, method, path, data=None, params=None, retry_ambiguous=True, calls=1):
+        """Call the Graph API; returns the decoded json ( {} if the body isn't json ).
+
+        Throttling, 5xx and connection errors are retried; other API errors are returned
+          as the {'error': ...} body. Raises GraphApiError when the retries run out, the
+          wait would be over RETRY_MAX_DELAY, or the account's publishing limit is reached.
+        retry_ambiguous=False only retries calls the API refused outright, for calls
+          like media_publish that mustn't run twice after a 5xx or a dropped connection.
+        calls is how many API calls the request carries, for the round trip counts.
+        """
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        if method.upper() == 'GET':
+            params = dict(params or {}, access_token=self.access_token)
+        else:
+            data = dict(data or {}, access_token=self.access_token)
+        attempt = 0
+        while True:
+            wait = self.throttle_delay()
+            if wait > RETRY_MAX_DELAY:
+                raise GraphApiError({'message': f'Rate limited for another {wait:.0f}s'}, retry_after=wait)
+            if wait > 0:
+                self._log(f"[graph] rate limit usage {self.usage:.0f}%, waiting {wait:.1f}s")
+                time.sleep(wait)
+            start = time.perf_counter()
+            retry_after = None
+            self._count(calls)
+            try:
+                resp = self.session.request(method, url, data=data, params=params, timeout=self.timeout)
+            except requests.RequestException as e:
+                self._log(f"[graph] {method} /{path} failed after {(time.perf_counter() - start) * 1000:.0f}ms : {e}")
+                result = {'error': {'message': str(e)}}
+                retry = retry_ambiguous
+            else:
+                elapsed = (time.perf_counter() - start) * 1000
+                self._log(f"[graph] {method} /{path} {resp.status_code} {elapsed:.0f}ms")
+                retry_after = self._read_usage(resp.headers)
+                try:
+                    result = resp.json()
+                except ValueError:
+                    result = {}
+                error = result.get('error') if isinstance(result, dict) else None
+                if not error and resp.status_code < 500:
+                    return result
+                error = error or {'message': f'HTTP {resp.status_code}'}
+                result = {'error': error}
+                if error.get('error_subcode') == PUBLISH_LIMIT_SUBCODE:
+                    raise GraphApiError(error)
+                if error.get('code') in THROTTLE_CODES:
+                    retry = True
+                elif resp.status_code >= 500 or error.get('code') in TRANSIENT_CODES or error.get('is_transient'):
+                    retry = retry_ambiguous
+                else:
+                    return result
+            if not retry:
+                return result
+            attempt += 1
+            if attempt > self.retries:
+                raise GraphApiError(result['error'], retry_after)
+            delay = max(backoff_delay(attempt), retry_after or 0)
+            if delay > RETRY_MAX_DELAY:
+                raise GraphApiError(result['error'], delay)
+            self._log(f"[graph] {method} /{path} retry {attempt}/{self.retries} in {delay:.1f}s")
+            time.sleep(delay)
+
+    def post(self, path, data=None):
+        return self.request('POST', path, data=data)
+
+    def get(self, path, params=None):
+        return self.request('GET', path, params=params)
+
+    def batch(self, calls):
+        """Run (method, relative url, form data) calls as batch requests, BATCH_MAX at a time.
+
+        Returns each call's decoded json in call order; a failed call gives its {'error': ...}.
+        Calls the API throttled, failed transiently or didn't get to are sent again in the
+          next batch, up to self.retries times.
+        """
+        results = [None] * len(calls)
+        todo = list(range(len(calls)))
+        attempt = 0
+        while todo:
+            retry = []
+            for start in range(0, len(todo), BATCH_MAX):
+                chunk = todo[start:start + BATCH_MAX]
+                items = [{'method': calls[n][0], 'relative_url': calls[n][1].lstrip('/')} for n in chunk]
+                for item, n in zip(items, chunk):
+                    if calls[n][2]:
+                        item['body'] = urlencode(calls[n][2])
+                answer = self.request('POST', '', data={'batch': json.dumps(items), 'include_headers': 'false'},
+                                      calls=len(chunk))
+                if not isinstance(answer, list):
+                    # the whole batch was refused
+                    error = answer.get('error') if isinstance(answer, dict) else None
+                    if not isinstance(error, dict):
+                        error = {'message': str(error or 'Unexpected batch response')}
+                    for n in chunk:
+                        results[n] = {'error': error}
+                    continue
+                for n, entry in zip(chunk, answer + [None] * (len(chunk) - len(answer))):
+                    if not isinstance(entry, dict):
+                        entry = None
+                        # not run, usually because the batch hit its time limit
+                        results[n] = {'error': {'message': 'Not processed in batch', 'is_transient': True}}
+                    else:
+                        try:
+                            results[n] = json.loads(entry.get('body') or '{}')
+                        except ValueError:
+                            results[n] = {}
+                        if not isinstance(results[n], dict):
+                            results[n] = {'data': results[n]}
+                        if (entry.get('code') or 200) >= 400 and 'error' not in results[n]:
+                            results[n] = {'error': {'message': f"HTTP {entry.get('code')}"}}
+                    error = results[n].get('error')
+                    if error and not isinstance(error, dict):
+                        error = results[n]['error'] = {'message': str(error)}
+                    if error and (error.get('code') in THROTTLE_CODES or error.get('code') in TRANSIENT_CODES
+                                  or error.get('is_transient') or ((entry or {}).get('code') or 0) >= 500):
+                        retry.append(n)
+            attempt += 1
+            if not retry or attempt > self.retries:
+                break
+            delay = backoff_delay(attempt)
+            self._log(f"[graph] batch: {len(retry)} calls to retry, in {delay:.1f}s")
+            time.sleep(delay)
+            todo = retry
+        return results
+
+    # -- Publishing --
+
+    def media_container_payload(self, media, carousel_item=False):
+        """Form data for a media container, or None if the media can't be posted."""
+        if not media.get("URL"):
+            self._log(f"Skipping media without public URL: {media.get('file_path')}")
+            return None
+        payload = {}
+        mtype = media.get("type", "image").lower()
+        if mtype == "image":
+            payload["image_url"] = media["URL"]
+        elif mtype == "video":
+            payload["video_url"] = media["URL"]
+            if carousel_item:
+                payload["media_type"] = "VIDEO"
+        else:
+            self._log(f"Unsupported media type: {mtype}")
+            return None
+        if carousel_item:
+            payload["is_carousel_item"] = "true"
+
+        # Per-child caption/description (note: Graph API historically prefers a single caption on the parent for carousels)
+        if media.get("description"):
+            payload["caption"] = media["description"]
+
+        # Accessibility / alt text
+        if media.get("alt_text"):
+            # Graph API param name: accessibility_caption (some SDKs/versions accept 'accessibility_caption')
+            payload["accessibility_caption"] = media["alt_text"]
+
+        # User tags (Graph API expects user ids; here we pass a best-effort JSON string and note requirements)
+        if media.get("user_tags"):
+            # expected format: {"in": [{"user_id": "<id>", "x": 0.5, "y": 0.5}, ...]}
+            # Caller currently may provide username; mapping to user_id is required before posting.
+            try:
+                payload["user_tags"] = json.dumps({"in": media["user_tags"]})
+            except Exception:
+                pass
+
+        # Location id (if present)
+        if media.get("location") and media["location"].get("id"):
+            payload["location_id"] = media["location"]["id"]
+        return payload
+
+    def create_media_container(self, account_id, media, carousel_item=False):
+        """Create a media container for a single image or video; returns its id or None."""
+        payload = self.media_container_payload(media, carousel_item)
+        if payload is None:
+            return None
+        return self.create_container(account_id, payload, "create_media_container")
+
+    def create_container(self, account_id, payload, label="create_container"):
+        """POST a container payload; returns its id or None. Reuses a cached container
+        made from the same payload while it's still usable."""
+        prepared, made = None, 0
+        with self._batch_lock:
+            waiting = self._prepared.get((account_id, _payload_key(payload)))
+            if waiting:
+                prepared, made = waiting.pop(0)
+        if prepared is not None and time.time() - made < CONTAINER_TTL:
+            # made ( or refused ) in a batch by create_containers
+            if not prepared.get("id"):
+                self._log(f"{label} -> {prepared}")
+            return prepared.get("id")
+        cache = self.containers
+        if cache is not None:
+            cid = cache.get(account_id, payload)
+            with self._batch_lock:
+                taken = cid in self._handed_out
+            if cid and not taken:
+                code = self.container_status([cid]).get(cid, (None, ""))[0]
+                with self._batch_lock:
+                    if code in ("FINISHED", "IN_PROGRESS") and cid not in self._handed_out:
+                        self._handed_out.add(cid)
+                        reuse = True
+                    else:
+                        reuse = False
+                if reuse:
+                    self._log(f"{label} -> reusing container {cid}")
+                    return cid
+                if code not in ("FINISHED", "IN_PROGRESS"):
+                    cache.discard(account_id, payload)
+        result = self.post(f"{account_id}/media", payload)
+        self._log(f"{label} -> {result}")
+        cid = result.get("id")
+        if cid:
+            with self._batch_lock:
+                self._handed_out.add(cid)
+            if cache is not None:
+                cache.put(account_id, payload, cid)
+        return cid
+
+    def create_containers(self, account_id, items):
+        """Batch mode create_container for independent containers, ie across posts.
+
+        items are (payload, label). Containers are made in batch requests, and each result
+          is kept for a create_container call with the same payload, which then makes no
+          request; the same payload twice ( ie one image in two posts ) gets two containers,
+          since a container publishes once. Errors are logged against their item's label.
+        Returns the container ids in item order, None for failures.
+        """
+        cache = self.containers
+        results = [None] * len(items)
+        keys = [_payload_key(payload) for payload, _ in items]
+        if cache is not None:
+            # containers an earlier run made, checked in one status lookup; each serves one item
+            cached = {}
+            for n, (payload, _) in enumerate(items):
+                cid = cache.get(account_id, payload)
+                if cid and cid not in cached.values() and cid not in self._handed_out:
+                    cached[n] = cid
+            status = self.container_status(sorted(cached.values()))
+            for n, cid in cached.items():
+                if status.get(cid, (None, ""))[0] in ("FINISHED", "IN_PROGRESS"):
+                    results[n] = {"id": cid}
+                else:
+                    cache.discard(account_id, items[n][0])
+        todo = [n for n in range(len(items)) if results[n] is None]
+        made = time.time()
+        answers = self.batch([("POST", f"{account_id}/media", items[n][0]) for n in todo])
+        for n, result in zip(todo, answers):
+            self._log(f"{items[n][1]} -> {result}")
+            results[n] = result
+            if result.get("id") and cache is not None:
+                cache.put(account_id, items[n][0], result["id"])
+        with self._batch_lock:
+            self._handed_out.update(result["id"] for result in results if result.get("id"))
+            for key, result in zip(keys, results):
+                self._prepared.setdefault((account_id, key), []).append((result, made))
+        return [result.get("id") for result in results]
+
+    def clear_prepared(self):
+        """Forget batch results no create_container call picked up, ie for posts that were
+        edited, skipped or held back; with a container cache they're still found there."""
+        with self._batch_lock:
+            self._prepared.clear()
+
+    def create_children(self, account_id, media_list):
+        """Carousel child containers, created concurrently; ids in media order ( None for failures )."""
+        if not media_list:
+            return []
+        workers = min(self.max_workers, len(media_list))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(lambda m: self.create_media_container(account_id, m, carousel_item=True), media_list))
+
+    def create_carousel(self, account_id, post):
+        """
+        For carousels: create child containers first, then create a parent container with children list, then publish.
+        Video children must finish processing before the parent is created; see create_carousel_parent.
+        """
+        children = [cid for cid in self.create_children(account_id, post.get("media", [])) if cid]
+        if not children:
+            self._log("No valid children created for carousel")
+            return None
+        return self.create_carousel_parent(account_id, post, children)
+
+    def carousel_parent_payload(self, post, children):
+        payload = {"media_type": "CAROUSEL", "children": ",".join(children)}
+        if post.get("caption"):
+            payload["caption"] = post["caption"]
+        return payload
+
+    def create_carousel_parent(self, account_id, post, children):
+        # Parent container
+        return self.create_container(account_id, self.carousel_parent_payload(post, children), "create_carousel")
+
+    def publish_container(self, account_id, creation_id):
+        # a publish that failed with a 5xx may still have gone out; never repeat it blindly
+        result = self.request('POST', f"{account_id}/media_publish", data={"creation_id": creation_id}, retry_ambiguous=False)
+        self._log(f"publish_container -> {result}")
+        return result
+
+    def container_status(self, container_ids):
+        """{container id: (status_code, status text)} for many containers in one call.
+
+        status_code is IN_PROGRESS, FINISHED, ERROR, EXPIRED or PUBLISHED; containers the
+          lookup didn't return are left out.
+        """
+        if not container_ids:
+            return {}
+        result = self.get("", {"ids": ",".join(container_ids), "fields": "status_code,status"})
+        if not isinstance(result, dict) or "error" in result:
+            return {}
+        return {cid: (entry.get("status_code"), entry.get("status") or "")
+                for cid, entry in result.items() if isinstance(entry, dict)}
+
+    def publishing_limit(self, account_id):
+        """(posts used, posts allowed, window seconds) for the account's rolling publishing limit, or None."""
+        result = self.get(f"{account_id}/content_publishing_limit", {"fields": "config,quota_usage"})
+        try:
+            entry = result["data"][0]
+            config = entry.get("config") or {}
+            return int(entry.get("quota_usage") or 0), config.get("quota_total"), config.get("quota_duration")
+        except (KeyError, IndexError, TypeError, ValueError, AttributeError):
+            return None
@@ -0,0 +1,314 @@
+import os
+import sys
+import json
+import hmac
+import hashlib
+import mimetypes
+from datetime import datetime, timezone
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import xml.etree.ElementTree as ET
+import requests
+from pxlMediaTools import file_content_hash
+from pxlExport import read_env
+from pxlGraphApi import make_session
+
+# Public hosting for media, so posts get the URL fields the Graph API publishes from
+#
+# Export-ready files ( media['export'], else the source file ) are uploaded to an
+#   S3-compatible bucket ( AWS S3, MinIO, R2, B2, ... ) under the sha1 of their contents,
+#   so a file already in the bucket is found with one HEAD request and never re-sent.
+#   Large files go up as multipart uploads, their parts in parallel.
+# Settings come from the .env:
+#   S3_ENDPOINT    https://s3.us-east-1.amazonaws.com, http://localhost:9000, ...
+#   S3_BUCKET, S3_ACCESS_KEY, S3_SECRET_KEY
+#   S3_REGION      default us-east-1
+#   S3_PREFIX      key prefix, default media/
+#   S3_PUBLIC_URL  public address of the bucket, default <endpoint>/<bucket>
+#   S3_ACL         ie public-read, for buckets that use object ACLs
+
+MULTIPART_THRESHOLD = 16 * 1024 * 1024
+PART_SIZE = 8 * 1024 * 1024  # S3's minimum is 5 MB for all but the last part
+UPLOAD_WORKERS = 8
+_S3_NS = '{http://s3.amazonaws.com/doc/2006-03-01/}'
+
+
+class MediaHostError(Exception):
+    pass
+
+
+def _hmac(key, text):
+    return hmac.new(key, text.encode('utf-8'), hashlib.sha256).digest()
+
+
+class S3Bucket:
+    """Minimal S3 API client ( path-style addressing, Signature Version 4 ) on requests."""
+
+    def __init__(self, endpoint, bucket, access_key, secret_key, region='us-east-1', session=None, timeout=120):
+        self.endpoint = endpoint.rstrip('/')
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region or 'us-east-1'
+        self.session = session if session is not None else make_session(UPLOAD_WORKERS * 2)
+        self.timeout = timeout
+        self.host = self.endpoint.split('://', 1)[-1].split('/', 1)[0]
+
+    def _path(self, key):
+        return f"/{self.bucket}/{quote(key, safe='/-_.~')}"
+
+    def request(self, method, key, params=None, data=b'', headers=None):
+        """A signed request; raises MediaHostError for anything but 2xx ( and 404 on HEAD )."""
+        now = datetime.now(timezone.utc)
+        amz_date = now.strftime('%Y%m%dT%H%M%SZ')
+        datestamp = now.strftime('%Y%m%d')
+        payload_hash = hashlib.sha256(data).hexdigest()
+        headers = {k.lower(): str(v).strip() for k, v in (headers or {}).items()}
+        headers.update({'host': self.host, 'x-amz-date': amz_date, 'x-amz-content-sha256': payload_hash})
+        query = '&'.join(f"{quote(str(k), safe='-_.~')}={quote(str(v), safe='-_.~')}"
+                         for k, v in sorted((params or {}).items()))
+        signed = sorted(headers)
+        canonical = '\n'.join([method, self._path(key), query,
+                               ''.join(f"{h}:{headers[h]}\n" for h in signed),
+                               ';'.join(signed), payload_hash])
+        scope = f"{datestamp}/{self.region}/s3/aws4_request"
+        to_sign = '\n'.join(['AWS4-HMAC-SHA256', amz_date, scope, hashlib.sha256(canonical.encode('utf-8')).hexdigest()])
+        signing_key = _hmac(_hmac(_hmac(_hmac(('AWS4' + self.secret_key).encode('utf-8'), datestamp), self.region), 's3'), 'aws4_request')
+        signature = hmac.new(signing_key, to_sign.encode('utf-8'), hashlib.sha256).hexdigest()
+        headers['authorization'] = (f"AWS4-HMAC-SHA256 Credential={self.access_key}/{scope}, "
+                                    f"SignedHeaders={';'.join(signed)}, Signature={signature}")
+        url = self.endpoint + self._path(key) + (f"?{query}" if query else '')
+        try:
+            resp = self.session.request(method, url, data=data or None, headers=headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise MediaHostError(f"{method} {key} : {e}")
+        if resp.status_code >= 300 and not (method == 'HEAD' and resp.status_code == 404):
+            raise MediaHostError(f"{method} {key} : HTTP {resp.status_code} {resp.text[:200]}")
+        return resp
+
+    def exists(self, key):
+        return self.request('HEAD', key).status_code != 404
+
+    def put(self, key, data, headers=None):
+        self.request('PUT', key, data=data, headers=headers)
+
+    def create_multipart(self, key, headers=None):
+        resp = self.request('POST', key, params={'uploads': ''}, headers=headers)
+        root = ET.fromstring(resp.content)
+        upload_id = root.findtext(f'{_S3_NS}UploadId') or root.findtext('UploadId')
+        if not upload_id:
+            raise MediaHostError(f"No UploadId for {key}")
+        return upload_id
+
+    def upload_part(self, key, upload_id, number, data):
+        resp = self.request('PUT', key, params={'partNumber': number, 'uploadId': upload_id}, data=data)
+        return resp.headers.get('ETag', '')
+
+    def complete_multipart(self, key, upload_id, etags):
+        body = '<CompleteMultipartUpload>' + ''.join(
+            f'<Part><PartNumber>{n}</PartNumber><ETag>{etag}</ETag></Part>' for n, etag in enumerate(etags, 1)
+        ) + '</CompleteMultipartUpload>'
+        self.request('POST', key, params={'uploadId': upload_id}, data=body.encode('utf-8'),
+                     headers={'content-type': 'application/xml'})
+
+    def abort_multipart(self, key, upload_id):
+        try:
+            self.request('DELETE', key, params={'uploadId': upload_id})
+        except MediaHostError:
+            pass
+
+
+class MediaHost:
+    """Uploads files to an S3Bucket under their content hash and gives back public URLs."""
+
+    def __init__(self, bucket, prefix='media/', public_url=None, acl=None, workers=UPLOAD_WORKERS):
+        self.bucket = bucket
+        self.prefix = prefix or ''
+        self.public_url = (public_url or f"{bucket.endpoint}/{bucket.bucket}").rstrip('/')
+        self.acl = acl
+        self.workers = workers
+        # parts of every multipart upload share one pool, separate from the per file one
+        self._part_pool = None
+
+    @classmethod
+    def from_env(cls, env_path='.env'):
+        """A MediaHost from the S3_* settings in the .env, or None when they aren't set."""
+        env = read_env(env_path)
+        needed = ('S3_ENDPOINT', 'S3_BUCKET', 'S3_ACCESS_KEY', 'S3_SECRET_KEY')
+        if not all(env.get(k) for k in needed):
+            return None
+        bucket = S3Bucket(env['S3_ENDPOINT'], env['S3_BUCKET'], env['S3_ACCESS_KEY'], env['S3_SECRET_KEY'],
+                          env.get('S3_REGION') or 'us-east-1')
+        return cls(bucket, env.get('S3_PREFIX', 'media/'), env.get('S3_PUBLIC_URL'), env.get('S3_ACL'))
+
+    def object_key(self, content_hash, ext):
+        return f"{self.prefix}{content_hash}{ext.lower()}"
+
+    def url_for(self, key):
+        return f"{self.public_url}/{quote(key, safe='/-_.~')}"
+
+    def _headers(self, path):
+        headers = {'content-type': mimetypes.guess_type(path)[0] or 'application/octet-stream'}
+        if self.acl:
+            headers['x-amz-acl'] = self.acl
+        return headers
+
+    def _multipart(self, key, path, size):
+        upload_id = self.bucket.create_multipart(key, self._headers(path))
+
+        def part(number):
+            with open(path, 'rb') as f:
+                f.seek((number - 1) * PART_SIZE)
+                return self.bucket.upload_part(key, upload_id, number, f.read(PART_SIZE))
+
+        try:
+            count = (size + PART_SIZE - 1) // PART_SIZE
+            etags = list(self._part_pool.map(part, range(1, count + 1)))
+            self.bucket.complete_multipart(key, upload_id, etags)
+        except Exception:
+            self.bucket.abort_multipart(key, upload_id)
+            raise
+
+    def upload(self, path, content_hash=None):
+        """Upload a file unless the bucket has it; returns (url, key, content hash, 'exists' | 'uploaded')."""
+        content_hash = content_hash or file_content_hash(path)
+        key = self.object_key(content_hash, os.path.splitext(path)[1])
+        if self.bucket.exists(key):
+            return self.url_for(key), key, content_hash, 'exists'
+        size = os.path.getsize(path)
+        if size >= MULTIPART_THRESHOLD and self._part_pool is not None:
+            self._multipart(key, path, size)
+        else:
+            with open(path, 'rb') as f:
+                self.bucket.put(key, f.read(), self._headers(path))
+        return self.url_for(key), key, content_hash, 'uploaded'
+
+    def run(self, jobs, progress=None, cancelled=None):
+        """Upload build_host_jobs jobs concurrently; results in job order as
+        {'status': 'uploaded' | 'exists' | 'failed', 'url', 'key', 'hash', 'error'}."""
+        results = [None] * len(jobs)
+        if not jobs:
+            return results
+        done = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as pool, \
+                ThreadPoolExecutor(max_workers=self.workers) as parts:
+            self._part_pool = parts
+
+            def work(job):
+                if cancelled and cancelled():
+                    return None
+                try:
+                    url, key, content_hash, status = self.upload(job['src'], job.get('content_hash'))
+                    return {'status': status, 'url': url, 'key': key, 'hash': content_hash, 'error': None}
+                except (OSError, MediaHostError) as e:
+                    return {'status': 'failed', 'url': None, 'key': None, 'hash': None, 'error': str(e)}
+
+            futures = {pool.submit(work, job): n for n, (_, _, job) in enumerate(jobs)}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+                done += 1
+                if progress:
+                    progress(done, len(jobs))
+            self._part_pool = None
+        return results
+
+
+def _upload_source(m):
+    # the export-ready copy when there is one, else the original file
+    export = m.get('export') or {}
+    if export.get('file_path') and os.path.exists(export['file_path']):
+        return export['file_path']
+    return m.get('file_path') or m.get('file')
+
+
+def build_host_jobs(posts, skip_posted=True):
+    """Jobs for every local media file in posts, as (post index, media index, job)."""
+    jobs = []
+    for p, post in enumerate(posts):
+        local = post.get('local_data', {}) or {}
+        if skip_posted and (post.get('posted') or post.get('has_posted') or local.get('has_posted')):
+            continue
+        for i, m in enumerate(post.get('media', []) or []):
+            src = _upload_source(m)
+            if not src or not os.path.exists(src):
+                continue
+            # reuse a known hash while the file still matches it, rather than re-reading it
+            content_hash = None
+            st = os.stat(src)
+            is_source = src == (m.get('file_path') or m.get('file'))
+            known = [dict(m.get('hosted') or {})]
+            if is_source:
+                known.append(dict(m.get('metadata') or {}, file_path=src))
+            for entry in known:
+                if entry.get('hash') and entry.get('file_path') == src \
+                        and entry.get('bytes') == st.st_size and entry.get('mtime') == st.st_mtime_ns:
+                    content_hash = entry['hash']
+                    break
+            if not content_hash and is_source:
+                content_hash = m.get('media_hash')
+            jobs.append((p, i, {'src': src, 'content_hash': content_hash, 'bytes': st.st_size, 'mtime': st.st_mtime_ns}))
+    return jobs
+
+
+def hosted_entry(job, result):
+    # what's kept on the media dict; the hash is reused while the file is unchanged
+    return {'file_path': job['src'], 'bytes': job['bytes'], 'mtime': job['mtime'],
+            'hash': result['hash'], 'key': result['key']}
+
+
+def apply_host_results(posts, jobs, results):
+    """Write URLs back into the media entries; returns the posts that changed."""
+    changed = []
+    for (p, i, job), res in zip(jobs, results):
+        if not res or res['status'] == 'failed':
+            continue
+        m = posts[p]['media'][i]
+        hosted = hosted_entry(job, res)
+        if m.get('URL') != res['url'] or m.get('hosted') != hosted:
+            m['URL'] = res['url']
+            m['hosted'] = hosted
+            if not any(c is posts[p] for c in changed):
+                changed.append(posts[p])
+    return changed
+
+
+def main(argv):
+    if len(argv) != 1:
+        print("Usage: python pxlMediaHost.py <posts.json | project.db>\n"
+              "       bucket settings ( S3_* ) are read from .env")
+        return 1
+    from pxlProjectStore import ProjectStore, is_project_db, write_text_atomic
+    host = MediaHost.from_env()
+    if host is None:
+        print("Set S3_ENDPOINT, S3_BUCKET, S3_ACCESS_KEY and S3_SECRET_KEY in .env")
+        return 1
+    project = argv[0]
+    if is_project_db(project):
+        store = ProjectStore(project)
+        posts = store.load_posts()
+    else:
+        store = None
+        with open(project, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        posts = data if isinstance(data, list) else [data]
+    jobs = build_host_jobs(posts)
+    results = host.run(jobs, progress=lambda d, t: print(f"\r{d} / {t}", end='', flush=True))
+    print()
+    counts = {}
+    for (p, i, job), res in zip(jobs, results):
+        counts[res['status']] = counts.get(res['status'], 0) + 1
+        if res['status'] == 'failed':
+            print(f"Post {p + 1} media {i + 1} ( {job['src']} ) : {res['error']}")
+    if apply_host_results(posts, jobs, results):
+        if store is not None:
+            store.save_post_dicts(posts)
+        else:
+            write_text_atomic(project, json.dumps(posts if isinstance(data, list) else posts[0], indent=2))
+    if store is not None:
+        store.close()
+    print(', '.join(f"{n} {status}" for status, n in sorted(counts.items())) or 'Nothing to upload')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,146 @@
+import os
+import sys
+import shutil
+from pxlMediaTools import file_content_hash
+
+# Content-addressed media store for pxlPostPrepper projects
+#
+# Media files are kept once, under the sha1 of their contents, in a folder next to
+#   the project ( posts.json -> posts.media/ ). Media entries record the hash in
+#   'media_hash', so a project still finds its files after folders are moved,
+#   and the same file imported twice is only stored ( and exported / uploaded ) once.
+# Files are added with a reflink ( copy-on-write clone ) where the filesystem
+#   supports it, then a hard link, and only copied as a last resort.
+#   A hard linked object shares the original's data; tools that save by writing a
+#   new file and renaming it leave the store alone, editing a file in place doesn't.
+
+STORE_SUFFIX = '.media'
+_FICLONE = 0x40049409  # linux ioctl; btrfs, xfs, bcachefs ...
+
+
+def store_path_for(project_path):
+    base, _ = os.path.splitext(project_path)
+    return base + STORE_SUFFIX
+
+
+def _reflink(src, dest):
+    if not sys.platform.startswith('linux'):
+        return False
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        with open(src, 'rb') as s, open(dest, 'wb') as d:
+            fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+        return True
+    except OSError:
+        try:
+            os.remove(dest)
+        except OSError:
+            pass
+        return False
+
+
+class MediaStore:
+    """Media files stored as objects/<2 hex>/<sha1><ext> under root."""
+
+    def __init__(self, root):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+
+    def exists(self):
+        return os.path.isdir(self.objects_dir)
+
+    def create(self):
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+    def object_path(self, content_hash, ext=''):
+        return os.path.join(self.objects_dir, content_hash[:2], content_hash + ext.lower())
+
+    def find(self, content_hash):
+        """Stored file for a hash, whatever its extension, or None."""
+        folder = os.path.join(self.objects_dir, content_hash[:2])
+        try:
+            for name in os.listdir(folder):
+                if name.startswith(content_hash) and not name.endswith('.tmp'):
+                    return os.path.join(folder, name)
+        except OSError:
+            pass
+        return None
+
+    def contains(self, path):
+        try:
+            return os.path.commonpath([os.path.abspath(path), os.path.abspath(self.objects_dir)]) == os.path.abspath(self.objects_dir)
+        except ValueError:
+            # different drives on windows
+            return False
+
+    def add(self, path, content_hash=None):
+        """Store a file; returns (content hash, stored path, how) with how in
+        'stored', 'reflink', 'hardlink' or 'copy' ( 'stored' when it was already there ).
+        """
+        if self.contains(path):
+            name = os.path.splitext(os.path.basename(path))[0]
+            return name, path, 'stored'
+        content_hash = content_hash or file_content_hash(path)
+        dest = self.object_path(content_hash, os.path.splitext(path)[1])
+        if os.path.exists(dest):
+            return content_hash, dest, 'stored'
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp = dest + '.tmp'
+        if _reflink(path, tmp):
+            how = 'reflink'
+        else:
+            try:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                os.link(path, tmp)
+                how = 'hardlink'
+            except OSError:
+                shutil.copy2(path, tmp)
+                how = 'copy'
+        os.replace(tmp, dest)
+        return content_hash, dest, how
+
+    def iter_objects(self):
+        # (content hash, path) of every stored object
+        if not self.exists():
+            return
+        for folder in os.listdir(self.objects_dir):
+            full = os.path.join(self.objects_dir, folder)
+            if not os.path.isdir(full):
+                continue
+            for name in os.listdir(full):
+                yield os.path.splitext(name)[0], os.path.join(full, name)
+
+    def gc(self, keep_hashes, dry_run=False):
+        """Remove objects whose hash isn't in keep_hashes; returns (files removed, bytes freed)."""
+        keep = set(keep_hashes)
+        removed = 0
+        freed = 0
+        for content_hash, path in list(self.iter_objects()):
+            # leftovers from an interrupted add are never referenced
+            if content_hash in keep and not path.endswith('.tmp'):
+                continue
+            try:
+                size = os.path.getsize(path)
+                if not dry_run:
+                    os.remove(path)
+            except OSError:
+                continue
+            removed += 1
+            freed += size
+        if not dry_run:
+            for folder in os.listdir(self.objects_dir) if self.exists() else []:
+                full = os.path.join(self.objects_dir, folder)
+                try:
+                    if os.path.isdir(full) and not os.listdir(full):
+                        os.rmdir(full)
+                except OSError:
+                    pass
+        return removed, freed
+
+
+def referenced_hashes(posts):
+    return {m['media_hash'] for p in posts for m in (p.get('media', []) or []) if m.get('media_hash')}
@@ -0,0 +1,700 @@
+import os
+import re
+import json
+import hashlib
+import math
+import struct
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from PyQt6.QtGui import QImage, QImageReader
+from PyQt6.QtCore import Qt, QSize
+
+# NumPy is optional; it makes hashing and duplicate matching over large libraries much faster
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Media analysis helpers for pxlPostPrepper
+#   Perceptual hashes ( pHash ) and near-duplicate matching
+#   Carousel grouping from capture time, filename sequences and colour histograms
+#   Header-only media metadata ( size, orientation, duration ) for images and mp4/mov/webm
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.webp')
+MP4_EXTENSIONS = ('.mp4', '.mov', '.m4v')
+WEBM_EXTENSIONS = ('.webm', '.mkv')
+
+PHASH_SIZE = 32  # images are reduced to 32x32 grayscale before the DCT
+PHASH_LOW = 8  # the top-left 8x8 DCT coefficients make the 64 bit hash
+DUPLICATE_DISTANCE = 6  # max differing bits ( of 64 ) to call two images near-duplicates
+
+CAROUSEL_MAX_ITEMS = 10  # Instagram's carousel limit
+GROUP_TIME_GAP = 120  # seconds between captures that still count as the same set
+GROUP_SEQUENCE_GAP = 2  # max step between numbered filenames, ie shot_0012 -> shot_0014
+GROUP_MIN_SIMILARITY = 0.55  # colour histogram intersection below this splits a set
+HIST_SIZE = 64  # images are reduced to 64x64 for colour histograms
+HIST_LEVELS = 4  # levels per channel; 4x4x4 = 64 bins
+
+
+def is_image_path(path):
+    return bool(path) and path.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def file_content_hash(path, chunk_size=1 << 20):
+    """sha1 of a file's contents, read in chunks."""
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def file_cache_key(path):
+    # path + mtime + size; changes whenever the file is re-written
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}"
+
+
+def read_gray_pixels(path, size):
+    """Decode an image straight to size x size grayscale.
+
+    Returns a list of rows ( lists of 0-255 ints ), or None if it can't be read.
+    QImageReader decodes JPEGs at a reduced scale, so big files stay cheap.
+    """
+    reader = QImageReader(path)
+    reader.setAutoTransform(True)
+    reader.setScaledSize(QSize(size, size))
+    img = reader.read()
+    if img.isNull():
+        return None
+    if img.width() != size or img.height() != size:
+        img = img.scaled(size, size, Qt.AspectRatioMode.IgnoreAspectRatio, Qt.TransformationMode.SmoothTransformation)
+    img = img.convertToFormat(QImage.Format.Format_Grayscale8)
+    ptr = img.constBits()
+    ptr.setsize(img.sizeInBytes())
+    raw = bytes(ptr)
+    stride = img.bytesPerLine()
+    return [list(raw[y * stride:y * stride + size]) for y in range(size)]
+
+
+def _dct_rows(n, count):
+    # first `count` rows of the orthonormal DCT-II matrix for n samples
+    rows = []
+    for u in range(count):
+        scale = math.sqrt(1.0 / n) if u == 0 else math.sqrt(2.0 / n)
+        rows.append([scale * math.cos(math.pi * (2 * x + 1) * u / (2 * n)) for x in range(n)])
+    return rows
+
+
+_DCT = _dct_rows(PHASH_SIZE, PHASH_LOW)
+_DCT_NP = np.array(_DCT) if np is not None else None
+
+
+def phash_from_pixels(pixels):
+    """64 bit perceptual hash from PHASH_SIZE x PHASH_SIZE grayscale rows."""
+    if np is not None:
+        img = np.asarray(pixels, dtype=np.float64)
+        low = _DCT_NP @ img @ _DCT_NP.T
+        coeffs = low.flatten()
+    else:
+        # only the low 8 frequencies are needed, so this is 8x32 @ 32x32 @ 32x8
+        cols = list(zip(*pixels))
+        tmp = [[sum(c * v for c, v in zip(drow, col)) for col in cols] for drow in _DCT]
+        coeffs = [sum(t * c for t, c in zip(trow, drow)) for trow in tmp for drow in _DCT]
+    # skip the DC term when picking the threshold; it only reflects overall brightness
+    values = list(coeffs)
+    median = sorted(values[1:])[len(values[1:]) // 2]
+    bits = 0
+    for i, v in enumerate(values):
+        if v > median:
+            bits |= 1 << i
+    return bits
+
+
+def compute_phash(path):
+    pixels = read_gray_pixels(path, PHASH_SIZE)
+    if pixels is None:
+        return None
+    return phash_from_pixels(pixels)
+
+
+class PhashCache:
+    """On-disk cache of perceptual hashes keyed by path + mtime + size."""
+
+    def __init__(self, cache_file):
+        self.cache_file = cache_file
+        self.entries = {}
+        self._dirty = False
+        if cache_file and os.path.exists(cache_file):
+            try:
+                with open(cache_file, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except Exception:
+                self.entries = {}
+
+    def get(self, key):
+        value = self.entries.get(key)
+        return int(value, 16) if value else None
+
+    def put(self, key, value):
+        self.entries[key] = format(value, '016x')
+        self._dirty = True
+
+    def prune(self, keep_keys):
+        # drop hashes of files that changed or are no longer in the library
+        keep = set(keep_keys)
+        stale = [k for k in self.entries if k not in keep]
+        for k in stale:
+            del self.entries[k]
+        self._dirty = self._dirty or bool(stale)
+
+    def save(self):
+        if not self._dirty or not self.cache_file:
+            return
+        tmp = self.cache_file + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f)
+        os.replace(tmp, self.cache_file)
+        self._dirty = False
+
+
+def hash_images(paths, cache, progress=None, cancelled=None, workers=None):
+    """Perceptual hashes for image paths, using and filling the cache.
+
+    Returns {path: hash}. Only files missing from the cache are decoded, on a thread pool.
+    """
+    hashes = {}
+    todo = []
+    keys = {}
+    for path in paths:
+        key = file_cache_key(path)
+        if key is None:
+            continue
+        keys[path] = key
+        cached = cache.get(key)
+        if cached is not None:
+            hashes[path] = cached
+        else:
+            todo.append(path)
+    done = len(hashes)
+    total = len(keys)
+    if progress:
+        progress(done, total)
+    if todo:
+        workers = workers or max(2, (os.cpu_count() or 2) - 1)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for path, value in zip(todo, pool.map(compute_phash, todo)):
+                if cancelled and cancelled():
+                    break
+                done += 1
+                if value is not None:
+                    hashes[path] = value
+                    cache.put(keys[path], value)
+                if progress and done % 64 == 0:
+                    progress(done, total)
+    cache.prune(keys.values())
+    if progress:
+        progress(done, total)
+    return hashes
+
+
+def _popcount_np(x):
+    # per-element bit counts of a uint64 array
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(x)
+    table = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+    return table[x.view(np.uint8)].reshape(x.shape + (8,)).sum(axis=-1)
+
+
+def _bucket_pairs_np(hashes, members, max_distance, block=256):
+    # all pairs within one bucket, compared a block of rows at a time to bound memory
+    sub = hashes[members]
+    for start in range(0, len(sub), block):
+        chunk = sub[start:start + block]
+        dist = _popcount_np(chunk[:, None] ^ sub[None, start:])
+        for i, j in zip(*np.nonzero(dist <= max_distance)):
+            if j > i:
+                yield int(members[start + i]), int(members[start + j]), int(dist[i, j])
+
+
+def _bucket_pairs_py(values, members, max_distance):
+    for x, a in enumerate(members):
+        va = values[a]
+        for b in members[x + 1:]:
+            d = (va ^ values[b]).bit_count()
+            if d <= max_distance:
+                yield a, b, d
+
+
+def _near_pairs(values, max_distance, bits=64):
+    # Multi-index hashing: split hashes into max_distance + 1 chunks. Two hashes within
+    #   max_distance bits must agree exactly on at least one chunk, so only hashes
+    #   sharing a chunk bucket are compared, instead of every pair in the library.
+    parts = max_distance + 1
+    edges = [bits * i // parts for i in range(parts + 1)]
+    hashes = np.array(values, dtype=np.uint64) if np is not None else None
+    seen = set()
+    pairs = []
+    for lo, hi in zip(edges, edges[1:]):
+        mask = (1 << (hi - lo)) - 1
+        buckets = {}
+        for i, value in enumerate(values):
+            buckets.setdefault((value >> lo) & mask, []).append(i)
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            if hashes is not None:
+                found = _bucket_pairs_np(hashes, np.array(members), max_distance)
+            else:
+                found = _bucket_pairs_py(values, members, max_distance)
+            for a, b, d in found:
+                if (a, b) not in seen:
+                    seen.add((a, b))
+                    pairs.append((a, b, d))
+    return pairs
+
+
+def find_near_duplicates(hashes, max_distance=DUPLICATE_DISTANCE):
+    """Near-duplicate pairs from {path: hash}.
+
+    Returns {path: [(other path, distance), ...]} for every path that has a match.
+    """
+    paths = list(hashes)
+    values = [hashes[p] for p in paths]
+    pairs = _near_pairs(values, max_distance)
+    matches = {}
+    for a, b, d in pairs:
+        matches.setdefault(paths[a], []).append((paths[b], d))
+        matches.setdefault(paths[b], []).append((paths[a], d))
+    for found in matches.values():
+        found.sort(key=lambda item: item[1])
+    return matches
+
+
+# -- Carousel grouping --
+
+EXIF_ORIENTATION = 0x0112
+EXIF_DATETIME = 0x0132
+EXIF_IFD_POINTER = 0x8769
+EXIF_DATETIME_ORIGINAL = 0x9003
+
+
+def _parse_tiff_ifds(data):
+    """Tags from a TIFF/EXIF block's first IFD and its EXIF sub-IFD.
+
+    Only SHORT, LONG and ASCII values are read; that covers orientation and dates.
+    """
+    if len(data) < 8 or data[:2] not in (b'II', b'MM'):
+        return {}
+    endian = '<' if data[:2] == b'II' else '>'
+    tags = {}
+
+    def read_ifd(offset):
+        if offset + 2 > len(data):
+            return
+        count = struct.unpack_from(endian + 'H', data, offset)[0]
+        for i in range(count):
+            entry = offset + 2 + i * 12
+            if entry + 12 > len(data):
+                break
+            tag, kind, num = struct.unpack_from(endian + 'HHI', data, entry)
+            if kind == 3:  # SHORT
+                tags[tag] = struct.unpack_from(endian + 'H', data, entry + 8)[0]
+            elif kind == 4:  # LONG
+                tags[tag] = struct.unpack_from(endian + 'I', data, entry + 8)[0]
+            elif kind == 2:  # ASCII, stored inline when 4 bytes or less
+                start = entry + 8 if num <= 4 else struct.unpack_from(endian + 'I', data, entry + 8)[0]
+                tags[tag] = data[start:start + num].split(b'\0', 1)[0].decode('ascii', 'replace')
+
+    read_ifd(struct.unpack_from(endian + 'I', data, 4)[0])
+    exif_offset = tags.get(EXIF_IFD_POINTER)
+    if isinstance(exif_offset, int):
+        read_ifd(exif_offset)
+    return tags
+
+
+def read_exif(path, max_bytes=1 << 18):
+    """EXIF tags from a JPEG's APP1 segment, reading only the file header. {} if there are none."""
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(max_bytes)
+    except OSError:
+        return {}
+    if head[:2] != b'\xff\xd8':
+        return {}
+    pos = 2
+    while pos + 4 <= len(head) and head[pos] == 0xFF:
+        marker = head[pos + 1]
+        if marker in (0xD9, 0xDA):
+            # end of image / start of scan; metadata is all before this
+            break
+        length = struct.unpack_from('>H', head, pos + 2)[0]
+        if marker == 0xE1 and head[pos + 4:pos + 10] == b'Exif\0\0':
+            return _parse_tiff_ifds(head[pos + 10:pos + 2 + length])
+        pos += 2 + length
+    return {}
+
+
+def capture_time(path, exif=None):
+    """Capture timestamp from EXIF, falling back to the file's mtime."""
+    exif = read_exif(path) if exif is None else exif
+    for tag in (EXIF_DATETIME_ORIGINAL, EXIF_DATETIME):
+        value = exif.get(tag)
+        if isinstance(value, str):
+            try:
+                return datetime.strptime(value.strip(), '%Y:%m:%d %H:%M:%S').timestamp()
+            except ValueError:
+                pass
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+_SEQUENCE_RE = re.compile(r'^(.*?)(\d+)$')
+
+
+def filename_sequence(path):
+    """(folder + name prefix, frame number) for numbered files like render_0012.png, or None."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    match = _SEQUENCE_RE.match(stem)
+    if not match:
+        return None
+    prefix = os.path.join(os.path.dirname(os.path.abspath(path)), match.group(1).rstrip(' _-.').lower())
+    return prefix, int(match.group(2))
+
+
+def read_rgb_pixels(path, size):
+    """size x size RGB888 bytes for an image ( rows packed ), or None."""
+    reader = QImageReader(path)
+    reader.setAutoTransform(True)
+    reader.setScaledSize(QSize(size, size))
+    img = reader.read()
+    if img.isNull():
+        return None
+    if img.width() != size or img.height() != size:
+        img = img.scaled(size, size, Qt.AspectRatioMode.IgnoreAspectRatio, Qt.TransformationMode.SmoothTransformation)
+    img = img.convertToFormat(QImage.Format.Format_RGB888)
+    ptr = img.constBits()
+    ptr.setsize(img.sizeInBytes())
+    raw = bytes(ptr)
+    stride = img.bytesPerLine()
+    row = size * 3
+    if stride == row:
+        return raw
+    return b''.join(raw[y * stride:y * stride + row] for y in range(size))
+
+
+def color_histograms(pixel_sets):
+    """Normalized HIST_LEVELS^3 bin colour histograms for a batch of RGB888 buffers.
+
+    Entries that are None ( videos, unreadable files ) get None back.
+    """
+    bins = HIST_LEVELS ** 3
+    shift = 8 - (HIST_LEVELS - 1).bit_length()
+    present = [i for i, px in enumerate(pixel_sets) if px is not None]
+    hists = [None] * len(pixel_sets)
+    if not present:
+        return hists
+    if np is not None:
+        # one bincount over the whole batch, offset per image
+        stack = np.stack([np.frombuffer(pixel_sets[i], dtype=np.uint8).reshape(-1, 3) for i in present])
+        q = (stack >> shift).astype(np.int64)
+        idx = (q[..., 0] * HIST_LEVELS + q[..., 1]) * HIST_LEVELS + q[..., 2]
+        idx += (np.arange(len(present)) * bins)[:, None]
+        counts = np.bincount(idx.ravel(), minlength=len(present) * bins).reshape(len(present), bins)
+        counts = counts / counts.sum(axis=1, keepdims=True)
+        for row, i in enumerate(present):
+            hists[i] = counts[row]
+        return hists
+    for i in present:
+        px = pixel_sets[i]
+        counts = [0] * bins
+        for p in range(0, len(px), 3):
+            counts[((px[p] >> shift) * HIST_LEVELS + (px[p + 1] >> shift)) * HIST_LEVELS + (px[p + 2] >> shift)] += 1
+        total = float(sum(counts)) or 1.0
+        hists[i] = [c / total for c in counts]
+    return hists
+
+
+def histogram_similarity(a, b):
+    # histogram intersection; 1.0 for identical colour distributions
+    if a is None or b is None:
+        return None
+    if np is not None:
+        return float(np.minimum(a, b).sum())
+    return sum(min(x, y) for x, y in zip(a, b))
+
+
+def carousel_features(paths, progress=None, cancelled=None, workers=None):
+    """Capture time, filename sequence and colour histogram for each path, in order."""
+    def probe(path):
+        image = is_image_path(path)
+        exif = read_exif(path) if image else {}
+        pixels = read_rgb_pixels(path, HIST_SIZE) if image else None
+        return capture_time(path, exif), filename_sequence(path), pixels
+
+    results = []
+    workers = workers or max(2, (os.cpu_count() or 2) - 1)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for done, result in enumerate(pool.map(probe, paths), 1):
+            if cancelled and cancelled():
+                return None
+            results.append(result)
+            if progress and done % 64 == 0:
+                progress(done, len(paths))
+    if progress:
+        progress(len(results), len(paths))
+    hists = color_histograms([r[2] for r in results])
+    return [{'time': r[0], 'sequence': r[1], 'hist': h} for r, h in zip(results, hists)]
+
+
+def _same_set(a, b):
+    # b directly follows a; do they look like part of one shoot / render set?
+    time_close = a['time'] is not None and b['time'] is not None and abs(b['time'] - a['time']) <= GROUP_TIME_GAP
+    seq_a, seq_b = a['sequence'], b['sequence']
+    seq_close = seq_a is not None and seq_b is not None and seq_a[0] == seq_b[0] \
+        and 0 < seq_b[1] - seq_a[1] <= GROUP_SEQUENCE_GAP
+    if not (time_close or seq_close):
+        return False
+    # a big change in colour splits the set even when the timing matches
+    similarity = histogram_similarity(a['hist'], b['hist'])
+    return similarity is None or similarity >= GROUP_MIN_SIMILARITY
+
+
+def group_carousels(features, max_items=CAROUSEL_MAX_ITEMS):
+    """Split consecutive items into carousel groups.
+
+    features are in post order; None entries can't be grouped and break a run.
+    Returns lists of indices, only for groups of 2 or more, each at most max_items long.
+    """
+    groups = []
+    current = []
+    for i, feat in enumerate(features):
+        if feat is not None and current and len(current) < max_items and _same_set(features[current[-1]], feat):
+            current.append(i)
+            continue
+        if len(current) > 1:
+            groups.append(current)
+        current = [i] if feat is not None else []
+    if len(current) > 1:
+        groups.append(current)
+    return groups
+
+
+# -- Header-only metadata --
+
+# EXIF orientation tag -> clockwise rotation; mirrored orientations use their rotation
+_EXIF_ROTATION = {1: 0, 2: 0, 3: 180, 4: 180, 5: 90, 6: 90, 7: 270, 8: 270}
+
+
+def probe_image(path):
+    """(width, height, rotation) of an image as displayed, from its header only."""
+    reader = QImageReader(path)
+    size = reader.size()
+    if not size.isValid():
+        return None
+    rotation = 0
+    if path.lower().endswith(('.jpg', '.jpeg')):
+        rotation = _EXIF_ROTATION.get(read_exif(path).get(EXIF_ORIENTATION), 0)
+    width, height = size.width(), size.height()
+    if rotation in (90, 270):
+        width, height = height, width
+    return width, height, rotation
+
+
+def _iter_boxes(f, start, end):
+    # ( type, payload offset, payload end ) of each ISO-BMFF box in [start, end)
+    pos = start
+    while pos + 8 <= end:
+        f.seek(pos)
+        head = f.read(16)
+        if len(head) < 8:
+            return
+        size, kind = struct.unpack('>I4s', head[:8])
+        header = 8
+        if size == 1 and len(head) >= 16:
+            size = struct.unpack('>Q', head[8:16])[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            return
+        yield kind, pos + header, min(pos + size, end)
+        pos += size
+
+
+def _matrix_rotation(a, b):
+    # rotation from the first row of a tkhd transform matrix ( 16.16 fixed point )
+    if a == 0 and b == 0x10000:
+        return 90
+    if a == 0 and b == -0x10000:
+        return 270
+    if a == -0x10000 and b == 0:
+        return 180
+    return 0
+
+
+def probe_mp4(path):
+    """(width, height, rotation, duration seconds) from an mp4/mov moov box.
+
+    Boxes are walked with seeks, so the media data itself is never read,
+    even when the moov box is stored at the end of the file.
+    """
+    width = height = rotation = 0
+    duration = None
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        moov = next(((s, e) for kind, s, e in _iter_boxes(f, 0, end) if kind == b'moov'), None)
+        if moov is None:
+            return None
+        for kind, s, e in list(_iter_boxes(f, *moov)):
+            if kind == b'mvhd':
+                f.seek(s)
+                data = f.read(32)
+                if data[0] == 1:
+                    timescale, length = struct.unpack_from('>IQ', data, 20)
+                else:
+                    timescale, length = struct.unpack_from('>II', data, 12)
+                if timescale:
+                    duration = length / float(timescale)
+            elif kind == b'trak' and not width:
+                for sub, ss, se in _iter_boxes(f, s, e):
+                    if sub != b'tkhd':
+                        continue
+                    f.seek(ss)
+                    data = f.read(se - ss)
+                    # version 1 headers have 64 bit times, 12 bytes longer
+                    base = 52 if data[0] == 1 else 40
+                    a, b = struct.unpack_from('>ii', data, base)
+                    w, h = struct.unpack_from('>II', data, base + 36)
+                    if w and h:
+                        width, height = w >> 16, h >> 16
+                        rotation = _matrix_rotation(a, b)
+    if rotation in (90, 270):
+        width, height = height, width
+    return width, height, rotation, duration
+
+
+_EBML_SEGMENT = 0x18538067
+_EBML_INFO = 0x1549A966
+_EBML_TRACKS = 0x1654AE6B
+_EBML_CLUSTER = 0x1F43B675
+_EBML_TIMECODE_SCALE = 0x2AD7B1
+_EBML_DURATION = 0x4489
+_EBML_TRACK_ENTRY = 0xAE
+_EBML_VIDEO = 0xE0
+_EBML_PIXEL_WIDTH = 0xB0
+_EBML_PIXEL_HEIGHT = 0xBA
+
+
+def _read_vint(f, keep_marker):
+    first = f.read(1)
+    if not first:
+        return None, 0
+    b = first[0]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not b & mask:
+        mask >>= 1
+        length += 1
+    if length > 8:
+        return None, 0
+    value = b if keep_marker else b & (mask - 1)
+    rest = f.read(length - 1)
+    unknown = not keep_marker and value == mask - 1 and all(c == 0xFF for c in rest)
+    for c in rest:
+        value = (value << 8) | c
+    return (-1 if unknown else value), length
+
+
+def probe_webm(path):
+    """(width, height, 0, duration seconds) from a webm/mkv's Info and Tracks elements."""
+    found = {'scale': 1000000}
+
+    def walk(f, end):
+        while f.tell() < end:
+            eid, _ = _read_vint(f, True)
+            size, _ = _read_vint(f, False)
+            if eid is None or size is None:
+                return False
+            start = f.tell()
+            if eid == _EBML_CLUSTER:
+                # media data starts here; Info and Tracks come before it
+                return False
+            if eid in (_EBML_SEGMENT, _EBML_INFO, _EBML_TRACKS, _EBML_TRACK_ENTRY, _EBML_VIDEO):
+                stop = end if size < 0 else start + size
+                if walk(f, stop) is False:
+                    return False
+            elif eid == _EBML_TIMECODE_SCALE and 0 < size <= 8:
+                found['scale'] = int.from_bytes(f.read(size), 'big')
+            elif eid in (_EBML_PIXEL_WIDTH, _EBML_PIXEL_HEIGHT) and 0 < size <= 8:
+                # first video track wins
+                found.setdefault('width' if eid == _EBML_PIXEL_WIDTH else 'height', int.from_bytes(f.read(size), 'big'))
+            elif eid == _EBML_DURATION and size in (4, 8):
+                found['duration'] = struct.unpack('>f' if size == 4 else '>d', f.read(size))[0]
+            if size < 0:
+                return False
+            f.seek(start + size)
+            if 'width' in found and 'height' in found and 'duration' in found:
+                return False
+        return True
+
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        f.seek(0)
+        walk(f, end)
+    if 'width' not in found:
+        return None
+    duration = found.get('duration')
+    if duration is not None:
+        duration = duration * found['scale'] / 1e9
+    return found['width'], found.get('height', 0), 0, duration
+
+
+def probe_media(path, known=None, content_hash=None):
+    """Metadata for a media file, reading only its headers.
+
+    Returns {'width', 'height', 'bytes', 'mtime', 'orientation', 'duration', 'hash'},
+    or None if the file is missing or `known` is still current for it.
+    width / height are as displayed, after orientation; orientation is the
+    clockwise rotation in degrees. The whole file is never read: hash is content_hash
+    when given, else None, for export or hosting to fill in when they need it.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if known and known.get('bytes') == st.st_size and known.get('mtime') == st.st_mtime_ns and 'width' in known:
+        return None
+    low = path.lower()
+    info = None
+    try:
+        if low.endswith(MP4_EXTENSIONS):
+            info = probe_mp4(path)
+        elif low.endswith(WEBM_EXTENSIONS):
+            info = probe_webm(path)
+        else:
+            image = probe_image(path)
+            if image is not None:
+                info = image + (None,)
+    except (OSError, struct.error, IndexError, ValueError):
+        info = None
+    width, height, rotation, duration = info if info else (None, None, 0, None)
+    return {
+        'width': width,
+        'height': height,
+        'bytes': st.st_size,
+        'mtime': st.st_mtime_ns,
+        'orientation': rotation,
+        'duration': round(duration, 3) if duration is not None else None,
+        'hash': content_hash
+    }
@@ -1,20 +1,57 @@
 import sys
 import os
 import json
+import hashlib
+from collections import OrderedDict
 from datetime import datetime
 from functools import partial
 import random
+import fnmatch
+import threading
+import time
+import queue
+import re
+import bisect
+import multiprocessing
+import uuid
 from PyQt6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
     QPushButton, QLineEdit, QComboBox, QFileDialog, QTextEdit, QCheckBox,
-    QScrollArea, QSizePolicy, QDateTimeEdit, QListWidget, QListWidgetItem, QInputDialog, QSplitter
+    QScrollArea, QSizePolicy, QDateTimeEdit, QListWidget, QListWidgetItem, QInputDialog, QSplitter,
+    QListView, QStyledItemDelegate, QStyle, QStyleOptionButton, QAbstractItemView,
+    QDialog, QDialogButtonBox, QProgressDialog
+)
+from PyQt6.QtGui import QPixmap, QIcon, QColor, QFont, QImage, QImageReader, QImageIOHandler, QPainter
+from PyQt6.QtCore import (
+    Qt, QAbstractListModel, QModelIndex, QSize, QObject, QRunnable, QThreadPool,
+    QStandardPaths, QTimer, QThread, QFileSystemWatcher, pyqtSignal
 )
-from PyQt6.QtGui import QPixmap, QIcon
-from PyQt6.QtCore import Qt
 from PyQt6.QtWidgets import QMessageBox
+from pxlProjectStore import ProjectStore, is_project_db, docs_to_json_text, write_text_atomic
+from pxlMediaTools import (
+    PhashCache, hash_images, find_near_duplicates, is_image_path, carousel_features, group_carousels,
+    file_content_hash, probe_media
+)
+from pxlPostValidator import PostValidator, ERROR as VALIDATION_ERROR, WARNING as VALIDATION_WARNING
+from pxlExport import build_export_jobs, run_export, default_export_dir
+from pxlMediaHost import MediaHost, build_host_jobs, hosted_entry
+from pxlMediaStore import MediaStore, store_path_for, referenced_hashes
 
 pxlPostPrepperVersion = "0.0.1"
 
+# Largest size the preview is ever shown at (Instagram-like 4:5 maximum)
+PREVIEW_CAP_W = 1080
+PREVIEW_CAP_H = 1350
+# Smallest pre-scaled preview level kept in the pyramid
+PREVIEW_MIN_LEVEL = 240
+
+# Media file types picked up when importing a directory
+IMPORT_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.mp4', '.mov', '.webm')
+IMPORT_DEFAULT_INCLUDE = ';'.join('*' + ext for ext in IMPORT_EXTENSIONS)
+
+# disk thumbnail cache; trimmed back to 80% of this, least recently used first, at startup
+THUMBNAIL_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
 def resource_path(relative_path):
     # When running from a PyInstaller bundle, data files are unpacked to _MEIPASS
     if getattr(sys, "frozen", False):
@@ -23,6 +60,1452 @@ def resource_path(relative_path):
         base = os.path.dirname(__file__)
     return os.path.join(base, relative_path)
 
+
+def post_has_posted(post):
+    # has_posted may still be top-level on posts that haven't been normalized yet
+    local = post.get('local_data', {}) or {}
+    return bool(post.get('has_posted', local.get('has_posted', False)))
+
+
+def media_file_path(m):
+    # prefer file_path, fall back to URL
+    return m.get('file_path') or m.get('file') or m.get('URL')
+
+
+def remember_content_hash(m, src, size, mtime, content_hash):
+    """Keep a hash export or hosting read in m's metadata, for the next export or upload.
+
+    Probing only reads headers, so this is where the metadata gets its hash. True if it changed.
+    """
+    meta = m.get('metadata')
+    if not content_hash or not isinstance(meta, dict) or src != (m.get('file_path') or m.get('file')):
+        return False
+    if meta.get('bytes') != size or meta.get('mtime') != mtime or meta.get('hash') == content_hash:
+        return False
+    meta['hash'] = content_hash
+    return True
+
+
+def ensure_post_id(post):
+    # a stable id for the post, kept across edits; postToInstagram's posting ledger is keyed on it
+    local = post.get('local_data')
+    if not isinstance(local, dict):
+        local = post['local_data'] = {}
+    if not local.get('post_id'):
+        local['post_id'] = uuid.uuid4().hex
+    return local['post_id']
+
+
+def normalize_loaded_post(p):
+    """Build the editor's post dict from a post as read from a project json."""
+    # preserve and normalize local_data
+    ensure_post_id(p)
+    local = p['local_data']
+    # ensure has_posted is carried into local_data whether it's top-level or inside local_data
+    local['has_posted'] = post_has_posted(p)
+    # normalize keywords to list
+    kws = local.get('keywords', [])
+    if isinstance(kws, str):
+        kws = [k.strip() for k in kws.split(',') if k.strip()]
+    if kws is None:
+        kws = []
+    local.setdefault('post_name', '')
+    local.setdefault('date_modified', datetime.now().replace(microsecond=0).isoformat())
+    local['keywords'] = kws
+
+    post = {
+        'post_kind': p.get('post_kind', 'single'),
+        'caption': p.get('caption', ''),
+        'media': [],
+        'scheduled_time': p.get('scheduled_time'),
+        'post_options': p.get('post_options', {}),
+        'local_data': local
+    }
+    for m in p.get('media', []) or []:
+        media_entry = {
+            'file_path': media_file_path(m),
+            'URL': m.get('URL'),
+            'type': m.get('type', 'image'),
+            'description': m.get('description', ''),
+            'alt_text': m.get('alt_text', ''),
+            'user_tags': m.get('user_tags', []),
+            'location': m.get('location', {'id': None, 'name': None})
+        }
+        # probed header metadata; kept as the same dict so an in-flight probe still lands here
+        if isinstance(m.get('metadata'), dict):
+            media_entry['metadata'] = m['metadata']
+        # export settings, the last export's output, the media store reference and the hosted copy
+        for key in ('image_processing', 'video_processing', 'export', 'media_hash', 'source_path', 'hosted'):
+            if key in m:
+                media_entry[key] = m[key]
+        post['media'].append(media_entry)
+    return post
+
+
+class PostListModel(QAbstractListModel):
+    """List model over the project's posts, used by the virtualized post bar.
+
+    The model holds a reference to the same list as pxlPostPrepper.posts, so edits
+    to a single post only need a row-level dataChanged rather than a rebuild.
+    When the post bar is filtered, visible holds the post indices being shown;
+    methods taking a post index map it to the view row themselves.
+    """
+    PostedRole = Qt.ItemDataRole.UserRole + 1
+    SelectedRole = Qt.ItemDataRole.UserRole + 2
+    StatusRole = Qt.ItemDataRole.UserRole + 3
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.posts = []
+        self.current_index = None
+        self.validator = None  # PostValidator for the status badges
+        self.visible = None
+        self._visible_row = {}
+
+    def set_posts(self, posts, visible=None):
+        # full reset; only used when the post list is replaced, restructured or filtered
+        self.beginResetModel()
+        self.posts = posts
+        self.visible = visible
+        self._visible_row = {idx: row for row, idx in enumerate(visible)} if visible is not None else {}
+        self.endResetModel()
+
+    def append_posts(self, new_posts):
+        # append posts to the shared list, notifying views of only the new rows
+        if not new_posts:
+            return
+        if self.visible is not None:
+            # filtered; the caller re-applies the filter to decide what shows
+            self.posts.extend(new_posts)
+            return
+        first = len(self.posts)
+        self.beginInsertRows(QModelIndex(), first, first + len(new_posts) - 1)
+        self.posts.extend(new_posts)
+        self.endInsertRows()
+
+    def post_index(self, row):
+        # view row -> index into posts
+        if self.visible is None:
+            return row
+        if 0 <= row < len(self.visible):
+            return self.visible[row]
+        return None
+
+    def view_row(self, index):
+        # index into posts -> view row, None when filtered out
+        if index is None:
+            return None
+        if self.visible is None:
+            return index
+        return self._visible_row.get(index)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        if self.visible is not None:
+            return len(self.visible)
+        return len(self.posts)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        idx = self.post_index(index.row())
+        if idx is None or idx < 0 or idx >= len(self.posts):
+            return None
+        local = self.posts[idx].get('local_data', {}) or {}
+        if role == Qt.ItemDataRole.DisplayRole:
+            name = local.get('post_name') or ''
+            title = name if name else f"Post {idx+1}"
+            return f"{idx+1} : {title}"
+        if role == self.PostedRole:
+            return post_has_posted(self.posts[idx])
+        if role == self.SelectedRole:
+            return self.current_index == idx
+        if role == self.StatusRole:
+            return self.validator.status(self.posts[idx]) if self.validator else None
+        if role == Qt.ItemDataRole.ToolTipRole and self.validator:
+            issues = self.validator.issues(self.posts[idx])
+            return '\n'.join(f"[{level}] {msg}" for level, msg in issues) if issues else None
+        return None
+
+    def refresh_row(self, index):
+        # Notify views that a single post changed (name, posted state, selection)
+        if index is None or index < 0 or index >= len(self.posts):
+            return
+        row = self.view_row(index)
+        if row is None:
+            return
+        idx = self.index(row, 0)
+        self.dataChanged.emit(idx, idx)
+
+    def refresh_all(self):
+        # repaint every row, ie after the whole project was validated
+        if self.rowCount():
+            self.dataChanged.emit(self.index(0, 0), self.index(self.rowCount() - 1, 0))
+
+    def set_current_index(self, index):
+        prev = self.current_index
+        self.current_index = index
+        if prev != index:
+            self.refresh_row(prev)
+        self.refresh_row(index)
+
+
+class PostItemDelegate(QStyledItemDelegate):
+    """Paints post bar rows as buttons, coloured by the posted / selected state.
+
+    Posts that wouldn't pass Instagram's checks get a red ( error ) or amber ( warning ) badge.
+    """
+    ROW_HEIGHT = 40
+    ROW_SPACING = 4
+    BADGE_SIZE = 10
+    BADGE_COLORS = {VALIDATION_ERROR: '#d05050', VALIDATION_WARNING: '#d0a040'}
+
+    def sizeHint(self, option, index):
+        return QSize(max(1, option.rect.width()), self.ROW_HEIGHT + self.ROW_SPACING)
+
+    def paint(self, painter, option, index):
+        is_selected = bool(index.data(PostListModel.SelectedRole))
+        posted = bool(index.data(PostListModel.PostedRole))
+        text = index.data(Qt.ItemDataRole.DisplayRole) or ''
+        rect = option.rect.adjusted(0, 0, 0, -self.ROW_SPACING)
+
+        # Same colours the post bar buttons used
+        if is_selected and posted:
+            bg, fg = '#96b596', 'black'
+        elif is_selected:
+            bg, fg = '#707070', None
+        elif posted:
+            bg, fg = '#6eac6f', 'black'
+        else:
+            bg, fg = None, None
+
+        painter.save()
+        if bg is None:
+            # Default rows are drawn with the native push button look
+            btn_opt = QStyleOptionButton()
+            btn_opt.rect = rect
+            btn_opt.text = text
+            btn_opt.palette = option.palette
+            btn_opt.state = QStyle.StateFlag.State_Enabled | QStyle.StateFlag.State_Raised
+            if option.state & QStyle.StateFlag.State_MouseOver:
+                btn_opt.state |= QStyle.StateFlag.State_MouseOver
+            style = option.widget.style() if option.widget else QApplication.style()
+            style.drawControl(QStyle.ControlElement.CE_PushButton, btn_opt, painter, option.widget)
+        else:
+            painter.fillRect(rect, QColor(bg))
+            font = QFont(option.font)
+            font.setBold(is_selected)
+            painter.setFont(font)
+            painter.setPen(QColor(fg) if fg else option.palette.buttonText().color())
+            painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, text)
+        badge = self.BADGE_COLORS.get(index.data(PostListModel.StatusRole))
+        if badge:
+            size = self.BADGE_SIZE
+            painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(QColor(badge))
+            painter.drawEllipse(rect.right() - size - 6, rect.center().y() - size // 2, size, size)
+        painter.restore()
+
+
+def _cache_dir(name):
+    # Per-user cache folder for the tool, ie ~/.cache/pxlPostPrepper/<name>
+    base = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.GenericCacheLocation)
+    if not base:
+        base = os.path.join(os.path.expanduser('~'), '.cache')
+    path = os.path.join(base, 'pxlPostPrepper', name)
+    try:
+        os.makedirs(path, exist_ok=True)
+    except Exception:
+        return None
+    return path
+
+
+def prune_cache_dir(path, max_bytes, keep=0.8):
+    """Delete the least recently used files in path until it's under keep * max_bytes,
+    once it's over max_bytes. Cache hits touch their file, so mtime is last use."""
+    entries = []
+    total = 0
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_file():
+                        st = entry.stat()
+                        entries.append((st.st_mtime, st.st_size, entry.path))
+                        total += st.st_size
+                except OSError:
+                    pass
+    except OSError:
+        return 0
+    if total <= max_bytes:
+        return 0
+    removed = 0
+    for _, size, file_path in sorted(entries):
+        if total <= max_bytes * keep:
+            break
+        try:
+            os.remove(file_path)
+            total -= size
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+class _ThumbnailSignals(QObject):
+    # key, image ; emitted from the worker thread, delivered queued to the GUI thread
+    finished = pyqtSignal(str, QImage)
+
+
+class _ThumbnailTask(QRunnable):
+    """Decode one thumbnail off the GUI thread, reading the disk cache first."""
+
+    def __init__(self, key, path, size, cache_file, signals):
+        super().__init__()
+        self.key = key
+        self.path = path
+        self.size = size
+        self.cache_file = cache_file
+        self.signals = signals
+
+    def run(self):
+        img = QImage()
+        if self.cache_file and os.path.exists(self.cache_file):
+            img = QImage(self.cache_file)
+            try:
+                # mark it used, so pruning keeps it
+                os.utime(self.cache_file)
+            except OSError:
+                pass
+        if img.isNull():
+            reader = QImageReader(self.path)
+            reader.setAutoTransform(True)
+            src_size = reader.size()
+            # let the decoder produce a reduced image directly (JPEG decodes at 1/2, 1/4, 1/8)
+            if src_size.isValid():
+                reader.setScaledSize(src_size.scaled(self.size, self.size, Qt.AspectRatioMode.KeepAspectRatio))
+            img = reader.read()
+            if not img.isNull():
+                if img.width() > self.size or img.height() > self.size:
+                    img = img.scaled(self.size, self.size, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
+                if self.cache_file:
+                    try:
+                        img.save(self.cache_file, 'PNG')
+                    except Exception:
+                        pass
+        try:
+            self.signals.finished.emit(self.key, img)
+        except RuntimeError:
+            # service was destroyed while we were decoding
+            pass
+
+
+class ThumbnailService(QObject):
+    """Asynchronous, cached thumbnail loader for the media details pane.
+
+    Thumbnails are decoded at reduced size on a worker pool. Finished thumbnails are
+    kept in an in-memory LRU and written to a disk cache keyed by path + mtime + size,
+    so reopening a post doesn't decode anything. Edited files leave their old entries
+    behind, so the disk cache is trimmed to THUMBNAIL_CACHE_MAX_BYTES on startup.
+    """
+    thumbnail_ready = pyqtSignal(str, QPixmap)  # file path, thumbnail
+
+    def __init__(self, size=100, max_items=512, parent=None, cache_max_bytes=THUMBNAIL_CACHE_MAX_BYTES):
+        super().__init__(parent)
+        self.size = size
+        self.max_items = max_items
+        self.cache_dir = _cache_dir('thumbnails')
+        if self.cache_dir:
+            # a big cache takes a while to scan; don't hold up startup for it
+            threading.Thread(target=prune_cache_dir, args=(self.cache_dir, cache_max_bytes),
+                             name='thumbnail-cache-prune', daemon=True).start()
+        self._lru = OrderedDict()  # key -> QPixmap
+        self._pending = {}  # key -> file path
+        self._signals = _ThumbnailSignals()
+        self._signals.finished.connect(self._on_task_finished)
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(max(2, QThreadPool.globalInstance().maxThreadCount() - 1))
+        self._placeholder = None
+
+    def cache_key(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        raw = f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}|{self.size}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def placeholder(self):
+        if self._placeholder is None:
+            px = QPixmap(self.size, self.size)
+            px.fill(QColor('#3a3a3a'))
+            self._placeholder = px
+        return self._placeholder
+
+    def request(self, path):
+        """Return the cached thumbnail for path, or None and queue a background decode.
+
+        thumbnail_ready is emitted once a queued thumbnail is available.
+        """
+        key = self.cache_key(path)
+        if key is None:
+            return None
+        px = self._lru.get(key)
+        if px is not None:
+            self._lru.move_to_end(key)
+            return px
+        if key not in self._pending:
+            self._pending[key] = path
+            cache_file = os.path.join(self.cache_dir, key + '.png') if self.cache_dir else None
+            self._pool.start(_ThumbnailTask(key, path, self.size, cache_file, self._signals))
+        return None
+
+    def _on_task_finished(self, key, img):
+        path = self._pending.pop(key, None)
+        if path is None or img.isNull():
+            return
+        px = QPixmap.fromImage(img)
+        self._lru[key] = px
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_items:
+            self._lru.popitem(last=False)
+        self.thumbnail_ready.emit(path, px)
+
+
+class _MediaProbeSignals(QObject):
+    finished = pyqtSignal(list)  # [(token, metadata dict or None)]
+
+
+class _MediaProbeTask(QRunnable):
+    def __init__(self, jobs, signals):
+        super().__init__()
+        self.jobs = jobs  # [(token, path, known metadata)]
+        self.signals = signals
+
+    def run(self):
+        results = []
+        for token, path, known in self.jobs:
+            try:
+                results.append((token, probe_media(path, known)))
+            except Exception:
+                results.append((token, None))
+        self.signals.finished.emit(results)
+
+
+class MediaProbeService(QObject):
+    """Fills media['metadata'] from file headers on a worker pool.
+
+    Width, height, bytes, orientation and duration are read from headers only, so
+    loading a project never reads whole files, and re-probed only when a file's size or
+    mtime changes. The content hash is left to export and hosting ( remember_content_hash ).
+    """
+    probed = pyqtSignal(list)  # posts whose media metadata changed
+
+    BATCH_SIZE = 32
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._pending = {}  # token -> (post, metadata dict)
+        self._next_token = 0
+        self._signals = _MediaProbeSignals()
+        self._signals.finished.connect(self._on_task_finished)
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(max(2, QThreadPool.globalInstance().maxThreadCount() - 1))
+
+    def request(self, posts):
+        jobs = []
+        for post in posts:
+            for m in post.get('media', []) or []:
+                path = m.get('file_path') or m.get('file')
+                if not path:
+                    continue
+                # results are written into this dict in place
+                meta = m.setdefault('metadata', {})
+                token = self._next_token
+                self._next_token += 1
+                self._pending[token] = (post, meta)
+                jobs.append((token, path, dict(meta)))
+                if len(jobs) >= self.BATCH_SIZE:
+                    self._pool.start(_MediaProbeTask(jobs, self._signals))
+                    jobs = []
+        if jobs:
+            self._pool.start(_MediaProbeTask(jobs, self._signals))
+
+    def _on_task_finished(self, results):
+        changed = []
+        seen = set()
+        for token, meta in results:
+            post, target = self._pending.pop(token, (None, None))
+            if post is None or meta is None:
+                continue
+            target.update(meta)
+            if id(post) not in seen:
+                seen.add(id(post))
+                changed.append(post)
+        if changed:
+            self.probed.emit(changed)
+
+
+def manifest_path_key(path):
+    # Normalized path used for manifest lookups and "already in a post" checks
+    return os.path.normcase(os.path.normpath(os.path.abspath(path)))
+
+
+def new_import_manifest():
+    # files: path key -> {path, size, mtime, hash}
+    # dirs: path key -> {mtime, filter, subdirs} ; lets unchanged folders be skipped outright
+    return {'version': 1, 'files': {}, 'dirs': {}}
+
+
+def manifest_path_for(project_path):
+    # Sidecar next to the project json, ie posts_ACCOUNT.manifest.json
+    return os.path.splitext(project_path)[0] + '.manifest.json'
+
+
+def _copy_json(obj):
+    # Fast copy of plain json data (dicts / lists / scalars); much cheaper than deepcopy
+    if isinstance(obj, dict):
+        return {k: _copy_json(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_copy_json(v) for v in obj]
+    return obj
+
+
+def post_to_project_shape(p):
+    """Copy of a post in the projectDataStruct shape that gets written to disk."""
+    copy = {
+        'post_kind': p.get('post_kind', 'single'),
+        'caption': p.get('caption', ''),
+        'media': _copy_json(p.get('media', [])),
+        'scheduled_time': p.get('scheduled_time'),
+        'post_options': _copy_json(p.get('post_options', {}))
+    }
+    # include project-local metadata if present
+    if 'local_data' in p:
+        copy['local_data'] = _copy_json(p['local_data'])
+    return copy
+
+
+def journal_path_for(project_path):
+    # Append-only edit journal next to the project json, ie posts_ACCOUNT.journal.jsonl
+    return os.path.splitext(project_path)[0] + '.journal.jsonl'
+
+
+_SEARCH_TOKEN_RE = re.compile(r"[#@]?\w+", re.UNICODE)
+
+
+def _bits_from_slots(slots, size):
+    # set of slot numbers -> int bitset, via a bytearray so it's O(len(slots) + size/8)
+    buf = bytearray((size + 8) // 8)
+    for slot in slots:
+        buf[slot >> 3] |= 1 << (slot & 7)
+    return int.from_bytes(buf, 'little')
+
+
+def _slots_from_bits(bits):
+    # int bitset -> slot numbers, lowest first
+    return [i for i, c in enumerate(reversed(bin(bits)[2:])) if c == '1'] if bits else []
+
+
+class PostIndex:
+    """In-memory search index over the project's posts.
+
+    Each post gets a slot number. Text ( keywords, post name, caption ) goes in an
+    inverted index of token -> slots; posted state, media types and media counts
+    are kept as int bitsets over the slots. Posts are tracked by identity, and the
+    index is updated one post at a time as they're edited.
+
+    Search syntax is space separated terms that must all match:
+        word        any keyword / name / caption word starting with 'word'
+        kw:word     has the exact keyword
+        is:posted / is:unposted
+        type:image / type:video
+        media:3 / media:>1 / media:<2
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._slot_of = {}  # id(post) -> slot
+        self._post_of = {}  # slot -> post
+        self._free_slots = []
+        self._next_slot = 0
+        self._entries = {}  # slot -> (tokens, keywords, posted, types, media count)
+        self._tokens = {}  # token -> set of slots
+        self._keywords = {}  # keyword -> set of slots
+        self._vocab = None  # sorted tokens for prefix lookups, rebuilt lazily
+        self._all_bits = 0
+        self._posted_bits = 0
+        self._type_bits = {}  # media type -> bitset
+        self._count_bits = {}  # media count -> bitset
+        # unposted slots in a list + position map so a random pick is O(1)
+        self._unposted = []
+        self._unposted_pos = {}
+        self._row_of = {}  # id(post) -> index in the posts list
+
+    # -- Maintenance --
+
+    @staticmethod
+    def _extract(post):
+        local = post.get('local_data', {}) or {}
+        kws = local.get('keywords') or []
+        if isinstance(kws, str):
+            kws = kws.split(',')
+        keywords = frozenset(str(k).strip().lower() for k in kws if str(k).strip())
+        text = ' '.join([' '.join(keywords), local.get('post_name') or '', post.get('caption') or ''])
+        tokens = set()
+        for t in _SEARCH_TOKEN_RE.findall(text):
+            t = t.lower()
+            tokens.add(t)
+            if t[0] in '#@':
+                # '#gamedev' is found by both 'gamedev' and '#gamedev'
+                tokens.add(t[1:])
+        tokens = frozenset(tokens)
+        media = post.get('media', []) or []
+        types = frozenset((m.get('type') or 'image').lower() for m in media)
+        return tokens, keywords, post_has_posted(post), types, len(media)
+
+    def _set_bit(self, bits, slot, on):
+        return (bits | (1 << slot)) if on else (bits & ~(1 << slot))
+
+    def _apply(self, slot, entry, on):
+        tokens, keywords, posted, types, count = entry
+        for table, keys in ((self._tokens, tokens), (self._keywords, keywords)):
+            for key in keys:
+                if on:
+                    slots = table.get(key)
+                    if slots is None:
+                        slots = table[key] = set()
+                        if table is self._tokens:
+                            self._vocab = None
+                    slots.add(slot)
+                else:
+                    slots = table.get(key)
+                    if slots is not None:
+                        slots.discard(slot)
+                        if not slots:
+                            del table[key]
+                            if table is self._tokens:
+                                self._vocab = None
+        if posted:
+            self._posted_bits = self._set_bit(self._posted_bits, slot, on)
+        elif on:
+            self._unposted_pos[slot] = len(self._unposted)
+            self._unposted.append(slot)
+        else:
+            # swap-remove from the unposted list
+            pos = self._unposted_pos.pop(slot)
+            last = self._unposted.pop()
+            if last != slot:
+                self._unposted[pos] = last
+                self._unposted_pos[last] = pos
+        for t in types:
+            self._type_bits[t] = self._set_bit(self._type_bits.get(t, 0), slot, on)
+        self._count_bits[count] = self._set_bit(self._count_bits.get(count, 0), slot, on)
+
+    def add(self, post, row=None):
+        if id(post) in self._slot_of:
+            self.update(post)
+            return
+        slot = self._free_slots.pop() if self._free_slots else self._next_slot
+        if slot == self._next_slot:
+            self._next_slot += 1
+        self._slot_of[id(post)] = slot
+        self._post_of[slot] = post
+        entry = self._extract(post)
+        self._entries[slot] = entry
+        self._all_bits |= 1 << slot
+        self._apply(slot, entry, True)
+        if row is not None:
+            self._row_of[id(post)] = row
+
+    def update(self, post):
+        slot = self._slot_of.get(id(post))
+        if slot is None:
+            return
+        entry = self._extract(post)
+        old = self._entries[slot]
+        if entry == old:
+            return
+        self._apply(slot, old, False)
+        self._apply(slot, entry, True)
+        self._entries[slot] = entry
+
+    def remove(self, post):
+        slot = self._slot_of.pop(id(post), None)
+        if slot is None:
+            return
+        self._apply(slot, self._entries.pop(slot), False)
+        del self._post_of[slot]
+        self._all_bits &= ~(1 << slot)
+        self._free_slots.append(slot)
+        self._row_of.pop(id(post), None)
+
+    def replace(self, old, new):
+        # a post dict was swapped for a new one at the same index ( ie normalized )
+        row = self._row_of.get(id(old))
+        self.remove(old)
+        self.add(new, row)
+
+    def add_posts(self, posts, first_row):
+        # posts appended to the end of the list
+        for i, post in enumerate(posts):
+            self.add(post, first_row + i)
+
+    def sync(self, posts):
+        """Bring the index in line with posts after adds / deletes / merges / reorders.
+
+        Only new and removed posts are (re)indexed; the row map is rebuilt.
+        """
+        current = {id(p): p for p in posts}
+        for pid in [pid for pid in self._slot_of if pid not in current]:
+            self.remove(self._post_of[self._slot_of[pid]])
+        for p in posts:
+            if id(p) not in self._slot_of:
+                self.add(p)
+        self._row_of = {id(p): i for i, p in enumerate(posts)}
+
+    # -- Queries --
+
+    def row_of(self, post):
+        return self._row_of.get(id(post))
+
+    def unposted_count(self):
+        return len(self._unposted)
+
+    def random_unposted(self):
+        """Row of a random unposted post, or None."""
+        if not self._unposted:
+            return None
+        return self._row_of.get(id(self._post_of[random.choice(self._unposted)]))
+
+    def _prefix_slots(self, prefix):
+        if self._vocab is None:
+            self._vocab = sorted(self._tokens)
+        slots = set()
+        i = bisect.bisect_left(self._vocab, prefix)
+        while i < len(self._vocab) and self._vocab[i].startswith(prefix):
+            slots |= self._tokens[self._vocab[i]]
+            i += 1
+        return slots
+
+    def _count_filter(self, spec):
+        try:
+            if spec.startswith('>'):
+                n = int(spec[1:])
+                keep = [c for c in self._count_bits if c > n]
+            elif spec.startswith('<'):
+                n = int(spec[1:])
+                keep = [c for c in self._count_bits if c < n]
+            else:
+                keep = [int(spec)]
+        except ValueError:
+            return None
+        bits = 0
+        for c in keep:
+            bits |= self._count_bits.get(c, 0)
+        return bits
+
+    def search(self, text):
+        """Rows of posts matching the query text, in project order."""
+        size = self._next_slot
+        bits = self._all_bits
+        text_slots = None
+        for term in text.lower().split():
+            if term.startswith('is:'):
+                if term == 'is:posted':
+                    bits &= self._posted_bits
+                elif term == 'is:unposted':
+                    bits &= ~self._posted_bits
+                continue
+            if term.startswith('type:'):
+                bits &= self._type_bits.get(term[5:], 0)
+                continue
+            if term.startswith('media:'):
+                count_bits = self._count_filter(term[6:])
+                if count_bits is not None:
+                    bits &= count_bits
+                continue
+            if term.startswith('kw:'):
+                slots = self._keywords.get(term[3:].strip(), set())
+            else:
+                words = _SEARCH_TOKEN_RE.findall(term)
+                slots = None
+                for word in words:
+                    found = self._prefix_slots(word)
+                    slots = found if slots is None else (slots & found)
+                if slots is None:
+                    continue
+            text_slots = slots if text_slots is None else (text_slots & slots)
+        if text_slots is not None:
+            bits &= _bits_from_slots(text_slots, size)
+        rows = []
+        for slot in _slots_from_bits(bits):
+            row = self._row_of.get(id(self._post_of[slot]))
+            if row is not None:
+                rows.append(row)
+        rows.sort()
+        return rows
+
+
+class ProjectWriter(QObject):
+    """Background writer for project checkpoints and the edit journal.
+
+    Jobs run in order on one thread, so a checkpoint truncates only the journal
+    entries queued before it. Posts arrive either as an already serialized
+    fragment (unchanged since the last checkpoint) or as a snapshot copy, so the
+    GUI never waits on json encoding or disk IO.
+    """
+    # path, ok, {id(post): (post, fragment)} for the newly serialized posts
+    checkpoint_done = pyqtSignal(str, bool, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._jobs = queue.Queue()
+        self._stores = {}  # sqlite project path -> ProjectStore, only used on the writer thread
+        self._thread = threading.Thread(target=self._run, name='pxlProjectWriter', daemon=True)
+        self._thread.start()
+
+    def checkpoint(self, path, items, journal_path=None):
+        # items: list of (post id, post, fragment or None, snapshot or None)
+        self._jobs.put(('checkpoint', path, items, journal_path))
+
+    def journal(self, journal_path, entries):
+        self._jobs.put(('journal', journal_path, entries))
+
+    def write_json(self, path, data):
+        self._jobs.put(('json', path, data))
+
+    def wait(self, timeout=None):
+        # block until every queued job is written, ie before the app exits
+        done = threading.Event()
+        self._jobs.put(('sync', done))
+        return done.wait(timeout)
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            kind = job[0]
+            try:
+                if kind == 'checkpoint':
+                    self._write_checkpoint(*job[1:])
+                elif kind == 'journal':
+                    _, journal_path, entries = job
+                    with open(journal_path, 'a', encoding='utf-8') as f:
+                        for entry in entries:
+                            f.write(json.dumps(entry) + '\n')
+                        f.flush()
+                        os.fsync(f.fileno())
+                elif kind == 'json':
+                    _, path, data = job
+                    write_text_atomic(path, json.dumps(data))
+                elif kind == 'sync':
+                    job[1].set()
+            except Exception as e:
+                print(f'Failed to write {kind}:', e)
+                if kind == 'checkpoint':
+                    self._emit_done(job[1], False, {})
+
+    def _write_checkpoint(self, path, items, journal_path):
+        fragments = []
+        fresh = {}
+        for pid, post, fragment, snapshot in items:
+            if fragment is None:
+                fragment = json.dumps(snapshot, indent=2)
+                fresh[pid] = (post, fragment)
+            fragments.append(fragment)
+        if is_project_db(path):
+            # sqlite projects only rewrite the rows of posts whose json changed
+            store = self._stores.get(path)
+            if store is None:
+                store = self._stores[path] = ProjectStore(path)
+            store.save_posts(fragments)
+        else:
+            write_text_atomic(path, docs_to_json_text(fragments))
+        if journal_path and os.path.exists(journal_path):
+            # everything journaled so far is in the checkpoint now
+            open(journal_path, 'w', encoding='utf-8').close()
+        self._emit_done(path, True, fresh)
+
+    def _emit_done(self, path, ok, fresh):
+        try:
+            self.checkpoint_done.emit(path, ok, fresh)
+        except RuntimeError:
+            pass
+
+
+class ProjectLoadWorker(QObject):
+    """Parses a project json incrementally on a worker thread.
+
+    Posts are decoded one array element at a time and emitted in batches as
+    they're read, so the first screenful can be shown while the rest of the
+    file is still loading. Posts are emitted as read; normalizing them is left
+    to the GUI when a post is opened.
+    """
+    batch_ready = pyqtSignal(list)  # raw post dicts
+    finished = pyqtSignal(bool, str)  # ok, error message
+
+    CHUNK_SIZE = 1 << 20
+    FIRST_BATCH = 64
+    BATCH_SIZE = 1000
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def run(self):
+        try:
+            self._parse()
+        except Exception as e:
+            self.finished.emit(False, str(e))
+            return
+        self.finished.emit(True, '')
+
+    def _read_store(self):
+        store = ProjectStore(self.path)
+        try:
+            for docs in store.iter_docs(self.BATCH_SIZE):
+                if self._cancel.is_set():
+                    break
+                self.batch_ready.emit([json.loads(d) for d in docs])
+        finally:
+            store.close()
+
+    def _parse(self):
+        if is_project_db(self.path):
+            self._read_store()
+            return
+        decoder = json.JSONDecoder()
+        batch = []
+        batch_limit = self.FIRST_BATCH
+        with open(self.path, 'r', encoding='utf-8') as f:
+            buf = f.read(self.CHUNK_SIZE)
+            eof = not buf
+            pos = self._skip_ws(buf, 0)
+            if buf[pos:pos + 1] == '{':
+                # a single post object rather than a list
+                buf += f.read()
+                self.batch_ready.emit([json.loads(buf)])
+                return
+            if buf[pos:pos + 1] != '[':
+                raise ValueError('Expected a list of posts')
+            pos += 1
+            while not self._cancel.is_set():
+                pos = self._skip_ws(buf, pos)
+                if pos < len(buf) and buf[pos] == ',':
+                    pos = self._skip_ws(buf, pos + 1)
+                if pos < len(buf) and buf[pos] == ']':
+                    break
+                try:
+                    if pos >= len(buf):
+                        raise json.JSONDecodeError('Need more data', buf, pos)
+                    post, pos = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    # the post runs past the end of the buffer; read more and retry it
+                    if eof:
+                        raise
+                    chunk = f.read(self.CHUNK_SIZE)
+                    eof = not chunk
+                    buf = buf[pos:] + chunk
+                    pos = 0
+                    continue
+                if isinstance(post, dict):
+                    batch.append(post)
+                if len(batch) >= batch_limit:
+                    self.batch_ready.emit(batch)
+                    batch = []
+                    batch_limit = self.BATCH_SIZE
+        if batch:
+            self.batch_ready.emit(batch)
+
+    @staticmethod
+    def _skip_ws(buf, pos):
+        while pos < len(buf) and buf[pos] in ' \t\r\n':
+            pos += 1
+        return pos
+
+
+class DirectoryImportWorker(QObject):
+    """Streams media paths out of a directory tree on a worker thread.
+
+    Paths are emitted in batches so the GUI can add posts as they arrive;
+    call cancel() from the GUI thread to stop mid-run.
+
+    With an import manifest, folders whose mtime hasn't changed are skipped, and
+    only files that are new, not already used by a post, and not previously
+    imported are emitted. Manifest changes are collected in self.updates and
+    merged by the GUI once the worker finishes.
+
+    With changed_dirs ( watch mode ) only those folders are listed, plus sub folders
+    the manifest doesn't know yet; known sub folders are watched, and listed, on their own.
+    """
+    batch_ready = pyqtSignal(list)  # list of file paths
+    progress = pyqtSignal(int, int)  # entries scanned, media found
+    finished = pyqtSignal(bool)  # cancelled
+
+    BATCH_SIZE = 250
+
+    def __init__(self, dir_path, recursive=False, include=None, exclude=None, manifest=None, referenced=None,
+                 settle_seconds=0, new_only=False, changed_dirs=None):
+        super().__init__()
+        self.dir_path = dir_path
+        self.recursive = recursive
+        self.include = [g.lower() for g in (include or [])] or ['*' + ext for ext in IMPORT_EXTENSIONS]
+        self.exclude = [g.lower() for g in (exclude or [])]
+        # the manifest is only read here; the GUI doesn't modify it while we run
+        self.manifest = manifest if manifest is not None else new_import_manifest()
+        self.referenced = referenced or set()
+        self.updates = {'files': {}, 'dirs': {}}
+        # a folder can only be skipped if it was listed with the same filters
+        self.filter_sig = ';'.join(sorted(self.include)) + '!' + ';'.join(sorted(self.exclude))
+        # files modified more recently than this may still be being written; leave them for later
+        self.settle_seconds = settle_seconds
+        # skip the stat of files the manifest already knows (watch mode only cares about new files)
+        self.new_only = new_only
+        self.changed_dirs = changed_dirs
+        self.deferred = 0
+        self.deferred_dirs = []  # folders with files left for a later pass
+        self.visited_dirs = []
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _accepts(self, name):
+        low = name.lower()
+        if not low.endswith(IMPORT_EXTENSIONS):
+            return False
+        if not any(fnmatch.fnmatch(low, g) for g in self.include):
+            return False
+        return not any(fnmatch.fnmatch(low, g) for g in self.exclude)
+
+    def _is_new_file(self, entry, key, known):
+        """Update the manifest entry for a file; True if it should become a new post."""
+        if known and self.new_only:
+            return False
+        try:
+            st = entry.stat()
+        except OSError:
+            return False
+        if known and known.get('size') == st.st_size and known.get('mtime') == st.st_mtime_ns:
+            # unchanged since the last import
+            return False
+        if self.settle_seconds and time.time() - st.st_mtime < self.settle_seconds:
+            # probably still being written
+            self.deferred += 1
+            return False
+        try:
+            digest = file_content_hash(entry.path)
+        except OSError:
+            # locked by the writer, or removed again
+            self.deferred += 1
+            return False
+        self.updates['files'][key] = {'path': entry.path, 'size': st.st_size, 'mtime': st.st_mtime_ns, 'hash': digest}
+        if known:
+            # a previously imported file was re-written; posts keep pointing at it
+            return False
+        # files already used by a post don't get another one
+        return key not in self.referenced
+
+    def run(self):
+        scanned = 0
+        found = 0
+        seen = set()
+        batch = []
+        known_files = self.manifest.get('files', {})
+        known_dirs = self.manifest.get('dirs', {})
+        pending_dirs = list(self.changed_dirs) if self.changed_dirs is not None else [self.dir_path]
+        while pending_dirs and not self._cancel.is_set():
+            current = pending_dirs.pop(0)
+            dir_key = manifest_path_key(current)
+            self.visited_dirs.append(current)
+            try:
+                # stat before listing, so a file added mid-listing makes the folder stale next time
+                dir_mtime = os.stat(current).st_mtime_ns
+            except OSError:
+                continue
+            known_dir = known_dirs.get(dir_key)
+            if known_dir and known_dir.get('mtime') == dir_mtime and known_dir.get('filter') == self.filter_sig:
+                # nothing was added, removed or renamed in here since the last import
+                if self.recursive and self.changed_dirs is None:
+                    pending_dirs[0:0] = known_dir.get('subdirs', [])
+                continue
+            try:
+                with os.scandir(current) as it:
+                    # sort per directory so posts keep filename order while still streaming
+                    entries = sorted(it, key=lambda e: e.name)
+            except OSError:
+                continue
+            subdirs = []
+            deferred_before = self.deferred
+            for entry in entries:
+                if self._cancel.is_set():
+                    break
+                scanned += 1
+                if self.new_only and entry.name.lower().endswith(IMPORT_EXTENSIONS) \
+                        and manifest_path_key(entry.path) in known_files:
+                    # a file seen before; not even stat'ed
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                        continue
+                except OSError:
+                    continue
+                if not self._accepts(entry.name):
+                    continue
+                key = manifest_path_key(entry.path)
+                if key in seen:
+                    continue
+                seen.add(key)
+                if not self._is_new_file(entry, key, known_files.get(key)):
+                    continue
+                batch.append(entry.path)
+                found += 1
+                if len(batch) >= self.BATCH_SIZE:
+                    self.batch_ready.emit(batch)
+                    self.progress.emit(scanned, found)
+                    batch = []
+            if self._cancel.is_set():
+                break
+            # only record folders that were listed completely, without files left for later
+            if self.deferred == deferred_before:
+                self.updates['dirs'][dir_key] = {'mtime': dir_mtime, 'filter': self.filter_sig, 'subdirs': subdirs}
+            else:
+                self.deferred_dirs.append(current)
+            # walk sub folders in name order after this folder's files
+            if self.recursive:
+                if self.changed_dirs is not None:
+                    subdirs = [d for d in subdirs if manifest_path_key(d) not in known_dirs]
+                pending_dirs[0:0] = subdirs
+        if batch and not self._cancel.is_set():
+            self.batch_ready.emit(batch)
+        self.progress.emit(scanned, found)
+        self.finished.emit(self._cancel.is_set())
+
+
+class DuplicateScanWorker(QObject):
+    """Perceptual-hashes a set of images and finds near-duplicates on a worker thread.
+
+    Hashes are cached on disk by path + mtime + size, so later scans only decode
+    files that are new or changed. Results are left in self.matches,
+    {path: [(other path, distance), ...]}, for the GUI to read once finished.
+    """
+    progress = pyqtSignal(int, int)  # images hashed, total images
+    finished = pyqtSignal(bool)  # cancelled
+
+    def __init__(self, paths):
+        super().__init__()
+        self.paths = paths
+        self.matches = {}
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def run(self):
+        cache_dir = _cache_dir('phash')
+        cache = PhashCache(os.path.join(cache_dir, 'phash.json') if cache_dir else None)
+        try:
+            hashes = hash_images(self.paths, cache, progress=self.progress.emit, cancelled=self._cancel.is_set)
+            if not self._cancel.is_set():
+                self.matches = find_near_duplicates(hashes)
+            cache.save()
+        except Exception as e:
+            print('Duplicate scan failed:', e)
+        self.finished.emit(self._cancel.is_set())
+
+
+class CarouselGroupWorker(QObject):
+    """Finds runs of single-media posts that look like one carousel, on a worker thread.
+
+    paths holds one file path per post, or None for posts that can't be grouped.
+    Groups of indices into paths are left in self.groups for the GUI once finished.
+    """
+    progress = pyqtSignal(int, int)  # files probed, total files
+    finished = pyqtSignal(bool)  # cancelled
+
+    def __init__(self, paths):
+        super().__init__()
+        self.paths = paths
+        self.groups = []
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def run(self):
+        try:
+            rows = [i for i, p in enumerate(self.paths) if p]
+            feats = carousel_features([self.paths[i] for i in rows], progress=self.progress.emit,
+                                      cancelled=self._cancel.is_set)
+            if feats is not None:
+                features = [None] * len(self.paths)
+                for i, feat in zip(rows, feats):
+                    features[i] = feat
+                self.groups = group_carousels(features)
+        except Exception as e:
+            print('Carousel grouping failed:', e)
+        self.finished.emit(self._cancel.is_set())
+
+
+class ExportWorker(QObject):
+    """Runs export jobs ( see pxlExport ) on a process pool from a worker thread.
+
+    Results line up with self.jobs and are read by the GUI once finished.
+    """
+    progress = pyqtSignal(int, int)  # media exported, total
+    finished = pyqtSignal(bool)  # cancelled
+
+    def __init__(self, jobs):
+        super().__init__()
+        self.jobs = jobs
+        self.results = []
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def run(self):
+        try:
+            self.results = run_export(self.jobs, progress=self.progress.emit, cancelled=self._cancel.is_set)
+        except Exception as e:
+            print('Export failed:', e)
+        self.finished.emit(self._cancel.is_set())
+
+
+class HostWorker(QObject):
+    """Uploads media to a MediaHost ( see pxlMediaHost ) from a worker thread.
+
+    Results line up with self.jobs and are read by the GUI once finished.
+    """
+    progress = pyqtSignal(int, int)  # media uploaded or found, total
+    finished = pyqtSignal(bool)  # cancelled
+
+    def __init__(self, host, jobs):
+        super().__init__()
+        self.host = host
+        self.jobs = jobs
+        self.results = []
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def run(self):
+        try:
+            self.results = self.host.run(self.jobs, progress=self.progress.emit, cancelled=self._cancel.is_set)
+        except Exception as e:
+            print('Upload failed:', e)
+        self.finished.emit(self._cancel.is_set())
+
+
+class MediaStoreWorker(QObject):
+    """Adds media files to a MediaStore on a worker thread.
+
+    jobs are (token, path, metadata) tuples; a probed hash is reused while the
+    file's size and mtime still match it. Results are left in self.results as
+    (token, content hash, stored path) for the GUI once finished.
+    """
+    progress = pyqtSignal(int, int)  # files stored, total
+    finished = pyqtSignal()
+
+    def __init__(self, store, jobs):
+        super().__init__()
+        self.store = store
+        self.jobs = jobs
+        self.results = []
+
+    def run(self):
+        for n, (token, path, meta) in enumerate(self.jobs, 1):
+            try:
+                known = None
+                st = os.stat(path)
+                if meta.get('hash') and meta.get('bytes') == st.st_size and meta.get('mtime') == st.st_mtime_ns:
+                    known = meta['hash']
+                content_hash, dest, _ = self.store.add(path, known)
+                self.results.append((token, content_hash, dest))
+            except Exception as e:
+                print('Could not add to the media store:', path, e)
+            if n % 32 == 0:
+                self.progress.emit(n, len(self.jobs))
+        self.finished.emit()
+
+
+class FolderWatcher(QObject):
+    """Watches folders for changes and emits one debounced changed signal per burst,
+    with the folders that changed in it.
+
+    Uses QFileSystemWatcher's directoryChanged, falling back to polling folder mtimes
+    for any path the watcher refuses (ie some network drives).
+    """
+    changed = pyqtSignal(list)  # folder paths
+
+    def __init__(self, debounce_ms=1500, poll_ms=5000, parent=None):
+        super().__init__(parent)
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self._on_event)
+        self._debounce = QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(debounce_ms)
+        self._debounce.timeout.connect(self._emit_changed)
+        self._poll = QTimer(self)
+        self._poll.setInterval(poll_ms)
+        self._poll.timeout.connect(self._poll_dirs)
+        self._dirs = set()
+        self._polled = {}  # path -> last seen mtime
+        self._changed = set()  # folders changed since the last signal
+
+    def is_active(self):
+        return bool(self._dirs)
+
+    def add_dirs(self, dirs):
+        for d in dirs:
+            if d in self._dirs:
+                continue
+            self._dirs.add(d)
+            if not self._watcher.addPath(d):
+                try:
+                    self._polled[d] = os.stat(d).st_mtime_ns
+                except OSError:
+                    self._polled[d] = None
+        if self._polled and not self._poll.isActive():
+            self._poll.start()
+
+    def stop(self):
+        watched = self._watcher.directories()
+        if watched:
+            self._watcher.removePaths(watched)
+        self._dirs = set()
+        self._polled = {}
+        self._changed = set()
+        self._poll.stop()
+        self._debounce.stop()
+
+    def recheck_later(self, ms, dirs):
+        # used when files in dirs were still being written during the last pass
+        dirs = list(dirs)
+
+        def recheck():
+            for d in dirs:
+                self._on_event(d)
+        QTimer.singleShot(ms, recheck)
+
+    def _on_event(self, path):
+        # restarting the timer coalesces a burst of events into one changed signal
+        if self._dirs:
+            self._changed.add(path)
+            self._debounce.start()
+
+    def _emit_changed(self):
+        changed = sorted(self._changed)
+        self._changed = set()
+        if changed:
+            self.changed.emit(changed)
+
+    def _poll_dirs(self):
+        for d, last in list(self._polled.items()):
+            try:
+                mtime = os.stat(d).st_mtime_ns
+            except OSError:
+                mtime = None
+            if mtime != last:
+                self._polled[d] = mtime
+                self._on_event(d)
+
+
+class EditCoalescer(QObject):
+    """Batches rapid editor changes into one model commit per idle interval.
+
+    Edits are queued against the dict they belong to (post, local_data or media
+    entry) rather than an index, so a flush stays correct even if posts were
+    reordered in between. Call flush() before anything reads or restructures the
+    posts so pending text is never lost.
+    """
+    committed = pyqtSignal(list)  # posts touched by the flushed edits
+
+    def __init__(self, idle_ms=300, max_delay_ms=1000, parent=None):
+        super().__init__(parent)
+        self.idle_ms = idle_ms
+        # continuous typing still commits at least this often
+        self.max_delay_ms = max_delay_ms
+        self._pending = OrderedDict()  # (id(target), key) -> (post, target, key, value)
+        self._first_pending = None
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.flush)
+
+    def queue(self, post, target, key, value):
+        if not self._pending:
+            self._first_pending = time.monotonic()
+        # later edits to the same field replace earlier ones
+        self._pending[(id(target), key)] = (post, target, key, value)
+        waited_ms = (time.monotonic() - self._first_pending) * 1000
+        self._timer.start(int(max(0, min(self.idle_ms, self.max_delay_ms - waited_ms))))
+
+    def has_pending(self):
+        return bool(self._pending)
+
+    def flush(self):
+        self._timer.stop()
+        if not self._pending:
+            return []
+        pending = list(self._pending.values())
+        self._pending.clear()
+        changed = []
+        for post, target, key, value in pending:
+            target[key] = value
+            if not any(p is post for p in changed):
+                changed.append(post)
+        self.committed.emit(changed)
+        return changed
+
+
+class ImportOptionsDialog(QDialog):
+    """Options for importing a directory: recursion and include / exclude globs."""
+
+    def __init__(self, dir_path, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Import Options")
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel(dir_path))
+
+        self.recursive_checkbox = QCheckBox("Include sub folders")
+        layout.addWidget(self.recursive_checkbox)
+
+        layout.addWidget(QLabel("Include (; separated globs)"))
+        self.include_edit = QLineEdit(IMPORT_DEFAULT_INCLUDE)
+        layout.addWidget(self.include_edit)
+
+        layout.addWidget(QLabel("Exclude (; separated globs)"))
+        self.exclude_edit = QLineEdit()
+        self.exclude_edit.setPlaceholderText("ie *_draft*;*.tmp.png")
+        layout.addWidget(self.exclude_edit)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+    @staticmethod
+    def _split_globs(text):
+        return [g.strip() for g in text.split(';') if g.strip()]
+
+    def options(self):
+        return {
+            'recursive': self.recursive_checkbox.isChecked(),
+            'include': self._split_globs(self.include_edit.text()),
+            'exclude': self._split_globs(self.exclude_edit.text()),
+        }
+
+
 class pxlPostPrepper(QWidget):
     def __init__(self):
         super().__init__()
@@ -69,27 +1552,57 @@ class pxlPostPrepper(QWidget):
         sidebar.addWidget(select_random_unposted_btn)
         select_random_unposted_btn.clicked.connect(self._select_random_unposted)
 
+        # Instagram checks over every post, with a report
+        validate_btn = QPushButton("Check posts for Instagram")
+        sidebar.addWidget(validate_btn)
+        validate_btn.clicked.connect(self.show_validation_report)
+
         # Post count label (will be updated by refresh_post_bar)
         self.post_count_label = QLabel('Total Post Count : 0')
         sidebar.addWidget(self.post_count_label)
 
+        # Search / filter for the post bar, backed by an in-memory index
+        self.post_index = PostIndex()
+        self.post_search_edit = QLineEdit()
+        self.post_search_edit.setPlaceholderText('Search posts')
+        self.post_search_edit.setToolTip(
+            'Words match keywords, post names and captions by prefix.\n'
+            'Filters: kw:word  is:posted  is:unposted  type:image  type:video  media:2  media:>1'
+        )
+        self.post_search_edit.setClearButtonEnabled(True)
+        sidebar.addWidget(self.post_search_edit)
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(150)
+        self._search_timer.timeout.connect(self._apply_post_filter)
+        self.post_search_edit.textChanged.connect(lambda text: self._search_timer.start())
+
         # Post bar (moved from bottom to left sidebar) - vertical list of posts
-        self.post_bar_area = QScrollArea()
-        self.post_bar_area.setWidgetResizable(True)
-        
+        # Virtualized list view; only the visible rows are painted by the delegate
+        self.post_model = PostListModel(self)
+        # status badges; edited posts are re-checked shortly after the edit
+        self.validator = PostValidator()
+        self.post_model.validator = self.validator
+        self._validate_timer = QTimer(self)
+        self._validate_timer.setSingleShot(True)
+        self._validate_timer.setInterval(300)
+        self._validate_timer.timeout.connect(self._run_validation)
+        self.post_bar_view = QListView()
+        self.post_bar_view.setModel(self.post_model)
+        self.post_bar_view.setItemDelegate(PostItemDelegate(self.post_bar_view))
+        self.post_bar_view.setUniformItemSizes(True)
+        self.post_bar_view.setMouseTracking(True)
+        self.post_bar_view.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        self.post_bar_view.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.post_bar_view.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.post_bar_view.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.post_bar_view.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.post_bar_view.setMinimumWidth(180)
         # prefer expanding vertically but fixed horizontally
-        self.post_bar_area.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
-        bar_container = QWidget()
-        # ensure the internal container has a reasonable minimum width but may expand
-        # Use minimum width rather than fixed so buttons can stretch horizontally when space is available
-        bar_container.setMinimumWidth(180)
-        bar_container.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
-        self.post_bar_layout = QVBoxLayout(bar_container)
-        self.post_bar_layout.setContentsMargins(0, 0, 0, 0)
-        self.post_bar_layout.setSpacing(4)
-        self.post_bar_area.setWidget(bar_container)
-
-        sidebar.addWidget(self.post_bar_area)
+        self.post_bar_view.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        self.post_bar_view.clicked.connect(lambda idx: self.load_post(self.post_model.post_index(idx.row())))
+
+        sidebar.addWidget(self.post_bar_view)
 
         # sidebar layout is ready; we'll wrap it into a widget later for the splitter
 
@@ -182,6 +1695,12 @@ class pxlPostPrepper(QWidget):
 
         # create center and right wrappers later and put everything into a QSplitter
 
+        # editor changes are coalesced and committed to the model when typing pauses
+        self.edits = EditCoalescer(300, 1000, parent=self)
+        self.edits.committed.connect(self._on_edits_committed)
+        # set while load_post fills the editors, so that isn't treated as an edit
+        self._populating_editors = False
+
         # wire metadata edits
         self.post_name_edit.textChanged.connect(partial(self._update_post_meta, 'post_name'))
         self.keywords_edit.textChanged.connect(partial(self._update_post_meta, 'keywords'))
@@ -196,8 +1715,16 @@ class pxlPostPrepper(QWidget):
         self.preview.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.preview.setStyleSheet("border: 2px dashed #aaa;")
         self.preview.setMinimumSize(500, 400)
-        # keep the original pixmap so we can rescale to available space on demand
-        self.current_pixmap_orig = None
+        # keep a small pyramid of pre-scaled pixmaps (largest first, capped at 1080x1350)
+        # so we can rescale to available space on demand without touching the original
+        self.preview_levels = []
+        self.preview_source_size = None
+        self._preview_shown_key = None
+        # live resizes use a fast transform; a smooth pass runs once resizing settles
+        self._preview_settle_timer = QTimer(self)
+        self._preview_settle_timer.setSingleShot(True)
+        self._preview_settle_timer.setInterval(150)
+        self._preview_settle_timer.timeout.connect(lambda: self._update_preview_scaled(smooth=True))
         self.preview.setScaledContents(False)
         center_container.addWidget(self.preview, 1)
 
@@ -228,6 +1755,21 @@ class pxlPostPrepper(QWidget):
         right_v.addWidget(self.import_btn)
         self.import_btn.clicked.connect(self.import_from_directory)
 
+        # watch a folder and import new media as it shows up
+        self.watch_checkbox = QCheckBox("Watch a folder for new media")
+        right_v.addWidget(self.watch_checkbox)
+        self.watch_checkbox.toggled.connect(self._on_watch_toggled)
+
+        # keep imported media in a content-addressed store next to the project
+        self.store_checkbox = QCheckBox("Managed media store")
+        self.store_checkbox.setToolTip("Media are kept once by content hash in a folder next to the project file")
+        right_v.addWidget(self.store_checkbox)
+        self.store_checkbox.toggled.connect(self._on_store_toggled)
+        self.store_gc_btn = QPushButton("Clean media store")
+        self.store_gc_btn.setEnabled(False)
+        right_v.addWidget(self.store_gc_btn)
+        self.store_gc_btn.clicked.connect(self.clean_media_store)
+
         # Load image button (legacy single file loader)
         load_btn = QPushButton("Load Image(s)")
         right_v.addWidget(load_btn)
@@ -238,6 +1780,16 @@ class pxlPostPrepper(QWidget):
         right_v.addWidget(self.load_posts_btn)
         self.load_posts_btn.clicked.connect(self.load_posts_from_json)
 
+        # perceptual-hash scan for the same image imported under different names
+        self.find_dupes_btn = QPushButton("Find duplicate images")
+        right_v.addWidget(self.find_dupes_btn)
+        self.find_dupes_btn.clicked.connect(self.find_duplicate_images)
+
+        # merge runs of imported single posts into carousels
+        self.auto_group_btn = QPushButton("Auto-group carousels")
+        right_v.addWidget(self.auto_group_btn)
+        self.auto_group_btn.clicked.connect(self.auto_group_carousels)
+
         right_v.addWidget(QLabel("Imported files"))
         self.files_list = QListWidget()
         right_v.addWidget(self.files_list)
@@ -261,6 +1813,21 @@ class pxlPostPrepper(QWidget):
         right_v.addWidget(self.save_all_btn)
         self.save_all_btn.clicked.connect(self.save_all_posts)
 
+        # upload-ready copies of every unposted post's media
+        self.export_btn = QPushButton("Export for upload")
+        right_v.addWidget(self.export_btn)
+        self.export_btn.clicked.connect(self.export_for_upload)
+
+        # push exported media to the S3_* bucket in the .env and fill in the Live URLs
+        self.host_btn = QPushButton("Upload to media host")
+        right_v.addWidget(self.host_btn)
+        self.host_btn.clicked.connect(self.upload_to_host)
+
+        # autosave: journal every edit, checkpoint the whole project in the background
+        self.autosave_checkbox = QCheckBox("Autosave")
+        right_v.addWidget(self.autosave_checkbox)
+        self.autosave_checkbox.toggled.connect(self._on_autosave_toggled)
+
         # Build a QSplitter with the four column widgets so the user can resize panes
         left_widget = QWidget()
         left_widget.setLayout(sidebar)
@@ -286,6 +1853,8 @@ class pxlPostPrepper(QWidget):
         splitter.setSizes([200, 300, 600, 200])
 
         main_v.addWidget(splitter)
+        # dragging the splitter resizes the preview without a window resizeEvent
+        splitter.splitterMoved.connect(lambda pos, idx: self._on_preview_resizing())
 
         # Current post label - keep it a single-line height and avoid vertical stretching
         self.current_post_label = QLabel("No post selected")
@@ -311,7 +1880,64 @@ class pxlPostPrepper(QWidget):
         self.posts = []  # list of post dicts
         self.current_index = None
         self.imported_files = []
+        self.imported_files_index = set()  # fast membership checks for imported_files
+        self.project_path = None
+        # path/size/mtime/hash of previously imported files, saved next to the project
+        self.import_manifest = new_import_manifest()
         self.selected_media_index = None
+        self._import_thread = None
+        self._import_worker = None
+        # streaming project loads; posts loaded from json are normalized when first opened
+        self._load_thread = None
+        self._load_worker = None
+        self._lazy_post_ids = set()
+        # saving: checkpoints and the autosave journal are written on a background thread
+        self.writer = ProjectWriter(self)
+        self.writer.checkpoint_done.connect(self._on_checkpoint_done)
+        self._post_json_cache = {}  # id(post) -> (post, serialized fragment)
+        self._dirty_post_ids = set()  # posts changed since their fragment was cached
+        self._manifest_dirty = False
+        self.autosave_enabled = False
+        self._checkpoint_timer = QTimer(self)
+        self._checkpoint_timer.setSingleShot(True)
+        self._checkpoint_timer.timeout.connect(self._autosave_checkpoint)
+        # folder watch mode
+        self.folder_watcher = FolderWatcher(parent=self)
+        self.folder_watcher.changed.connect(self._run_watch_import)
+        self._watch_dir = None
+        self._watch_opts = None
+        self._watch_pending = False
+        self._watch_queue = set()  # folders for the next watch pass; None for the whole watched folder
+        # near-duplicate images; manifest_path_key(path) -> [(other path, distance)]
+        self.duplicate_matches = {}
+        self._duplicate_posts = {}  # manifest_path_key(path) -> [posts using it]
+        self._dupe_thread = None
+        self._dupe_worker = None
+        self._group_thread = None
+        self._group_worker = None
+        self._export_thread = None
+        self._export_worker = None
+        self._export_targets = []
+        self._host_thread = None
+        self._host_worker = None
+        self._host_targets = []
+        # content-addressed media store, when enabled
+        self.media_store = None
+        self._store_thread = None
+        self._store_worker = None
+        self._store_pending = {}  # token -> (post, media dict)
+        self._store_queue = []  # jobs waiting for the running worker
+        self._store_token = 0
+        self._group_posts = []
+
+        # header metadata ( size, orientation, duration, hash ) for every media entry
+        self.media_probe = MediaProbeService(self)
+        self.media_probe.probed.connect(self._on_media_probed)
+
+        # Thumbnails for the media details pane are decoded in the background
+        self.thumbnails = ThumbnailService(100, parent=self)
+        self.thumbnails.thumbnail_ready.connect(self._on_thumbnail_ready)
+        self._thumb_buttons = {}  # file path -> [thumbnail buttons waiting on it]
 
         # Initialize UI
         self.refresh_post_bar()
@@ -327,66 +1953,167 @@ class pxlPostPrepper(QWidget):
                 # create a post for this single file
                 post = self._make_post_from_file(file_name)
                 self.posts.append(post)
+                self._on_media_added([post])
             self.current_index = len(self.posts) - 1
             self.load_post(self.current_index)
             self.refresh_post_bar()
 
     def _load_preview(self, file_path):
         if file_path.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.gif')):
-            pixmapOrig = QPixmap(file_path)
-            # store original so we can rescale when the widget size changes
-            self.current_pixmap_orig = pixmapOrig
+            levels, src_size = self._decode_preview_levels(file_path)
+            # store the pyramid so we can rescale when the widget size changes
+            self.preview_levels = levels
+            self.preview_source_size = src_size
+            self._preview_shown_key = None
             # scale to available preview size (with a sensible default cap applied)
             try:
-                self._update_preview_scaled()
+                self._update_preview_scaled(smooth=True)
             except Exception:
                 # fallback to a safe default size
-                pixmap = pixmapOrig.scaled(600, 400, Qt.AspectRatioMode.KeepAspectRatio)
-                self.preview.setPixmap(pixmap)
-            # show original resolution in stats
-            self.stats_label.setText(f"Resolution: {pixmapOrig.width()}x{pixmapOrig.height()}\nAspect Ratio: {pixmapOrig.width()/pixmapOrig.height():.2f}")
+                if levels:
+                    pixmap = levels[0].scaled(600, 400, Qt.AspectRatioMode.KeepAspectRatio)
+                    self.preview.setPixmap(pixmap)
         else:
             self.preview.setText(os.path.basename(file_path))
-            self.current_pixmap_orig = None
+            self.preview_levels = []
+            self.preview_source_size = None
+        self._show_media_stats(file_path)
         delimiter = "/" if "/" in file_path else "\\"
         filename_dispArr = file_path.split(delimiter)
         filename_dispStr = delimiter.join(filename_dispArr[-3::])
         self.preview_filename.setText(filename_dispStr)
         self.active_preview_filepath = file_path
 
-    def _update_preview_scaled(self):
-        """Scale the stored original pixmap to fit the preview widget, capped at 1080x1350.
+    def _media_metadata(self, file_path):
+        # probed metadata for file_path in the loaded post, if it has any yet
+        if self.current_index is None or self.current_index >= len(self.posts):
+            return None
+        for m in self.posts[self.current_index].get('media', []) or []:
+            if media_file_path(m) == file_path and (m.get('metadata') or {}).get('width'):
+                return m['metadata']
+        return None
+
+    def _show_media_stats(self, file_path):
+        meta = self._media_metadata(file_path)
+        if meta is not None:
+            w, h = meta['width'], meta['height'] or 0
+            lines = [f"Resolution: {w}x{h}", f"Aspect Ratio: {w/h:.2f}" if h else "Aspect Ratio: -"]
+            if meta.get('duration') is not None:
+                lines.append(f"Duration: {meta['duration']:.1f}s")
+            if meta.get('bytes') is not None:
+                lines.append(f"Size: {meta['bytes'] / (1 << 20):.1f} MB")
+            self.stats_label.setText('\n'.join(lines))
+            return
+        # not probed yet; the preview already read the original size from the image header
+        src_size = self.preview_source_size
+        if src_size is not None and src_size.height() > 0:
+            self.stats_label.setText(f"Resolution: {src_size.width()}x{src_size.height()}\nAspect Ratio: {src_size.width()/src_size.height():.2f}")
+        else:
+            self.stats_label.setText("Resolution: - \nAspect Ratio: -")
+
+    def _on_media_probed(self, posts):
+        # metadata is derived from the files, so it's saved with the next checkpoint without touching date_modified
+        self._mark_posts_dirty(posts)
+        current = self.posts[self.current_index] if self.current_index is not None and self.current_index < len(self.posts) else None
+        if current is not None and any(p is current for p in posts) and self.active_preview_filepath:
+            self._show_media_stats(self.active_preview_filepath)
+
+    def _decode_preview_levels(self, file_path):
+        """Decode an image only as large as the preview cap, then build smaller levels.
 
-        Keeps aspect ratio and uses smooth transformation.
+        Returns (levels, original_size). The original resolution comes from the
+        image header, so large files are never decoded at full size here.
         """
-        if not getattr(self, 'current_pixmap_orig', None):
+        reader = QImageReader(file_path)
+        reader.setAutoTransform(True)
+        src_size = reader.size()
+        rotated = False
+        try:
+            rotated = bool(reader.transformation() & QImageIOHandler.Transformation.TransformationRotate90)
+        except Exception:
+            pass
+        oriented = src_size.transposed() if (rotated and src_size.isValid()) else src_size
+        if oriented.isValid() and (oriented.width() > PREVIEW_CAP_W or oriented.height() > PREVIEW_CAP_H):
+            target = oriented.scaled(PREVIEW_CAP_W, PREVIEW_CAP_H, Qt.AspectRatioMode.KeepAspectRatio)
+            # the reader's scaled size is applied before the orientation transform
+            reader.setScaledSize(target.transposed() if rotated else target)
+        img = reader.read()
+        if img.isNull():
+            return [], (oriented if oriented.isValid() else None)
+        if not oriented.isValid():
+            oriented = img.size()
+
+        levels = [QPixmap.fromImage(img)]
+        while levels[-1].width() >= PREVIEW_MIN_LEVEL * 2 and levels[-1].height() >= PREVIEW_MIN_LEVEL * 2:
+            prev = levels[-1]
+            levels.append(prev.scaled(prev.width() // 2, prev.height() // 2, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation))
+        return levels, oriented
+
+    def _update_preview_scaled(self, smooth=True):
+        """Scale the preview pyramid to fit the preview widget, capped at 1080x1350.
+
+        Keeps aspect ratio. Scales from the smallest level that is still at least the
+        target size; smooth=False uses a fast transform for live resizing.
+        """
+        if not getattr(self, 'preview_levels', None):
             return
-        orig = self.current_pixmap_orig
         # available space in the preview widget
         avail_w = max(1, self.preview.width())
         avail_h = max(1, self.preview.height())
         # cap to Instagram-like maximum (1080x1350)
-        cap_w = 1080
-        cap_h = 1350
-        target_w = min(avail_w, cap_w)
-        target_h = min(avail_h, cap_h)
+        target_w = min(avail_w, PREVIEW_CAP_W)
+        target_h = min(avail_h, PREVIEW_CAP_H)
+        key = (target_w, target_h, smooth)
+        if key == self._preview_shown_key:
+            return
+        fit = self.preview_levels[0].size().scaled(target_w, target_h, Qt.AspectRatioMode.KeepAspectRatio)
+        source = self.preview_levels[0]
+        for level in reversed(self.preview_levels):
+            if level.width() >= fit.width() and level.height() >= fit.height():
+                source = level
+                break
+        mode = Qt.TransformationMode.SmoothTransformation if smooth else Qt.TransformationMode.FastTransformation
         # scale preserving aspect ratio
-        scaled = orig.scaled(target_w, target_h, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
+        scaled = source.scaled(target_w, target_h, Qt.AspectRatioMode.KeepAspectRatio, mode)
         self.preview.setPixmap(scaled)
+        self._preview_shown_key = key
+
+    def _on_preview_resizing(self):
+        # fast rescale now, smooth rescale once the resize has settled
+        try:
+            self._update_preview_scaled(smooth=False)
+            self._preview_settle_timer.start()
+        except Exception:
+            pass
 
     def copy_image_data(self):
-        """Copy the current image to the clipboard."""
-        if not getattr(self, 'current_pixmap_orig', None):
+        """Copy the current image to the clipboard, at full resolution."""
+        if not getattr(self, 'preview_levels', None):
+            return
+        # the preview only holds reduced levels; read the original only when copying
+        reader = QImageReader(self.active_preview_filepath)
+        reader.setAutoTransform(True)
+        img = reader.read()
+        if img.isNull():
             return
         clipboard = QApplication.clipboard()
-        clipboard.setPixmap(self.current_pixmap_orig)
+        clipboard.setImage(img)
 
-    def resizeEvent(self, event):
-        # update preview scaling when the window is resized
+    def closeEvent(self, event):
+        # don't drop the last burst of typing
         try:
-            self._update_preview_scaled()
+            self.edits.flush()
+            if self.autosave_enabled and self.project_path:
+                self._write_checkpoint(self.project_path)
+            # let queued saves finish before the process exits
+            self.writer.wait(10)
         except Exception:
             pass
+        super().closeEvent(event)
+
+    def resizeEvent(self, event):
+        # update preview scaling when the window is resized
+        self._on_preview_resizing()
         try:
             super().resizeEvent(event)
         except Exception:
@@ -415,7 +2142,8 @@ class pxlPostPrepper(QWidget):
         post['local_data'] = {
             'post_name': '',
             'date_modified': datetime.now().replace(microsecond=0).isoformat(),
-            'keywords': []
+            'keywords': [],
+            'post_id': uuid.uuid4().hex
         }
         return post
 
@@ -427,6 +2155,7 @@ class pxlPostPrepper(QWidget):
             file_path = item.data(Qt.ItemDataRole.UserRole)
             post = self._make_post_from_file(file_path)
             self.posts.append(post)
+            self._on_media_added([post])
         self.refresh_post_bar()
     
     def add_selected_to_post(self):
@@ -439,6 +2168,7 @@ class pxlPostPrepper(QWidget):
                 file_path = item.data(Qt.ItemDataRole.UserRole)
                 post = self._make_post_from_file(file_path)
                 self.posts.append(post)
+                self._on_media_added([post])
             # select the first of the newly added posts
             self.current_index = len(self.posts) - len(selected_items)
             self.load_post(self.current_index)
@@ -448,6 +2178,7 @@ class pxlPostPrepper(QWidget):
                 file_path = item.data(Qt.ItemDataRole.UserRole)
                 media = self._make_post_from_file(file_path)['media'][0]
                 cur.setdefault('media', []).append(media)
+            self._on_media_added([cur])
             # mark the post as modified when media are added
             self._touch_post_modified()
             # refresh the loaded post display
@@ -462,6 +2193,8 @@ class pxlPostPrepper(QWidget):
         self.refresh_media_details()
 
     def refresh_media_details(self):
+        # the rebuilt editors read from the model, so commit pending edits first
+        self.edits.flush()
         # Clear only the per-post media layout. This keeps post-level editors and
         # merge controls intact.
         try:
@@ -474,6 +2207,7 @@ class pxlPostPrepper(QWidget):
                     w.setParent(None)
         except Exception:
             pass
+        self._thumb_buttons = {}
 
         if self.current_index is None:
             return
@@ -516,11 +2250,13 @@ class pxlPostPrepper(QWidget):
             if fp and os.path.exists(fp) and fp.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.gif')):
                 # use a clickable button with the image as an icon so thumbnails are only
                 # shown in the media details pane and are clickable to change the preview
-                px = QPixmap(fp).scaled(100, 100, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
+                # show a placeholder until the background decode finishes
+                px = self.thumbnails.request(fp)
                 thumb_btn = QPushButton()
-                thumb_btn.setIcon(QIcon(px))
-                thumb_btn.setIconSize(px.size())
-                thumb_btn.setFixedSize(px.width()+6, px.height()+6)
+                if px is None:
+                    self._thumb_buttons.setdefault(fp, []).append(thumb_btn)
+                    px = self.thumbnails.placeholder()
+                self._set_thumbnail_icon(thumb_btn, px)
                 # show pointer cursor on hover to indicate clickability
                 try:
                     thumb_btn.setCursor(Qt.CursorShape.PointingHandCursor)
@@ -542,6 +2278,13 @@ class pxlPostPrepper(QWidget):
             filename_text = QLabel(filename_str)
             field_v.addWidget(filename_text)
 
+            dupe_text = self._duplicate_note(fp, post) if fp else ''
+            if dupe_text:
+                dupe_label = QLabel(dupe_text)
+                dupe_label.setStyleSheet('color: #c08040;')
+                dupe_label.setWordWrap(True)
+                field_v.addWidget(dupe_label)
+
             alt_edit = QLineEdit(m.get('alt_text') or '')
             alt_edit.setPlaceholderText('Alt text')
             alt_edit.textChanged.connect(lambda text, idx=i: self._update_media_field(idx, 'alt_text', text))
@@ -560,17 +2303,20 @@ class pxlPostPrepper(QWidget):
             except Exception:
                 self.media_details_layout.addWidget(row)
 
-    def _update_media_field(self, index, key, value):
-        # Update the media field in the model and touch modified time
-        if self.current_index is None:
-            return
-        try:
-            media = self.posts[self.current_index]['media'][index]
-        except Exception:
-            return
-        media[key] = value
-        self._touch_post_modified()
-        
+    def _set_thumbnail_icon(self, btn, px):
+        btn.setIcon(QIcon(px))
+        btn.setIconSize(px.size())
+        btn.setFixedSize(px.width()+6, px.height()+6)
+
+    def _on_thumbnail_ready(self, path, px):
+        # Fill in thumbnails for the currently shown post as their decodes finish
+        for btn in self._thumb_buttons.pop(path, []):
+            try:
+                self._set_thumbnail_icon(btn, px)
+            except RuntimeError:
+                # button was removed by a later refresh
+                pass
+
     def _merge_into_prompt(self):
         """Show a dialog letting the user pick which post to merge the current post into."""
         if self.current_index is None:
@@ -606,6 +2352,7 @@ class pxlPostPrepper(QWidget):
         """Merge selected media (or all) from current post into the specified target post index."""
         if self.current_index is None:
             return
+        self.edits.flush()
         if target_idx is None or target_idx < 0 or target_idx >= len(self.posts):
             return
         cur_idx = self.current_index
@@ -613,7 +2360,7 @@ class pxlPostPrepper(QWidget):
             return
 
         cur_post = self.posts[cur_idx]
-        target_post = self.posts[target_idx]
+        target_post = self._hydrate_post(target_idx)
 
         cur_media = cur_post.get('media', [])
         if not cur_media:
@@ -658,22 +2405,20 @@ class pxlPostPrepper(QWidget):
 
     def _update_post_meta(self, key, value):
         # Called by UI editors (post_name, keywords) to update post-level metadata
-        if self.current_index is None:
+        if self.current_index is None or self._populating_editors:
             return
         post = self.posts[self.current_index]
         if 'local_data' not in post:
             post['local_data'] = {}
-        post['local_data'][key] = value
-        self._touch_post_modified()
-        # update post bar labels so names show immediately
-        try:
-            self.refresh_post_bar()
-        except Exception:
-            pass
+        self.edits.queue(post, post['local_data'], key, value)
+        if key == 'has_posted':
+            # a checkbox click is a single edit; no need to wait for typing to pause
+            self.edits.flush()
 
     def _delete_media(self, index):
         if self.current_index is None:
             return
+        self.edits.flush()
         post = self.posts[self.current_index]
         media = post.get('media', [])
         # Prompt user for confirmation before deleting media
@@ -697,6 +2442,7 @@ class pxlPostPrepper(QWidget):
     def _move_media(self, old_idx, new_idx):
         if self.current_index is None:
             return
+        self.edits.flush()
         post = self.posts[self.current_index]
         media = post.get('media', [])
         if not (0 <= old_idx < len(media)):
@@ -725,197 +2471,954 @@ class pxlPostPrepper(QWidget):
             self.date_modified_label.setText(now)
         except Exception:
             pass
+        self._mark_posts_dirty([post])
+
+    def _touch_posts_modified(self, posts):
+        # Stamp date_modified on several posts at once, updating the label for the loaded one
+        now = datetime.utcnow().replace(microsecond=0).isoformat()
+        current = self.posts[self.current_index] if self.current_index is not None else None
+        for post in posts:
+            post.setdefault('local_data', {})['date_modified'] = now
+            if post is current:
+                try:
+                    self.date_modified_label.setText(now)
+                except Exception:
+                    pass
+        self._mark_posts_dirty(posts)
+
+    def _post_row(self, post):
+        # Index of a post dict by identity; the loaded post is checked first
+        if self.current_index is not None and self.current_index < len(self.posts) and self.posts[self.current_index] is post:
+            return self.current_index
+        row = self.post_index.row_of(post)
+        if row is not None and row < len(self.posts) and self.posts[row] is post:
+            return row
+        for i, p in enumerate(self.posts):
+            if p is post:
+                return i
+        return None
+
+    def _on_edits_committed(self, posts):
+        # one modified-time update and one row repaint per post per idle interval
+        self._touch_posts_modified(posts)
+        rows = []
+        for post in posts:
+            row = self._post_row(post)
+            rows.append(row)
+            self._refresh_post_row(row)
+        self._journal_posts(posts, rows)
 
     def _on_caption_changed(self):
-        """Called when the caption editor changes; update model and UI."""
-        if self.current_index is None:
+        """Called when the caption editor changes; queue the model update."""
+        if self.current_index is None or self._populating_editors:
             return
         try:
             cur = self.posts[self.current_index]
-            cur['caption'] = self.caption_edit.toPlainText()
-            # mark modified and refresh post bar so short preview updates
-            self._touch_post_modified()
-            try:
-                self.refresh_post_bar()
-            except Exception:
-                pass
+            self.edits.queue(cur, cur, 'caption', self.caption_edit.toPlainText())
         except Exception:
             pass
 
     def _update_media_field(self, index, key, value):
+        # Called by the per-media editors; queue the model update
         if self.current_index is None:
             return
         post = self.posts[self.current_index]
         media = post.setdefault('media', [])
         if 0 <= index < len(media):
-            media[index][key] = value
+            self.edits.queue(post, media[index], key, value)
 
     def on_file_clicked(self, item):
         file_path = item.data(Qt.ItemDataRole.UserRole)
         if file_path:
             self._load_preview(file_path)
 
+    def _add_imported_file(self, file_path):
+        """Add a path to the right-hand files list, skipping ones already listed.
+
+        Returns True if the file was added.
+        """
+        if not file_path or file_path in self.imported_files_index:
+            return False
+        item = QListWidgetItem(os.path.basename(file_path))
+        item.setData(Qt.ItemDataRole.UserRole, file_path)
+        self.files_list.addItem(item)
+        self.imported_files.append(file_path)
+        self.imported_files_index.add(file_path)
+        return True
+
+    def _clear_imported_files(self):
+        self.files_list.clear()
+        self.imported_files = []
+        self.imported_files_index = set()
+
     def import_from_directory(self):
+        if self._import_thread is not None or self._load_thread is not None:
+            # an import or project load is already running
+            return
         dir_path = QFileDialog.getExistingDirectory(self, "Select image directory")
         if not dir_path:
             return
-        added = 0
-        for fname in sorted(os.listdir(dir_path)):
-            if fname.lower().endswith(('.png', '.jpg', '.jpeg', '.mp4', '.mov', '.webm')):
-                full = os.path.join(dir_path, fname)
-                # add to the right-hand files list (avoid duplicates)
-                if full not in self.imported_files:
-                    item = QListWidgetItem(os.path.basename(full))
-                    item.setData(Qt.ItemDataRole.UserRole, full)
-                    self.files_list.addItem(item)
-                    self.imported_files.append(full)
-                post = self._make_post_from_file(full)
-                self.posts.append(post)
-                added += 1
-        if added:
-            self.current_index = len(self.posts) - added
+        dlg = ImportOptionsDialog(dir_path, self)
+        if dlg.exec() != QDialog.DialogCode.Accepted:
+            return
+        self._start_import(dir_path, dlg.options())
+
+    def _start_import(self, dir_path, opts, interactive=True, changed_dirs=None):
+        """Run a DirectoryImportWorker over dir_path.
+
+        interactive imports show a progress dialog and select the first new post;
+        watch mode imports run quietly, only import settled files and leave the
+        current selection alone. changed_dirs limits a watch pass to those folders.
+        """
+        self._import_first_index = len(self.posts)
+        self._import_added = 0
+        self._import_interactive = interactive
+
+        self._import_progress = None
+        if interactive:
+            self._import_progress = QProgressDialog("Scanning...", "Cancel", 0, 0, self)
+            self._import_progress.setWindowTitle("Importing")
+            self._import_progress.setMinimumDuration(300)
+            self._import_progress.setAutoClose(False)
+            self._import_progress.setAutoReset(False)
+
+        # files already used by any post are never imported again
+        referenced = set()
+        for post in self.posts:
+            for m in post.get('media', []) or []:
+                # media moved into the store still count for the file they came from
+                for fp in (m.get('file_path'), m.get('source_path')):
+                    if fp:
+                        referenced.add(manifest_path_key(fp))
+
+        thread = QThread(self)
+        worker = DirectoryImportWorker(dir_path, opts['recursive'], opts['include'], opts['exclude'],
+                                       manifest=self.import_manifest, referenced=referenced,
+                                       settle_seconds=0 if interactive else 2, new_only=not interactive,
+                                       changed_dirs=changed_dirs)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.batch_ready.connect(self._on_import_batch)
+        worker.progress.connect(self._on_import_progress)
+        worker.finished.connect(self._on_import_finished)
+        worker.finished.connect(thread.quit)
+        thread.finished.connect(worker.deleteLater)
+        thread.finished.connect(thread.deleteLater)
+        if self._import_progress is not None:
+            # cancel is a thread-safe flag; use a lambda so it runs right away in the GUI
+            # thread instead of being queued behind the worker's busy run()
+            self._import_progress.canceled.connect(lambda: worker.cancel())
+            self.import_btn.setEnabled(False)
+        self._import_thread = thread
+        self._import_worker = worker
+        thread.start()
+
+    def _on_watch_toggled(self, checked):
+        if not checked:
+            self.folder_watcher.stop()
+            self._watch_dir = None
+            self._watch_opts = None
+            self._watch_queue = set()
+            self.watch_checkbox.setText("Watch a folder for new media")
+            return
+        dir_path = QFileDialog.getExistingDirectory(self, "Select folder to watch")
+        opts = None
+        if dir_path:
+            dlg = ImportOptionsDialog(dir_path, self)
+            if dlg.exec() == QDialog.DialogCode.Accepted:
+                opts = dlg.options()
+        if opts is None:
+            # user backed out; put the checkbox back without re-triggering this handler
+            self.watch_checkbox.blockSignals(True)
+            self.watch_checkbox.setChecked(False)
+            self.watch_checkbox.blockSignals(False)
+            return
+        self._watch_dir = dir_path
+        self._watch_opts = opts
+        self.watch_checkbox.setText(f"Watching : {os.path.basename(dir_path) or dir_path}")
+        self.folder_watcher.add_dirs([dir_path])
+        # pick up anything already new in the folder
+        self._run_watch_import()
+
+    def _run_watch_import(self, dirs=None):
+        """Import new files from dirs, folders the watcher saw change, or from the
+        whole watched folder when dirs is None."""
+        if self._watch_dir is None:
+            return
+        if dirs is None:
+            self._watch_queue = None
+        elif self._watch_queue is not None:
+            self._watch_queue.update(dirs)
+        if self._import_thread is not None or self._load_thread is not None:
+            # run again once the current import finishes
+            self._watch_pending = True
+            return
+        self._watch_pending = False
+        changed, self._watch_queue = self._watch_queue, set()
+        if changed is not None and not changed:
+            return
+        self._start_import(self._watch_dir, self._watch_opts, interactive=False,
+                           changed_dirs=sorted(changed) if changed is not None else None)
+
+    def _on_import_batch(self, paths):
+        # Insert a batch of posts and file list rows; the post bar only inserts new rows
+        self.files_list.setUpdatesEnabled(False)
+        try:
+            for full in paths:
+                self._add_imported_file(full)
+        finally:
+            self.files_list.setUpdatesEnabled(True)
+        new_posts = [self._make_post_from_file(full) for full in paths]
+        self.post_index.add_posts(new_posts, len(self.posts))
+        self.post_model.append_posts(new_posts)
+        self._on_media_added(new_posts)
+        self._on_posts_restructured()
+        self._import_added += len(new_posts)
+        self._after_posts_appended()
+        # show the first imported post as soon as it exists
+        if self._import_interactive and self._import_added == len(new_posts):
+            self.load_post(self._import_first_index)
+
+    def _on_import_progress(self, scanned, found):
+        if self._import_progress is None:
+            return
+        try:
+            self._import_progress.setLabelText(f"Imported {found} files ({scanned} scanned)")
+        except RuntimeError:
+            pass
+
+    def _on_import_finished(self, cancelled):
+        if self._import_progress is not None:
+            try:
+                self._import_progress.close()
+            except RuntimeError:
+                pass
+        # the worker thread is done with the manifest; merge what it learned
+        worker = self._import_worker
+        if worker is not None:
+            self.import_manifest.setdefault('files', {}).update(worker.updates['files'])
+            self.import_manifest.setdefault('dirs', {}).update(worker.updates['dirs'])
+            self._manifest_dirty = self._manifest_dirty or bool(worker.updates['files'] or worker.updates['dirs'])
+        self._import_thread = None
+        self._import_worker = None
+        self.import_btn.setEnabled(True)
+        if self._import_interactive:
+            if cancelled:
+                print(f'Import cancelled after {self._import_added} files')
+            elif not self._import_added:
+                print('Import found no new files')
+        if self._watch_dir is not None:
+            if worker is not None and not self._import_interactive:
+                # keep watching any sub folders the import walked into
+                if self._watch_opts.get('recursive'):
+                    self.folder_watcher.add_dirs(worker.visited_dirs)
+                # come back for files that were still being written
+                if worker.deferred_dirs:
+                    self.folder_watcher.recheck_later(2500, worker.deferred_dirs)
+            if self._watch_pending:
+                self._run_watch_import([])
+
+    def find_duplicate_images(self):
+        if self._dupe_thread is not None:
+            return
+        # every image used by a post, plus imported files not in a post yet
+        paths = []
+        seen = set()
+        for post in self.posts:
+            for m in post.get('media', []) or []:
+                fp = media_file_path(m)
+                if fp and is_image_path(fp):
+                    key = manifest_path_key(fp)
+                    if key not in seen:
+                        seen.add(key)
+                        paths.append(fp)
+        for fp in self.imported_files:
+            if is_image_path(fp):
+                key = manifest_path_key(fp)
+                if key not in seen:
+                    seen.add(key)
+                    paths.append(fp)
+
+        thread = QThread(self)
+        worker = DuplicateScanWorker(paths)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.progress.connect(self._on_dupe_progress)
+        worker.finished.connect(self._on_dupe_scan_finished)
+        worker.finished.connect(thread.quit)
+        thread.finished.connect(worker.deleteLater)
+        thread.finished.connect(thread.deleteLater)
+        self.find_dupes_btn.setEnabled(False)
+        self.find_dupes_btn.setText("Finding duplicates...")
+        self._dupe_thread = thread
+        self._dupe_worker = worker
+        thread.start()
+
+    def _on_dupe_progress(self, done, total):
+        self.find_dupes_btn.setText(f"Finding duplicates... {done} / {total}")
+
+    def _on_dupe_scan_finished(self, cancelled):
+        worker = self._dupe_worker
+        self._dupe_thread = None
+        self._dupe_worker = None
+        self.find_dupes_btn.setEnabled(True)
+        self.find_dupes_btn.setText("Find duplicate images")
+        if worker is None or cancelled:
+            return
+        self.duplicate_matches = {manifest_path_key(p): found for p, found in worker.matches.items()}
+        # which posts use each matched file; rows are looked up when shown, so later edits don't matter
+        self._duplicate_posts = {}
+        for post in self.posts:
+            for m in post.get('media', []) or []:
+                fp = media_file_path(m)
+                key = manifest_path_key(fp) if fp else None
+                if key in self.duplicate_matches:
+                    self._duplicate_posts.setdefault(key, []).append(post)
+        print(f'Duplicate scan found {len(self.duplicate_matches)} images with possible duplicates')
+        self.refresh_media_details()
+
+    def _duplicate_note(self, file_path, post):
+        """'Possible duplicate of post N' text for a media file, or '' if it has no matches."""
+        found = self.duplicate_matches.get(manifest_path_key(file_path))
+        if not found:
+            return ''
+        rows = set()
+        same_post = False
+        for other_path, _ in found:
+            for other in self._duplicate_posts.get(manifest_path_key(other_path), []):
+                if other is post:
+                    same_post = True
+                    continue
+                row = self.post_index.row_of(other)
+                if row is not None:
+                    rows.add(row)
+        if rows:
+            rows = sorted(rows)
+            return 'Possible duplicate of post ' + ', '.join(str(r + 1) for r in rows[:5]) + (' ...' if len(rows) > 5 else '')
+        if same_post:
+            return 'Possible duplicate of another image in this post'
+        # only matched imported files that aren't in a post
+        return 'Possible duplicate of ' + ', '.join(os.path.basename(p) for p, _ in found[:3])
+
+    @staticmethod
+    def _is_group_candidate(post):
+        # untouched single-media posts, as made by an import
+        media = post.get('media', []) or []
+        local = post.get('local_data', {}) or {}
+        return (len(media) == 1 and bool(media_file_path(media[0])) and not post_has_posted(post)
+                and not (post.get('caption') or '').strip() and not (local.get('post_name') or '').strip())
+
+    def auto_group_carousels(self):
+        if self._group_thread is not None or self._load_thread is not None or not self.posts:
+            return
+        self.edits.flush()
+        # keep the post objects; rows can shift while the worker runs
+        self._group_posts = list(self.posts)
+        paths = [media_file_path(p['media'][0]) if self._is_group_candidate(p) else None for p in self._group_posts]
+
+        thread = QThread(self)
+        worker = CarouselGroupWorker(paths)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.progress.connect(self._on_group_progress)
+        worker.finished.connect(self._on_group_finished)
+        worker.finished.connect(thread.quit)
+        thread.finished.connect(worker.deleteLater)
+        thread.finished.connect(thread.deleteLater)
+        self.auto_group_btn.setEnabled(False)
+        self.auto_group_btn.setText("Grouping...")
+        self._group_thread = thread
+        self._group_worker = worker
+        thread.start()
+
+    def _on_group_progress(self, done, total):
+        self.auto_group_btn.setText(f"Grouping... {done} / {total}")
+
+    def _on_group_finished(self, cancelled):
+        worker = self._group_worker
+        self._group_thread = None
+        self._group_worker = None
+        self.auto_group_btn.setEnabled(self._load_thread is None)
+        self.auto_group_btn.setText("Auto-group carousels")
+        posts = self._group_posts
+        self._group_posts = []
+        if worker is None or cancelled:
+            return
+        groups = [[posts[i] for i in g] for g in worker.groups]
+        if not groups:
+            QMessageBox.information(self, "Auto-group carousels", "No posts looked like carousels.")
+            return
+        merged = sum(len(g) for g in groups)
+        answer = QMessageBox.question(self, "Auto-group carousels",
+                                      f"Merge {merged} posts into {len(groups)} carousels?")
+        if answer != QMessageBox.StandardButton.Yes:
+            return
+        self._apply_carousel_groups(groups)
+
+    def _apply_carousel_groups(self, groups):
+        """Merge each group of posts into its first post, with one post bar refresh."""
+        self.edits.flush()
+        current = self.posts[self.current_index] if self.current_index is not None else None
+        heads = []
+        removed = set()
+        redirect = {}  # id(merged post) -> the carousel it went into
+        for group in groups:
+            rows = [self._post_row(p) for p in group]
+            # skip groups edited or removed since the scan
+            if any(r is None for r in rows) or not all(self._is_group_candidate(p) for p in group):
+                continue
+            members = [self._hydrate_post(r) for r in rows]
+            head = members[0]
+            for other in members[1:]:
+                head.setdefault('media', []).extend(other.get('media', []))
+                other['media'] = []
+                removed.add(id(other))
+            # hydrating can swap post objects, so map both the scanned and current ones
+            for p in group + members:
+                redirect[id(p)] = head
+            head['post_kind'] = 'carousel'
+            heads.append(head)
+        if not heads:
+            return
+        self.posts[:] = [p for p in self.posts if id(p) not in removed]
+        if current is not None:
+            self.current_index = self._post_row(redirect.get(id(current), current))
+        self.refresh_post_bar()
+        self._touch_posts_modified(heads)
+        if self.current_index is not None:
             self.load_post(self.current_index)
-            self.refresh_post_bar()
+        print(f'Auto-grouped {len(removed) + len(heads)} posts into {len(heads)} carousels')
 
-    def load_posts_from_json(self):
-        fn, _ = QFileDialog.getOpenFileName(self, 'Load posts from JSON', '', 'JSON Files (*.json)')
-        if not fn:
+    def export_for_upload(self):
+        if self._export_thread is not None or self._load_thread is not None:
             return
+        self.edits.flush()
+        out_dir = QFileDialog.getExistingDirectory(self, "Export to folder", default_export_dir() or '')
+        if not out_dir:
+            return
+        jobs = build_export_jobs(self.posts, out_dir)
+        if not jobs:
+            print('Nothing to export')
+            return
+        # media dicts to record the results on, in job order
+        self._export_targets = [(self.posts[p], self.posts[p]['media'][i]) for p, i, _ in jobs]
+
+        self._export_progress = QProgressDialog("Exporting...", "Cancel", 0, len(jobs), self)
+        self._export_progress.setWindowTitle("Export for upload")
+        self._export_progress.setMinimumDuration(300)
+        self._export_progress.setAutoClose(False)
+        self._export_progress.setAutoReset(False)
+
+        thread = QThread(self)
+        worker = ExportWorker(jobs)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.progress.connect(self._on_export_progress)
+        worker.finished.connect(self._on_export_finished)
+        worker.finished.connect(thread.quit)
+        thread.finished.connect(worker.deleteLater)
+        thread.finished.connect(thread.deleteLater)
+        # thread-safe flag; run it in the GUI thread rather than queued behind run()
+        self._export_progress.canceled.connect(lambda: worker.cancel())
+        self.export_btn.setEnabled(False)
+        self._export_thread = thread
+        self._export_worker = worker
+        thread.start()
+
+    def _on_export_progress(self, done, total):
         try:
-            with open(fn, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-        except Exception as e:
-            print('Failed to load posts:', e)
+            self._export_progress.setValue(done)
+            self._export_progress.setLabelText(f"Exported {done} / {total}")
+        except RuntimeError:
+            pass
+
+    def _on_export_finished(self, cancelled):
+        try:
+            self._export_progress.close()
+        except RuntimeError:
+            pass
+        worker = self._export_worker
+        targets = self._export_targets
+        self._export_thread = None
+        self._export_worker = None
+        self._export_targets = []
+        self.export_btn.setEnabled(self._load_thread is None)
+        if worker is None:
             return
+        changed = []
+        counts = {}
+        for (post, media), (p, i, job), res in zip(targets, worker.jobs, worker.results):
+            if res is None:
+                continue
+            counts[res['status']] = counts.get(res['status'], 0) + 1
+            dirty = remember_content_hash(media, job['src'], job['bytes'], job['mtime'], res.get('hash'))
+            if res['status'] == 'failed':
+                print(f"Export failed for post {p + 1} media {i + 1} ( {job['src']} ) : {res['error']}")
+            else:
+                entry = {'file_path': res['dest'].replace('\\', '/'), 'key': res['key']}
+                if media.get('export') != entry:
+                    media['export'] = entry
+                    dirty = True
+            if dirty and not any(c is post for c in changed):
+                changed.append(post)
+        if changed:
+            self._mark_posts_dirty(changed)
+        summary = ', '.join(f"{n} {status}" for status, n in sorted(counts.items()))
+        print(('Export cancelled : ' if cancelled else 'Export : ') + (summary or 'nothing done'))
+
+    def upload_to_host(self):
+        if self._host_thread is not None or self._load_thread is not None:
+            return
+        self.edits.flush()
+        host = MediaHost.from_env()
+        if host is None:
+            QMessageBox.information(self, "Upload to media host",
+                                    "Set S3_ENDPOINT, S3_BUCKET, S3_ACCESS_KEY and S3_SECRET_KEY in .env first.")
+            return
+        jobs = build_host_jobs(self.posts)
+        if not jobs:
+            print('Nothing to upload')
+            return
+        # media dicts to record the URLs on, in job order
+        self._host_targets = [(self.posts[p], self.posts[p]['media'][i]) for p, i, _ in jobs]
+
+        self._host_progress = QProgressDialog("Uploading...", "Cancel", 0, len(jobs), self)
+        self._host_progress.setWindowTitle("Upload to media host")
+        self._host_progress.setMinimumDuration(300)
+        self._host_progress.setAutoClose(False)
+        self._host_progress.setAutoReset(False)
+
+        thread = QThread(self)
+        worker = HostWorker(host, jobs)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.progress.connect(self._on_host_progress)
+        worker.finished.connect(self._on_host_finished)
+        worker.finished.connect(thread.quit)
+        thread.finished.connect(worker.deleteLater)
+        thread.finished.connect(thread.deleteLater)
+        self._host_progress.canceled.connect(lambda: worker.cancel())
+        self.host_btn.setEnabled(False)
+        self._host_thread = thread
+        self._host_worker = worker
+        thread.start()
+
+    def _on_host_progress(self, done, total):
+        try:
+            self._host_progress.setValue(done)
+            self._host_progress.setLabelText(f"Uploaded {done} / {total}")
+        except RuntimeError:
+            pass
 
-        # Expect data to be a list of post-like dicts
-        posts = []
-        # clear current files list
-        self.files_list.clear()
-        self.imported_files = []
+    def _on_host_finished(self, cancelled):
+        try:
+            self._host_progress.close()
+        except RuntimeError:
+            pass
+        worker = self._host_worker
+        targets = self._host_targets
+        self._host_thread = None
+        self._host_worker = None
+        self._host_targets = []
+        self.host_btn.setEnabled(self._load_thread is None)
+        if worker is None:
+            return
+        changed = []
+        counts = {}
+        for (post, media), (p, i, job), res in zip(targets, worker.jobs, worker.results):
+            if res is None:
+                continue
+            counts[res['status']] = counts.get(res['status'], 0) + 1
+            if res['status'] == 'failed':
+                print(f"Upload failed for post {p + 1} media {i + 1} ( {job['src']} ) : {res['error']}")
+                continue
+            hosted = hosted_entry(job, res)
+            dirty = remember_content_hash(media, job['src'], job['bytes'], job['mtime'], res['hash'])
+            if media.get('URL') != res['url'] or media.get('hosted') != hosted:
+                media['URL'] = res['url']
+                media['hosted'] = hosted
+                dirty = True
+            if dirty and not any(c is post for c in changed):
+                changed.append(post)
+        if changed:
+            self._mark_posts_dirty(changed)
+            # show the new Live URLs
+            current = self.posts[self.current_index] if self.current_index is not None and self.current_index < len(self.posts) else None
+            if current is not None and any(c is current for c in changed):
+                self.load_post(self.current_index)
+        summary = ', '.join(f"{n} {status}" for status, n in sorted(counts.items()))
+        print(('Upload cancelled : ' if cancelled else 'Upload : ') + (summary or 'nothing done'))
+
+    def _on_media_added(self, posts):
+        # new or loaded media: probe headers, and move into the media store when it's on
+        self.media_probe.request(posts)
+        if self.media_store is not None:
+            self._adopt_into_store(posts)
+
+    def _set_store_checkbox(self, checked):
+        self.store_checkbox.blockSignals(True)
+        self.store_checkbox.setChecked(checked)
+        self.store_checkbox.blockSignals(False)
+        self.store_gc_btn.setEnabled(checked)
+
+    def _on_store_toggled(self, checked):
+        if not checked:
+            # stored files and media_hash references stay; new media just aren't added
+            self.media_store = None
+            self.store_gc_btn.setEnabled(False)
+            return
+        if not self.project_path:
+            QMessageBox.information(self, "Managed media store",
+                                    "Save the project first; the store is kept in a folder next to the project file.")
+            self._set_store_checkbox(False)
+            return
+        store = MediaStore(store_path_for(self.project_path))
+        try:
+            store.create()
+        except OSError as e:
+            print('Could not create the media store:', e)
+            self._set_store_checkbox(False)
+            return
+        self.media_store = store
+        self.store_gc_btn.setEnabled(True)
+        self._adopt_into_store(self.posts)
+
+    def _open_media_store_for_project(self):
+        store = MediaStore(store_path_for(self.project_path)) if self.project_path else None
+        if store is None or not store.exists():
+            self.media_store = None
+            self._set_store_checkbox(False)
+            return
+        self.media_store = store
+        self._set_store_checkbox(True)
+        # after the project folder moved, find files again by their hash
+        for post in self.posts:
+            for m in post.get('media', []) or []:
+                content_hash = m.get('media_hash')
+                fp = m.get('file_path') or m.get('file')
+                if content_hash and (not fp or not os.path.exists(fp)):
+                    found = store.find(content_hash)
+                    if found:
+                        m['file_path'] = found.replace('\\', '/')
+
+    def _adopt_into_store(self, posts):
+        jobs = []
+        for post in posts:
+            for m in post.get('media', []) or []:
+                fp = m.get('file_path') or m.get('file')
+                if not fp or (m.get('media_hash') and self.media_store.contains(fp)):
+                    continue
+                token = self._store_token
+                self._store_token += 1
+                self._store_pending[token] = (post, m)
+                jobs.append((token, fp, dict(m.get('metadata') or {})))
+        if not jobs:
+            return
+        self._store_queue.extend(jobs)
+        self._start_store_worker()
 
-        for p in data:
-            # preserve and normalize local_data
-            local = p.get('local_data', {}) or {}
-            # ensure has_posted is carried into local_data whether it's top-level or inside local_data
-            local['has_posted'] = bool(p.get('has_posted', local.get('has_posted', False)))
-            # normalize keywords to list
-            kws = local.get('keywords', [])
-            if isinstance(kws, str):
-                kws = [k.strip() for k in kws.split(',') if k.strip()]
-            if kws is None:
-                kws = []
-            local.setdefault('post_name', '')
-            local.setdefault('date_modified', datetime.now().replace(microsecond=0).isoformat())
-            local['keywords'] = kws
-
-            post = {
-                'post_kind': p.get('post_kind', 'single'),
-                'caption': p.get('caption', ''),
-                'media': [],
-                'scheduled_time': p.get('scheduled_time'),
-                'post_options': p.get('post_options', {}),
-                'local_data': local
-            }
-            for m in p.get('media', []) or []:
-                # prefer file_path, fall back to URL
-                fp = m.get('file_path') or m.get('file') or m.get('URL')
-                # add to files_list for quick access (avoid duplicates)
-                if fp and fp not in self.imported_files:
-                    item = QListWidgetItem(os.path.basename(fp))
-                    item.setData(Qt.ItemDataRole.UserRole, fp)
-                    self.files_list.addItem(item)
-                    self.imported_files.append(fp)
-
-                media_entry = {
-                    'file_path': fp,
-                    'URL': m.get('URL'),
-                    'type': m.get('type', 'image'),
-                    'description': m.get('description', ''),
-                    'alt_text': m.get('alt_text', ''),
-                    'user_tags': m.get('user_tags', []),
-                    'location': m.get('location', {'id': None, 'name': None})
-                }
-                post['media'].append(media_entry)
-            posts.append(post)
+    def _start_store_worker(self):
+        if self._store_thread is not None or not self._store_queue or self.media_store is None:
+            return
+        jobs, self._store_queue = self._store_queue, []
+        thread = QThread(self)
+        worker = MediaStoreWorker(self.media_store, jobs)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.progress.connect(lambda done, total: self.store_checkbox.setText(f"Managed media store ( {done} / {total} )"))
+        worker.finished.connect(self._on_store_finished)
+        worker.finished.connect(thread.quit)
+        thread.finished.connect(worker.deleteLater)
+        thread.finished.connect(thread.deleteLater)
+        self._store_thread = thread
+        self._store_worker = worker
+        thread.start()
+
+    def _on_store_finished(self):
+        worker = self._store_worker
+        self._store_thread = None
+        self._store_worker = None
+        self.store_checkbox.setText("Managed media store")
+        changed = []
+        current = self.posts[self.current_index] if self.current_index is not None and self.current_index < len(self.posts) else None
+        refresh = False
+        for token, content_hash, dest in (worker.results if worker is not None else []):
+            post, m = self._store_pending.pop(token, (None, None))
+            if post is None:
+                continue
+            old = m.get('file_path') or m.get('file')
+            dest = dest.replace('\\', '/')
+            if old != dest:
+                m.setdefault('source_path', old)
+                m['file_path'] = dest
+                m.pop('file', None)
+            m['media_hash'] = content_hash
+            if not any(c is post for c in changed):
+                changed.append(post)
+                refresh = refresh or post is current
+        if worker is not None:
+            # jobs that failed are dropped from pending too
+            for token, _, _ in worker.jobs:
+                self._store_pending.pop(token, None)
+        if changed:
+            self._mark_posts_dirty(changed)
+        if refresh:
+            self.refresh_media_details()
+        self._start_store_worker()
 
-        self.posts = posts
-        if self.posts:
-            self.current_index = 0
+    def clean_media_store(self):
+        if self.media_store is None:
+            return
+        self.edits.flush()
+        keep = referenced_hashes(self.posts)
+        count, size = self.media_store.gc(keep, dry_run=True)
+        if not count:
+            QMessageBox.information(self, "Clean media store", "Every stored file is used by a post.")
+            return
+        answer = QMessageBox.question(self, "Clean media store",
+                                      f"Delete {count} stored files no post uses ( {size / (1 << 20):.1f} MB )?")
+        if answer != QMessageBox.StandardButton.Yes:
+            return
+        count, size = self.media_store.gc(keep)
+        print(f'Media store : removed {count} files, {size / (1 << 20):.1f} MB freed')
+
+    def _load_import_manifest(self, project_path):
+        self.import_manifest = new_import_manifest()
+        mpath = manifest_path_for(project_path)
+        if not os.path.exists(mpath):
+            return
+        try:
+            with open(mpath, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self.import_manifest['files'] = data.get('files', {}) or {}
+                self.import_manifest['dirs'] = data.get('dirs', {}) or {}
+        except Exception as e:
+            print('Failed to load import manifest:', e)
+
+    def _save_import_manifest(self, project_path):
+        # manifest entries are replaced rather than edited, so shallow copies are a safe snapshot
+        snapshot = {
+            'version': self.import_manifest.get('version', 1),
+            'files': dict(self.import_manifest.get('files', {})),
+            'dirs': dict(self.import_manifest.get('dirs', {})),
+        }
+        self.writer.write_json(manifest_path_for(project_path), snapshot)
+        self._manifest_dirty = False
+
+    def load_posts_from_json(self):
+        if self._import_thread is not None or self._load_thread is not None:
+            # the running import would add posts into the replaced project
+            return
+        fn, _ = QFileDialog.getOpenFileName(self, 'Load posts from JSON', '', 'Project Files (*.json *.db *.sqlite);;JSON Files (*.json);;SQLite Projects (*.db *.sqlite)')
+        if not fn:
+            return
+        if self.autosave_enabled:
+            # stop journaling into the previous project
+            self.autosave_checkbox.setChecked(False)
+        self.edits.flush()
+        self.project_path = fn
+        self._load_import_manifest(fn)
+        self._post_json_cache = {}
+        self._dirty_post_ids = set()
+        self._lazy_post_ids = set()
+        self.post_index.clear()
+
+        # clear current posts and files list; posts stream in from the worker
+        self.posts = []
+        self.current_index = None
+        self._clear_imported_files()
+        self.refresh_post_bar()
+
+        thread = QThread(self)
+        worker = ProjectLoadWorker(fn)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.batch_ready.connect(self._on_load_batch)
+        worker.finished.connect(self._on_load_finished)
+        worker.finished.connect(thread.quit)
+        thread.finished.connect(worker.deleteLater)
+        thread.finished.connect(thread.deleteLater)
+        self._load_thread = thread
+        self._load_worker = worker
+        self._set_project_controls_enabled(False)
+        thread.start()
+
+    def _set_project_controls_enabled(self, enabled):
+        # saving, autosave and whole-project passes need every post loaded; a save made
+        #   mid-load would replace the project ( or delete .db rows ) with the posts so far
+        for widget in (self.load_posts_btn, self.import_btn, self.save_all_btn, self.autosave_checkbox):
+            widget.setEnabled(enabled)
+        self.auto_group_btn.setEnabled(enabled and self._group_thread is None)
+        self.export_btn.setEnabled(enabled and self._export_thread is None)
+        self.host_btn.setEnabled(enabled and self._host_thread is None)
+
+    def _on_load_batch(self, raw_posts):
+        # Show posts as they're parsed; full post dicts are built in _hydrate_post when opened
+        self.files_list.setUpdatesEnabled(False)
+        try:
+            for p in raw_posts:
+                self._lazy_post_ids.add(id(p))
+                for m in p.get('media', []) or []:
+                    # add to files_list for quick access (avoid duplicates)
+                    self._add_imported_file(media_file_path(m))
+        finally:
+            self.files_list.setUpdatesEnabled(True)
+        first_batch = not self.posts
+        self.post_index.add_posts(raw_posts, len(self.posts))
+        self.post_model.append_posts(raw_posts)
+        self._after_posts_appended()
+        if first_batch and self.posts:
             self.load_post(0)
+
+    def _on_load_finished(self, ok, error):
+        self._load_thread = None
+        self._load_worker = None
+        self._set_project_controls_enabled(True)
+        if not ok:
+            print('Failed to load posts:', error)
+        recovered = self._recover_from_journal(self.project_path, self.posts) if self.project_path else []
+        if recovered:
+            # recovered posts replaced list entries in place
+            if self.current_index is not None:
+                self.load_post(self.current_index)
         self.refresh_post_bar()
+        if recovered:
+            self._mark_posts_dirty(recovered)
+            if ok:
+                # the load turned autosave off; write the recovered edits now so the journal
+                #   isn't their only copy, and start it afresh
+                self._write_checkpoint(self.project_path)
+        # a media store next to the project is picked up automatically
+        self._open_media_store_for_project()
+        # fill in metadata for media saved without it, or whose files changed since
+        self._on_media_added(self.posts)
+        if self._watch_pending:
+            self._run_watch_import([])
+
+    def _hydrate_post(self, index):
+        """Return the post at index, normalizing it first if it came straight from json."""
+        post = self.posts[index]
+        if id(post) in self._lazy_post_ids:
+            self._lazy_post_ids.discard(id(post))
+            raw = post
+            post = normalize_loaded_post(raw)
+            self.posts[index] = post
+            self.post_index.replace(raw, post)
+            self.validator.forget(raw)
+            self.validator.invalidate([post])
+            self._validate_timer.start()
+        return post
 
     def refresh_post_bar(self):
-        # remember horizontal scroll position so rebuilding doesn't jump
+        """Reset the post bar model after posts were added, removed or reordered.
+
+        Single-post edits should use _refresh_post_row instead.
+        """
+        # remember scroll position so resetting the model doesn't jump
         try:
-            hbar = self.post_bar_area.horizontalScrollBar()
-            prev_scroll = hbar.value()
+            vbar = self.post_bar_view.verticalScrollBar()
+            prev_scroll = vbar.value()
         except Exception:
-            hbar = None
+            vbar = None
             prev_scroll = 0
 
-        # update the total post count label if present
+        # re-index only posts that were added or removed
+        self.post_index.sync(self.posts)
+        self._sync_validation()
+        self.post_model.current_index = self.current_index
+        self.post_model.set_posts(self.posts, self._filtered_post_indices())
+        self._update_post_count_label()
+        self._on_posts_restructured()
+
+        # restore previous scroll location if possible
         try:
-            if hasattr(self, 'post_count_label'):
-                self.post_count_label.setText(f'Total Post Count : {len(self.posts)}')
+            if vbar is not None:
+                # clamp to maximum to avoid exceptions
+                vbar.setValue(min(prev_scroll, vbar.maximum()))
         except Exception:
             pass
 
-        # clear existing buttons
-        while self.post_bar_layout.count():
-            item = self.post_bar_layout.takeAt(0)
-            widget = item.widget()
-            if widget:
-                widget.setParent(None)
+    def _filtered_post_indices(self):
+        # post indices matching the search box, or None when it's empty
+        text = self.post_search_edit.text().strip()
+        if not text:
+            return None
+        return self.post_index.search(text)
+
+    def _apply_post_filter(self):
+        # Narrow the post bar to the search results; edits don't re-filter until the search changes
+        self.post_model.set_posts(self.posts, self._filtered_post_indices())
+        self._update_post_count_label()
+        if self.current_index is not None:
+            self._scroll_post_bar_to(self.current_index)
 
-        for idx, post in enumerate(self.posts):
-            local = post.get('local_data', {}) or {}
-            name = local.get('post_name') or ''
-            if name:
-                title = name
-            else:
-                title = f"Post {idx+1}"
-            btn = QPushButton(f"{idx+1} : {title}")
-            try:
-                btn.setFocusPolicy(Qt.FocusPolicy.NoFocus)
-            except Exception:
-                pass
-            try:
-                btn.setAutoDefault(False)
-                btn.setDefault(False)
-            except Exception:
-                pass
-            btn.setFixedHeight(40)
-            btn.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed)
-            btn.clicked.connect(lambda checked, i=idx: self.load_post(i))
-
-            # Determine background color based on selection and posted state
-            is_selected = (self.current_index == idx)
-            posted = bool(local.get('has_posted'))
-            if is_selected and posted:
-                btn.setStyleSheet('background-color: #96b596; color: black; font-weight: bold;')
-            elif is_selected:
-                btn.setStyleSheet('background-color: #707070; font-weight: bold;')
-            elif posted:
-                btn.setStyleSheet('background-color: #6eac6f; color: black;')
-            else:
-                # Default
-                btn.setStyleSheet('')
-            self.post_bar_layout.addWidget(btn)
+    def _after_posts_appended(self):
+        self._sync_validation()
+        if self.post_model.visible is not None:
+            self._apply_post_filter()
+        else:
+            self._update_post_count_label()
+
+    def _update_post_count_label(self):
+        # update the total post count label if present
+        try:
+            if hasattr(self, 'post_count_label'):
+                text = f'Total Post Count : {len(self.posts)}'
+                if self.post_model.visible is not None:
+                    text += f'  ( {len(self.post_model.visible)} shown )'
+                self.post_count_label.setText(text)
+        except Exception:
+            pass
 
-        # spacer to push items left
-        spacer = QWidget()
-        spacer.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Preferred)
-        self.post_bar_layout.addWidget(spacer)
+    def _refresh_post_row(self, index):
+        # Repaint a single post bar row after its name or posted state changed
+        try:
+            self.post_model.refresh_row(index)
+        except Exception:
+            pass
 
-        # restore previous scroll location if possible
+    def _scroll_post_bar_to(self, index):
+        row = self.post_model.view_row(index)
+        if row is None:
+            return
         try:
-            if hbar is not None:
-                # clamp to maximum to avoid exceptions
-                hbar.setValue(min(prev_scroll, hbar.maximum()))
+            self.post_bar_view.scrollTo(self.post_model.index(row, 0))
         except Exception:
             pass
 
+    def _sync_validation(self):
+        # check posts that were added ( or never checked ) since the last run
+        if self.validator.sync(self.posts):
+            self._validate_timer.start()
+
+    def _run_validation(self):
+        posts = self.validator.validate_stale()
+        if len(posts) > 200:
+            self.post_model.refresh_all()
+            return
+        for post in posts:
+            row = self._post_row(post)
+            if row is not None:
+                self.post_model.refresh_row(row)
+
+    def show_validation_report(self):
+        self.edits.flush()
+        self.validator.validate_all(self.posts)
+        self.post_model.refresh_all()
+        dlg = QDialog(self)
+        dlg.setWindowTitle("Instagram checks")
+        dlg.resize(640, 480)
+        layout = QVBoxLayout(dlg)
+        report = QTextEdit()
+        report.setReadOnly(True)
+        report.setPlainText(self.validator.report(self.posts))
+        layout.addWidget(report)
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        buttons.rejected.connect(dlg.reject)
+        layout.addWidget(buttons)
+        dlg.exec()
+
     def _select_random_post(self):
         """Select a random post and load it into the editor."""
         try:
@@ -923,11 +3426,8 @@ class pxlPostPrepper(QWidget):
                 return
             idx = random.randrange(len(self.posts))
             self.load_post(idx)
-            # ensure UI reflects selection
-            try:
-                self.refresh_post_bar()
-            except Exception:
-                pass
+            # ensure the selected row is visible
+            self._scroll_post_bar_to(idx)
         except Exception:
             return
 
@@ -936,39 +3436,44 @@ class pxlPostPrepper(QWidget):
         try:
             if not getattr(self, 'posts', None):
                 return
-            unposted_indices = [i for i, post in enumerate(self.posts) if not post.get('local_data', {}).get('has_posted')]
-            if not unposted_indices:
+            # the search index keeps the unposted set, so this doesn't scan the posts
+            idx = self.post_index.random_unposted()
+            if idx is None:
                 return
-            idx = random.choice(unposted_indices)
             self.load_post(idx)
-            # ensure UI reflects selection
-            try:
-                self.refresh_post_bar()
-            except Exception:
-                pass
+            # ensure the selected row is visible
+            self._scroll_post_bar_to(idx)
         except Exception:
             return
 
     def load_post(self, index):
         if index is None or index < 0 or index >= len(self.posts):
             return
+        # commit edits to the previously loaded post before switching
+        self.edits.flush()
         self.current_index = index
-        post = self.posts[index]
+        # move the post bar highlight to this post
+        self.post_model.set_current_index(index)
+        post = self._hydrate_post(index)
         # populate post-level metadata editors
         local = post.get('local_data', {})
-        self.post_name_edit.setText(local.get('post_name') or '')
-        kws = local.get('keywords') or []
-        if isinstance(kws, list):
-            self.keywords_edit.setText(','.join(kws))
-        else:
-            self.keywords_edit.setText(str(kws))
-        self.date_modified_label.setText(local.get('date_modified') or '')
-        # update posted checkbox to reflect this post's state
+        self._populating_editors = True
         try:
-            self.posted_checkbox.setChecked(bool(local.get('has_posted')))
-        except Exception:
-            pass
-        self.caption_edit.setPlainText(post.get('caption') or '')
+            self.post_name_edit.setText(local.get('post_name') or '')
+            kws = local.get('keywords') or []
+            if isinstance(kws, list):
+                self.keywords_edit.setText(','.join(kws))
+            else:
+                self.keywords_edit.setText(str(kws))
+            self.date_modified_label.setText(local.get('date_modified') or '')
+            # update posted checkbox to reflect this post's state
+            try:
+                self.posted_checkbox.setChecked(bool(local.get('has_posted')))
+            except Exception:
+                pass
+            self.caption_edit.setPlainText(post.get('caption') or '')
+        finally:
+            self._populating_editors = False
         media = post.get('media', [])
         if media:
             m = media[0]
@@ -988,11 +3493,14 @@ class pxlPostPrepper(QWidget):
                 pass
         """
         # update posted checkbox to reflect this post's state (do after details refresh)
+        self._populating_editors = True
         try:
             if hasattr(self, 'posted_checkbox'):
                 self.posted_checkbox.setChecked(bool(local.get('has_posted')))
         except Exception:
             pass
+        finally:
+            self._populating_editors = False
         # enable/disable merge left depending on whether there is a previous post
         try:
             # Merge left: only enabled when there's a previous post
@@ -1022,6 +3530,7 @@ class pxlPostPrepper(QWidget):
     def delete_current_post(self):
         if self.current_index is None:
             return
+        self.edits.flush()
         try:
             del self.posts[self.current_index]
         except Exception:
@@ -1049,6 +3558,10 @@ class pxlPostPrepper(QWidget):
         self.refresh_post_bar()
 
     def save_all_posts(self):
+        if self._load_thread is not None:
+            return
+        # commit anything typed since the last idle interval
+        self.edits.flush()
         if not self.posts:
             return
         # update current post from editor fields
@@ -1065,42 +3578,173 @@ class pxlPostPrepper(QWidget):
                     cur['scheduled_time'] = None
             """
         # Ask where to save
-        fn, _ = QFileDialog.getSaveFileName(self, 'Save posts to JSON', 'projectDataStruct.json', 'JSON Files (*.json)')
+        fn, _ = QFileDialog.getSaveFileName(self, 'Save posts to JSON', self.project_path or 'projectDataStruct.json', 'JSON Files (*.json);;SQLite Projects (*.db)')
         if not fn:
             return
-        # convert posts to array of projectDataStruct-like objects
-        out = []
+        if self.autosave_enabled and fn != self.project_path:
+            # the journal belongs to the old file
+            self.autosave_checkbox.setChecked(False)
+        self.project_path = fn
+        self._write_checkpoint(fn)
+        self._save_import_manifest(fn)
+
+    def _write_checkpoint(self, path):
+        """Snapshot the posts and hand them to the background writer.
+
+        Posts that haven't changed since the last checkpoint reuse their cached
+        json fragment, so only edited posts are copied here.
+        Does nothing while a project is still loading; see _set_project_controls_enabled.
+        """
+        if self._load_thread is not None:
+            return
+        items = []
+        cache = {}
         for p in self.posts:
-            # ensure shape
-            copy = {
-                'post_kind': p.get('post_kind', 'single'),
-                'caption': p.get('caption', ''),
-                'media': p.get('media', []),
-                'scheduled_time': p.get('scheduled_time'),
-                'post_options': p.get('post_options', {})
-            }
-            # include project-local metadata if present
-            if 'local_data' in p:
-                copy['local_data'] = p['local_data']
-            out.append(copy)
+            pid = id(p)
+            cached = self._post_json_cache.get(pid)
+            if cached is not None and cached[0] is p and pid not in self._dirty_post_ids:
+                items.append((pid, p, cached[1], None))
+                cache[pid] = cached
+            elif pid in self._lazy_post_ids:
+                # never opened; write it the way it would look once normalized, with the id it'll keep
+                ensure_post_id(p)
+                items.append((pid, p, None, post_to_project_shape(normalize_loaded_post(_copy_json(p)))))
+            else:
+                items.append((pid, p, None, post_to_project_shape(p)))
+        # drop fragments of deleted posts; snapshotted posts are clean until edited again
+        self._post_json_cache = cache
+        self._dirty_post_ids = set()
+        self._checkpoint_timer.stop()
+        # a full write makes any journal for this file redundant
+        self.writer.checkpoint(path, items, journal_path_for(path))
+
+    def _on_checkpoint_done(self, path, ok, fresh):
+        if not ok:
+            print('Failed to save posts to', path)
+            return
+        for pid, entry in fresh.items():
+            # a post edited while it was being written must be serialized again
+            if pid not in self._dirty_post_ids:
+                self._post_json_cache[pid] = entry
+        if not self.autosave_enabled:
+            print('Saved posts to', path)
+
+    def _mark_posts_dirty(self, posts):
+        for post in posts:
+            self._dirty_post_ids.add(id(post))
+            # keep the search index current, one post at a time
+            self.post_index.update(post)
+        self.validator.invalidate(posts)
+        self._validate_timer.start()
+        if self.autosave_enabled and not self._checkpoint_timer.isActive():
+            # edits are journaled right away; fold them into a full checkpoint every so often
+            self._checkpoint_timer.start(30000)
+
+    def _on_posts_restructured(self):
+        # journal entries refer to posts by index, so checkpoint soon after adds / deletes / merges
+        if self.autosave_enabled:
+            if not self._checkpoint_timer.isActive() or self._checkpoint_timer.remainingTime() > 1000:
+                self._checkpoint_timer.start(1000)
+
+    def _journal_posts(self, posts, rows):
+        if not self.autosave_enabled or not self.project_path:
+            return
+        entries = []
+        for post, row in zip(posts, rows):
+            if row is None:
+                continue
+            entries.append({'count': len(self.posts), 'index': row, 'post': post_to_project_shape(post)})
+        if entries:
+            self.writer.journal(journal_path_for(self.project_path), entries)
 
+    def _autosave_checkpoint(self):
+        if not self.autosave_enabled or not self.project_path:
+            return
+        self.edits.flush()
+        self._write_checkpoint(self.project_path)
+        if self._manifest_dirty:
+            self._save_import_manifest(self.project_path)
+
+    def _on_autosave_toggled(self, checked):
+        if checked and self._load_thread is not None:
+            self.autosave_checkbox.blockSignals(True)
+            self.autosave_checkbox.setChecked(False)
+            self.autosave_checkbox.blockSignals(False)
+            return
+        if not checked:
+            if self.autosave_enabled and self.project_path:
+                # leave a clean project file behind
+                self.edits.flush()
+                self._write_checkpoint(self.project_path)
+            self.autosave_enabled = False
+            self._checkpoint_timer.stop()
+            return
+        if not self.project_path:
+            fn, _ = QFileDialog.getSaveFileName(self, 'Autosave posts to JSON', 'projectDataStruct.json', 'JSON Files (*.json);;SQLite Projects (*.db)')
+            if not fn:
+                self.autosave_checkbox.blockSignals(True)
+                self.autosave_checkbox.setChecked(False)
+                self.autosave_checkbox.blockSignals(False)
+                return
+            self.project_path = fn
+        self.autosave_enabled = True
+        # start from a full checkpoint so the journal has a base to replay onto
+        self.edits.flush()
+        self._write_checkpoint(self.project_path)
+        self._save_import_manifest(self.project_path)
+
+    def _recover_from_journal(self, project_path, posts):
+        """Offer to replay edits journaled after the last checkpoint (ie after a crash).
+
+        Returns the recovered posts, which replace their entries in posts.
+        """
+        jpath = journal_path_for(project_path)
+        entries = []
         try:
-            with open(fn, 'w', encoding='utf-8') as f:
-                json.dump(out, f, indent=2)
-            print('Saved posts to', fn)
-        except Exception as e:
-            print('Failed to save posts:', e)
-    
+            with open(jpath, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        # a torn last line from the crash itself
+                        break
+        except OSError:
+            return []
+        if not entries:
+            return []
+        reply = QMessageBox.question(
+            self,
+            "Recover Edits",
+            f"Found {len(entries)} unsaved edit(s) from an autosave journal. Recover them?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        if reply != QMessageBox.StandardButton.Yes:
+            return []
+        recovered = {}
+        for entry in entries:
+            idx = entry.get('index')
+            # only entries made against the same post list line up with these posts
+            if entry.get('count') == len(posts) and isinstance(idx, int) and 0 <= idx < len(posts) and entry.get('post'):
+                self._lazy_post_ids.discard(id(posts[idx]))
+                posts[idx] = normalize_loaded_post(entry['post'])
+                recovered[idx] = posts[idx]
+        print(f'Recovered {len(recovered)} posts from {len(entries)} journaled edits')
+        return list(recovered.values())
+
     def _merge_left(self):
         # Move selected media (or all media if none selected) from current post into previous post and delete current post
         if self.current_index is None:
             return
+        self.edits.flush()
         if self.current_index == 0:
             return
         cur_idx = self.current_index
         prev_idx = cur_idx - 1
         cur_post = self.posts[cur_idx]
-        prev_post = self.posts[prev_idx]
+        prev_post = self._hydrate_post(prev_idx)
 
         cur_media = cur_post.get('media', [])
         if not cur_media:
@@ -1143,6 +3787,8 @@ class pxlPostPrepper(QWidget):
 
 
 if __name__ == "__main__":
+    # export runs a process pool; frozen ( pyinstaller ) builds need this before anything else
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
 
     icon_path = resource_path("Icon.ico")
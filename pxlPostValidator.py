@@ -0,0 +1,268 @@
+import os
+import re
+
+# NumPy is optional; media checks run column-wise over the whole project with it
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Instagram publishing checks for pxlPostPrepper posts
+#
+# Media checks use the header metadata probed into media['metadata'],
+#   so validating a project never decodes a file.
+# Media without metadata yet ( not probed, or a missing file ) are skipped
+#   by the size / aspect checks rather than flagged.
+
+CAROUSEL_MAX_ITEMS = 10
+CAPTION_MAX_CHARS = 2200
+CAPTION_MAX_HASHTAGS = 30
+CAPTION_MAX_MENTIONS = 20
+# aspect limits ( width / height ); pxlExport crops to these too
+IMAGE_MIN_ASPECT = 4 / 5  # portrait 4:5
+IMAGE_MAX_ASPECT = 1.91  # landscape 1.91:1
+VIDEO_MIN_ASPECT = 9 / 16  # reels can be 9:16
+VIDEO_MAX_ASPECT = 1.91
+IMAGE_MAX_BYTES = 8 * 1024 * 1024
+VIDEO_MAX_BYTES = 100 * 1024 * 1024
+VIDEO_MIN_SECONDS = 3
+VIDEO_MAX_SECONDS = 60  # feed and carousel videos
+ASPECT_TOLERANCE = 0.01  # rounding in exported sizes, ie 1080x1349
+
+# The Graph API only publishes JPEG images and mp4/mov videos
+PUBLISHABLE_IMAGE_EXTENSIONS = ('.jpg', '.jpeg')
+CONVERTIBLE_IMAGE_EXTENSIONS = ('.png', '.bmp', '.gif', '.webp')
+PUBLISHABLE_VIDEO_EXTENSIONS = ('.mp4', '.mov')
+
+ERROR = 'error'
+WARNING = 'warning'
+
+_HASHTAG_RE = re.compile(r'(?<![\w&])#\w+')
+_MENTION_RE = re.compile(r'(?<![\w.])@[\w.]+')
+
+
+def aspect_limits(video):
+    """(min, max) width / height Instagram takes for an image or a video."""
+    return (VIDEO_MIN_ASPECT, VIDEO_MAX_ASPECT) if video else (IMAGE_MIN_ASPECT, IMAGE_MAX_ASPECT)
+
+
+def ratio_label(aspect):
+    # 0.8 -> 4:5, 0.5625 -> 9:16, 1.91 -> 1.91:1
+    for d in range(1, 21):
+        n = round(aspect * d)
+        if n and abs(n / d - aspect) < 1e-6:
+            return f'{n}:{d}'
+    return f'{aspect:g}:1'
+
+
+def _media_path(m):
+    return m.get('file_path') or m.get('file') or m.get('URL') or ''
+
+
+def _media_is_video(m):
+    return (m.get('type') or 'image').lower() == 'video' or _media_path(m).lower().endswith(PUBLISHABLE_VIDEO_EXTENSIONS + ('.webm',))
+
+
+def _post_checks(post, issues):
+    # caption and structure checks; cheap enough per post
+    media = post.get('media', []) or []
+    caption = post.get('caption') or ''
+    kind = (post.get('post_kind') or post.get('type') or 'single').lower()
+    if not media:
+        issues.append((ERROR, 'No media'))
+    elif len(media) > CAROUSEL_MAX_ITEMS:
+        issues.append((ERROR, f'{len(media)} media; carousels take at most {CAROUSEL_MAX_ITEMS}'))
+    if kind == 'carousel' and len(media) == 1:
+        issues.append((WARNING, 'Carousel with a single media item'))
+    elif kind != 'carousel' and len(media) > 1:
+        issues.append((ERROR, f'post_kind is {kind} but it has {len(media)} media; only the first would be posted'))
+    if len(caption) > CAPTION_MAX_CHARS:
+        issues.append((ERROR, f'Caption is {len(caption)} characters; the limit is {CAPTION_MAX_CHARS}'))
+    tags = len(_HASHTAG_RE.findall(caption))
+    if tags > CAPTION_MAX_HASHTAGS:
+        issues.append((ERROR, f'{tags} hashtags; the limit is {CAPTION_MAX_HASHTAGS}'))
+    mentions = len(_MENTION_RE.findall(caption))
+    if mentions > CAPTION_MAX_MENTIONS:
+        issues.append((ERROR, f'{mentions} @mentions; the limit is {CAPTION_MAX_MENTIONS}'))
+
+
+def _media_columns(posts):
+    """Flatten every media entry of posts into parallel column lists."""
+    cols = {'post': [], 'item': [], 'video': [], 'width': [], 'height': [], 'bytes': [], 'duration': [], 'ext': []}
+    for p, post in enumerate(posts):
+        for i, m in enumerate(post.get('media', []) or []):
+            meta = m.get('metadata') or {}
+            cols['post'].append(p)
+            cols['item'].append(i)
+            cols['video'].append(_media_is_video(m))
+            cols['width'].append(meta.get('width') or 0)
+            cols['height'].append(meta.get('height') or 0)
+            cols['bytes'].append(meta.get('bytes') or 0)
+            duration = meta.get('duration')
+            cols['duration'].append(-1.0 if duration is None else duration)
+            cols['ext'].append(os.path.splitext(_media_path(m))[1].lower())
+    return cols
+
+
+def _media_flags(cols):
+    """{check name: list of media row numbers failing it}, computed column-wise."""
+    if np is not None:
+        video = np.array(cols['video'], dtype=bool)
+        width = np.array(cols['width'], dtype=np.float64)
+        height = np.array(cols['height'], dtype=np.float64)
+        size = np.array(cols['bytes'], dtype=np.int64)
+        duration = np.array(cols['duration'], dtype=np.float64)
+        known = (width > 0) & (height > 0)
+        aspect = np.divide(width, height, out=np.ones_like(width), where=known)
+        lo = np.where(video, VIDEO_MIN_ASPECT, IMAGE_MIN_ASPECT) - ASPECT_TOLERANCE
+        hi = np.where(video, VIDEO_MAX_ASPECT, IMAGE_MAX_ASPECT) + ASPECT_TOLERANCE
+        has_duration = duration >= 0
+        ext = np.array(cols['ext'], dtype=object)
+        flags = {
+            'aspect': known & ((aspect < lo) | (aspect > hi)),
+            'image_bytes': ~video & (size > IMAGE_MAX_BYTES),
+            'video_bytes': video & (size > VIDEO_MAX_BYTES),
+            'short': video & has_duration & (duration < VIDEO_MIN_SECONDS),
+            'long': video & has_duration & (duration > VIDEO_MAX_SECONDS),
+            'convert': ~video & np.isin(ext, CONVERTIBLE_IMAGE_EXTENSIONS),
+            'unsupported': (~video & ~np.isin(ext, PUBLISHABLE_IMAGE_EXTENSIONS + CONVERTIBLE_IMAGE_EXTENSIONS))
+                           | (video & ~np.isin(ext, PUBLISHABLE_VIDEO_EXTENSIONS)),
+        }
+        return {name: np.flatnonzero(mask).tolist() for name, mask in flags.items()}
+    flags = {name: [] for name in ('aspect', 'image_bytes', 'video_bytes', 'short', 'long', 'convert', 'unsupported')}
+    for r, video in enumerate(cols['video']):
+        w, h, size, duration, ext = cols['width'][r], cols['height'][r], cols['bytes'][r], cols['duration'][r], cols['ext'][r]
+        if w > 0 and h > 0:
+            lo, hi = aspect_limits(video)
+            if not lo - ASPECT_TOLERANCE <= w / h <= hi + ASPECT_TOLERANCE:
+                flags['aspect'].append(r)
+        if not video and size > IMAGE_MAX_BYTES:
+            flags['image_bytes'].append(r)
+        if video and size > VIDEO_MAX_BYTES:
+            flags['video_bytes'].append(r)
+        if video and 0 <= duration < VIDEO_MIN_SECONDS:
+            flags['short'].append(r)
+        if video and duration > VIDEO_MAX_SECONDS:
+            flags['long'].append(r)
+        if not video and ext in CONVERTIBLE_IMAGE_EXTENSIONS:
+            flags['convert'].append(r)
+        elif (not video and ext not in PUBLISHABLE_IMAGE_EXTENSIONS) or (video and ext not in PUBLISHABLE_VIDEO_EXTENSIONS):
+            flags['unsupported'].append(r)
+    return flags
+
+
+def validate_posts(posts):
+    """Instagram issues for each post, as lists of (level, message) in post order."""
+    results = [[] for _ in posts]
+    for post, issues in zip(posts, results):
+        _post_checks(post, issues)
+    cols = _media_columns(posts)
+    if not cols['post']:
+        return results
+    for name, rows in _media_flags(cols).items():
+        for r in rows:
+            item = cols['item'][r] + 1
+            w, h = cols['width'][r], cols['height'][r]
+            if name == 'aspect':
+                lo, hi = aspect_limits(cols['video'][r])
+                msg = (ERROR, f'Media {item}: aspect {w}x{h} ( {w / h:.2f} ) is outside {ratio_label(lo)} to {ratio_label(hi)}')
+            elif name == 'image_bytes':
+                msg = (ERROR, f'Media {item}: {cols["bytes"][r] / (1 << 20):.1f} MB image; the limit is {IMAGE_MAX_BYTES >> 20} MB')
+            elif name == 'video_bytes':
+                msg = (ERROR, f'Media {item}: {cols["bytes"][r] / (1 << 20):.1f} MB video; the limit is {VIDEO_MAX_BYTES >> 20} MB')
+            elif name == 'short':
+                msg = (ERROR, f'Media {item}: video is {cols["duration"][r]:.1f}s; at least {VIDEO_MIN_SECONDS}s is needed')
+            elif name == 'long':
+                msg = (ERROR, f'Media {item}: video is {cols["duration"][r]:.1f}s; feed videos can be {VIDEO_MAX_SECONDS}s')
+            elif name == 'convert':
+                msg = (WARNING, f'Media {item}: {cols["ext"][r]} needs converting to JPEG before posting')
+            else:
+                msg = (ERROR, f'Media {item}: unsupported file type {cols["ext"][r] or "( none )"}')
+            results[cols['post'][r]].append(msg)
+    return results
+
+
+def status_of(issues):
+    # worst level among a post's issues, or None when it's clean
+    if any(level == ERROR for level, _ in issues):
+        return ERROR
+    if issues:
+        return WARNING
+    return None
+
+
+class PostValidator:
+    """Keeps validation results per post and re-checks only posts marked changed.
+
+    Results are keyed by id(post), so they follow a post through reorders.
+    """
+
+    def __init__(self):
+        self.results = {}  # id(post) -> [(level, message)]
+        self._stale = {}  # id(post) -> post
+
+    def clear(self):
+        self.results = {}
+        self._stale = {}
+
+    def invalidate(self, posts):
+        for post in posts:
+            self._stale[id(post)] = post
+
+    def has_stale(self):
+        return bool(self._stale)
+
+    def sync(self, posts):
+        """Drop results for posts no longer in the project and queue posts never checked.
+
+        Returns True if anything was queued.
+        """
+        present = {id(p): p for p in posts}
+        self.results = {k: v for k, v in self.results.items() if k in present}
+        self._stale = {k: v for k, v in self._stale.items() if k in present}
+        for key, post in present.items():
+            if key not in self.results:
+                self._stale[key] = post
+        return bool(self._stale)
+
+    def validate_all(self, posts):
+        self._stale = {}
+        self.results = {id(p): issues for p, issues in zip(posts, validate_posts(posts))}
+
+    def validate_stale(self):
+        """Re-check posts invalidated since the last run; returns them."""
+        posts = list(self._stale.values())
+        self._stale = {}
+        for post, issues in zip(posts, validate_posts(posts)):
+            self.results[id(post)] = issues
+        return posts
+
+    def forget(self, post):
+        self.results.pop(id(post), None)
+        self._stale.pop(id(post), None)
+
+    def status(self, post):
+        return status_of(self.results.get(id(post), []))
+
+    def issues(self, post):
+        return self.results.get(id(post), [])
+
+    def report(self, posts):
+        """Project-wide report text, one block per post with issues."""
+        lines = []
+        errors = warnings = 0
+        for i, post in enumerate(posts):
+            issues = self.results.get(id(post), [])
+            if not issues:
+                continue
+            name = ((post.get('local_data') or {}).get('post_name') or '').strip()
+            lines.append(f"Post {i + 1}" + (f" : {name}" if name else ''))
+            for level, msg in issues:
+                lines.append(f"   [{level}] {msg}")
+                if level == ERROR:
+                    errors += 1
+                else:
+                    warnings += 1
+        clean = sum(1 for p in posts if not self.results.get(id(p)))
+        head = f"{len(posts)} posts : {clean} ready, {errors} errors, {warnings} warnings"
+        return head + ('\n\n' + '\n'.join(lines) if lines else '')
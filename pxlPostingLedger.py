@@ -0,0 +1,195 @@
+import os
+import json
+import time
+import hashlib
+import threading
+
+# Append-only posting ledger for postToInstagram
+#
+# Every container created, every publish attempt and every publish result is appended
+#   to <project>.ledger.jsonl and synced to disk before the run moves on, so a run that
+#   dies partway through can be restarted:
+#   - containers are looked up by a hash of the exact payload that made them, so a
+#     restarted carousel reuses the children it already uploaded
+#   - a post with a published record is never published again
+#   - a publish that started but never recorded its result is checked against the
+#     container's status before anything is retried
+# A torn last line from a crash is ignored when the ledger is read.
+
+LEDGER_SUFFIX = '.ledger.jsonl'
+CONTAINER_TTL = 23 * 60 * 60  # containers expire after 24 hours; leave some margin
+COMPACT_MIN_LINES = 2000  # rewrite the file on open once it's this long and mostly stale
+
+
+def ledger_path_for(project_path):
+    base, _ = os.path.splitext(project_path)
+    return base + LEDGER_SUFFIX
+
+
+def _digest(value):
+    return hashlib.sha1(json.dumps(value, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class PostingLedger:
+    """State folded from the ledger file, plus appends as publishing goes on.
+
+    Safe to use from the carousel worker threads.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.containers = {}  # (account, payload hash) -> (container id, created time)
+        self.children = {}  # carousel container id -> its child container ids
+        self.attempts = {}  # (account, container id) -> post hash of a publish that started
+        self.published = {}  # (account, post hash) -> record
+        self.published_containers = {}  # (account, container id) -> record
+        lines = self._load()
+        if lines >= COMPACT_MIN_LINES and lines > 2 * self._live_count():
+            self.compact()
+        self._file = open(self.path, 'a', encoding='utf-8')
+        if self._file.tell() and not self._ends_with_newline():
+            # end a torn last line, so the next record starts a line of its own
+            self._file.write('\n')
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    # -- Reading --
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return 0
+        count = 0
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                count += 1
+                self._apply(record)
+        return count
+
+    def _ends_with_newline(self):
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    def _apply(self, record):
+        event = record.get('event')
+        account = record.get('account')
+        if event == 'container':
+            self.containers[(account, record['payload'])] = (record['id'], record.get('time', 0))
+            if record.get('children'):
+                self.children[record['id']] = record['children']
+        elif event == 'container_dropped':
+            self.containers.pop((account, record['payload']), None)
+        elif event == 'publishing':
+            self.attempts[(account, record['container'])] = record['post']
+        elif event == 'publish_failed' and record.get('resolved'):
+            self.attempts.pop((account, record['container']), None)
+        elif event == 'published':
+            self.attempts.pop((account, record['container']), None)
+            self.published[(account, record['post'])] = record
+            self.published_containers[(account, record['container'])] = record
+            # a container publishes once, children included; the same payload for another post needs new ones
+            used = {record['container'], *self.children.pop(record['container'], [])}
+            for key in [k for k, (cid, _) in self.containers.items() if k[0] == account and cid in used]:
+                del self.containers[key]
+
+    def _live_count(self):
+        now = time.time()
+        live = sum(1 for _, created in self.containers.values() if now - created < CONTAINER_TTL)
+        return live + len(self.attempts) + len(self.published)
+
+    # -- Writing --
+
+    def _append(self, record):
+        record = dict(record, time=record.get('time') or time.time())
+        with self._lock:
+            self._apply(record)
+            self._file.write(json.dumps(record) + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def compact(self):
+        """Rewrite the ledger with only what's still needed: live containers,
+        unresolved publish attempts and published posts."""
+        now = time.time()
+        records = [dict({'event': 'container', 'account': a, 'payload': p, 'id': cid, 'time': t},
+                        **({'children': self.children[cid]} if cid in self.children else {}))
+                   for (a, p), (cid, t) in self.containers.items() if now - t < CONTAINER_TTL]
+        records += [{'event': 'publishing', 'account': a, 'container': c, 'post': post}
+                    for (a, c), post in self.attempts.items()]
+        records += list(self.published.values())
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self.containers = {k: v for k, v in self.containers.items() if now - v[1] < CONTAINER_TTL}
+        live = {cid for cid, _ in self.containers.values()}
+        self.children = {k: v for k, v in self.children.items() if k in live}
+
+    # -- Containers; the GraphClient container cache interface --
+
+    def get(self, account_id, payload):
+        """Container id made earlier from the same payload, if it hasn't expired."""
+        entry = self.containers.get((account_id, _digest(payload)))
+        if entry and time.time() - entry[1] < CONTAINER_TTL:
+            return entry[0]
+        return None
+
+    def put(self, account_id, payload, container_id):
+        record = {'event': 'container', 'account': account_id, 'payload': _digest(payload), 'id': container_id}
+        if payload.get('children'):
+            record['children'] = payload['children'].split(',')
+        self._append(record)
+
+    def discard(self, account_id, payload):
+        key = (account_id, _digest(payload))
+        if key in self.containers:
+            self._append({'event': 'container_dropped', 'account': account_id, 'payload': key[1]})
+
+    # -- Publishing --
+
+    def post_result(self, account_id, post_key):
+        """The publish result recorded for a post, or None if it was never published."""
+        record = self.published.get((account_id, _digest(post_key)))
+        return record and record.get('result')
+
+    def container_result(self, account_id, container_id):
+        record = self.published_containers.get((account_id, container_id))
+        return record and record.get('result')
+
+    def attempted(self, account_id, container_id):
+        # a publish that started and has no recorded result; it may have gone out
+        return (account_id, container_id) in self.attempts
+
+    def attempt_for(self, account_id, post_key):
+        """Container of the post's unresolved publish attempt, or None."""
+        digest = _digest(post_key)
+        for (account, container_id), post in list(self.attempts.items()):
+            if account == account_id and post == digest:
+                return container_id
+        return None
+
+    def publishing(self, account_id, post_key, container_id):
+        # written before media_publish is called
+        self._append({'event': 'publishing', 'account': account_id, 'post': _digest(post_key), 'container': container_id})
+
+    def record_result(self, account_id, post_key, container_id, result, resolved=False):
+        """resolved marks a failure known not to have published, ie the container errored."""
+        if result and result.get('id'):
+            self._append({'event': 'published', 'account': account_id, 'post': _digest(post_key),
+                          'container': container_id, 'result': result})
+        else:
+            # kept for the record; unless resolved the attempt stays open, since a
+            #   failed call can still have published
+            self._append({'event': 'publish_failed', 'account': account_id, 'post': _digest(post_key),
+                          'container': container_id, 'result': result, 'resolved': resolved})
@@ -0,0 +1,294 @@
+import os
+import sys
+import json
+import sqlite3
+
+# SQLite project format for pxlPostPrepper / postToInstagram
+#
+# Each post's projectDataStruct json is kept verbatim in posts.doc, so converting
+#   json -> sqlite -> json gives back the same file.
+# The other columns and tables are derived from that json when a post is written,
+#   and exist for indexed queries ( unposted posts with keyword X, which post uses a file, etc. )
+
+PROJECT_DB_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS posts (
+    id INTEGER PRIMARY KEY,
+    position INTEGER NOT NULL,
+    doc TEXT NOT NULL,
+    post_kind TEXT,
+    post_name TEXT,
+    caption TEXT,
+    date_modified TEXT
+);
+CREATE INDEX IF NOT EXISTS posts_position ON posts(position);
+CREATE TABLE IF NOT EXISTS media (
+    id INTEGER PRIMARY KEY,
+    post_id INTEGER NOT NULL REFERENCES posts(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    file_path TEXT,
+    url TEXT,
+    type TEXT,
+    alt_text TEXT
+);
+CREATE INDEX IF NOT EXISTS media_post ON media(post_id);
+CREATE INDEX IF NOT EXISTS media_file_path ON media(file_path);
+CREATE INDEX IF NOT EXISTS media_type ON media(type);
+CREATE TABLE IF NOT EXISTS keywords (
+    post_id INTEGER NOT NULL REFERENCES posts(id) ON DELETE CASCADE,
+    keyword TEXT NOT NULL COLLATE NOCASE
+);
+CREATE INDEX IF NOT EXISTS keywords_keyword ON keywords(keyword, post_id);
+CREATE INDEX IF NOT EXISTS keywords_post ON keywords(post_id);
+CREATE TABLE IF NOT EXISTS posting_state (
+    post_id INTEGER PRIMARY KEY REFERENCES posts(id) ON DELETE CASCADE,
+    has_posted INTEGER NOT NULL,
+    scheduled_time TEXT
+);
+CREATE INDEX IF NOT EXISTS posting_state_posted ON posting_state(has_posted, scheduled_time);
+"""
+SCHEMA_VERSION = "1"
+
+
+def is_project_db(path):
+    return bool(path) and path.lower().endswith(PROJECT_DB_EXTENSIONS)
+
+
+def post_doc(post):
+    # Same per-post text json.dump(posts, indent=2) would write, minus the list indent
+    return json.dumps(post, indent=2)
+
+
+def _post_has_posted(post):
+    # GUI keeps has_posted in local_data, postToInstagram marks posts with a top-level 'posted'
+    local = post.get('local_data', {}) or {}
+    return bool(post.get('has_posted', local.get('has_posted', False)) or post.get('posted'))
+
+
+def _post_keywords(post):
+    local = post.get('local_data', {}) or {}
+    kws = local.get('keywords') or []
+    if isinstance(kws, str):
+        kws = kws.split(',')
+    return sorted({str(k).strip() for k in kws if str(k).strip()}, key=str.lower)
+
+
+class ProjectStore:
+    """A project saved as a SQLite database.
+
+    save_posts() takes the posts' json docs in order and only writes rows for
+    posts whose json changed; unchanged posts that moved just get a new position.
+    Connections are per-thread in sqlite3, so use a store from the thread that made it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.execute("INSERT OR IGNORE INTO meta(key, value) VALUES ('schema_version', ?)", (SCHEMA_VERSION,))
+        self.conn.commit()
+        # doc text -> [row ids] and row id -> position, loaded on the first save
+        self._rows_by_doc = None
+        self._positions = None
+
+    def close(self):
+        self.conn.close()
+
+    # -- Reading --
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+
+    def iter_docs(self, batch_size=1000):
+        """Yield lists of post json docs in project order."""
+        cur = self.conn.execute("SELECT doc FROM posts ORDER BY position, id")
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            yield [r[0] for r in rows]
+
+    def load_posts(self):
+        posts = []
+        for docs in self.iter_docs():
+            posts.extend(json.loads(d) for d in docs)
+        return posts
+
+    def query_positions(self, has_posted=None, keyword=None, media_type=None, file_path=None):
+        """Project positions ( indices ) of posts matching every given filter.
+
+        ie query_positions(has_posted=False, keyword='caves') for unposted posts tagged 'caves'
+        """
+        sql = "SELECT DISTINCT p.position FROM posts p"
+        joins = []
+        where = []
+        args = []
+        if has_posted is not None:
+            joins.append("JOIN posting_state s ON s.post_id = p.id")
+            where.append("s.has_posted = ?")
+            args.append(1 if has_posted else 0)
+        if keyword is not None:
+            joins.append("JOIN keywords k ON k.post_id = p.id")
+            where.append("k.keyword = ?")
+            args.append(keyword.strip())
+        if media_type is not None or file_path is not None:
+            joins.append("JOIN media m ON m.post_id = p.id")
+            if media_type is not None:
+                where.append("m.type = ?")
+                args.append(media_type)
+            if file_path is not None:
+                where.append("m.file_path = ?")
+                args.append(file_path)
+        if joins:
+            sql += " " + " ".join(joins)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY p.position"
+        return [r[0] for r in self.conn.execute(sql, args)]
+
+    # -- Writing --
+
+    def _load_row_index(self):
+        self._rows_by_doc = {}
+        self._positions = {}
+        for rowid, position, doc in self.conn.execute("SELECT id, position, doc FROM posts"):
+            self._rows_by_doc.setdefault(doc, []).append(rowid)
+            self._positions[rowid] = position
+
+    def save_posts(self, docs):
+        """Make the stored project match docs ( post json texts, in order ).
+
+        Returns (inserted, deleted, moved) row counts.
+        """
+        if self._rows_by_doc is None:
+            self._load_row_index()
+        # hand out existing rows to identical docs first
+        pool = {doc: list(ids) for doc, ids in self._rows_by_doc.items()}
+        keep = []  # (rowid, position, doc)
+        new = []  # (position, doc)
+        for position, doc in enumerate(docs):
+            ids = pool.get(doc)
+            if ids:
+                # with identical posts, prefer the row already at this position
+                pick = len(ids) - 1
+                for i, rowid in enumerate(ids):
+                    if self._positions.get(rowid) == position:
+                        pick = i
+                        break
+                keep.append((ids.pop(pick), position, doc))
+            else:
+                new.append((position, doc))
+        stale = [rowid for ids in pool.values() for rowid in ids]
+        moved = [(position, rowid) for rowid, position, _ in keep if self._positions.get(rowid) != position]
+
+        with self.conn:
+            if stale:
+                self.conn.executemany("DELETE FROM posts WHERE id = ?", [(r,) for r in stale])
+            if moved:
+                self.conn.executemany("UPDATE posts SET position = ? WHERE id = ?", moved)
+            inserted = [(self._insert_post(position, doc), position, doc) for position, doc in new]
+
+        rows_by_doc = {}
+        positions = {}
+        for rowid, position, doc in keep + inserted:
+            rows_by_doc.setdefault(doc, []).append(rowid)
+            positions[rowid] = position
+        self._rows_by_doc = rows_by_doc
+        self._positions = positions
+        return len(inserted), len(stale), len(moved)
+
+    def save_post_dicts(self, posts):
+        return self.save_posts([post_doc(p) for p in posts])
+
+    def _insert_post(self, position, doc):
+        post = json.loads(doc)
+        local = post.get('local_data', {}) or {}
+        cur = self.conn.execute(
+            "INSERT INTO posts(position, doc, post_kind, post_name, caption, date_modified) VALUES (?, ?, ?, ?, ?, ?)",
+            (position, doc, post.get('post_kind', post.get('type')), local.get('post_name'),
+             post.get('caption'), local.get('date_modified'))
+        )
+        rowid = cur.lastrowid
+        media_rows = []
+        for i, m in enumerate(post.get('media', []) or []):
+            media_rows.append((rowid, i, m.get('file_path') or m.get('file'), m.get('URL'),
+                               (m.get('type') or 'image').lower(), m.get('alt_text')))
+        if media_rows:
+            self.conn.executemany(
+                "INSERT INTO media(post_id, position, file_path, url, type, alt_text) VALUES (?, ?, ?, ?, ?, ?)",
+                media_rows
+            )
+        kws = _post_keywords(post)
+        if kws:
+            self.conn.executemany("INSERT INTO keywords(post_id, keyword) VALUES (?, ?)", [(rowid, k) for k in kws])
+        self.conn.execute(
+            "INSERT INTO posting_state(post_id, has_posted, scheduled_time) VALUES (?, ?, ?)",
+            (rowid, 1 if _post_has_posted(post) else 0, post.get('scheduled_time'))
+        )
+        return rowid
+
+    # -- projectDataStruct json conversion --
+
+    def import_json(self, json_path):
+        with open(json_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        posts = data if isinstance(data, list) else [data]
+        return self.save_post_dicts(posts)
+
+    def export_json(self, json_path):
+        docs = [d for batch in self.iter_docs() for d in batch]
+        write_text_atomic(json_path, docs_to_json_text(docs))
+
+
+def docs_to_json_text(docs):
+    # same layout json.dump(posts, f, indent=2) produces for the whole list
+    if not docs:
+        return '[]'
+    return '[\n' + ',\n'.join('  ' + doc.replace('\n', '\n  ') for doc in docs) + '\n]'
+
+
+def write_text_atomic(path, text):
+    """Write to a temp file next to path, fsync it, then rename it over path.
+
+    A crash mid-write leaves the previous file untouched.
+    """
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def main(argv):
+    usage = "Usage: python pxlProjectStore.py import <posts.json> <project.db>\n" \
+            "       python pxlProjectStore.py export <project.db> <posts.json>"
+    if len(argv) != 3 or argv[0] not in ('import', 'export'):
+        print(usage)
+        return 1
+    if argv[0] == 'import':
+        src, dest = argv[1], argv[2]
+        store = ProjectStore(dest)
+        inserted, deleted, moved = store.import_json(src)
+        print(f"Imported {src} -> {dest} ; {inserted} written, {deleted} removed, {moved} moved")
+    else:
+        src, dest = argv[1], argv[2]
+        if not os.path.exists(src):
+            print("Project database not found:", src)
+            return 1
+        store = ProjectStore(src)
+        store.export_json(dest)
+        print(f"Exported {src} -> {dest} ; {store.count()} posts")
+    store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
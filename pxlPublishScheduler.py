@@ -0,0 +1,389 @@
+import time
+import heapq
+import itertools
+import threading
+from datetime import datetime
+from pxlGraphApi import GraphApiError, backoff_delay
+
+# Publishing queue for postToInstagram
+#
+# Posts wait in a heap ordered by ( time they can go, priority ), and each account
+#   has a token bucket holding its publishing budget, refilled evenly over the window.
+# While an account has budget its posts go out back to back; once it's spent they
+#   wait for the next token instead of failing, so a long queue drains at the
+#   fastest rate Instagram allows without anyone rerunning the script.
+# Posts that hit throttling or server errors are requeued with exponential backoff;
+#   other failures are handed back straight away.
+# Video containers have to finish processing before they can be published. A post
+#   waiting on them is parked with the ContainerPoller, which checks every pending
+#   container in one status call, backing off while they're still processing, and
+#   the post is resumed as soon as they're ready; other posts publish in the meantime.
+# ScheduleIndex holds posts with a future scheduled_time, soonest first, for the
+#   posting daemon to hand over to the scheduler as each one comes due.
+
+PUBLISH_LIMIT = 25  # posts per account per window
+PUBLISH_WINDOW = 24 * 60 * 60
+POST_RETRIES = 5
+POST_RETRY_DELAY = 60.0  # first requeue of a post that failed; doubles each time
+POST_RETRY_MAX_DELAY = 60 * 60.0
+POST_MAX_WAITS = 10  # times one post can be parked waiting on containers
+POLL_FIRST_DELAY = 3.0  # seconds; longer videos get a later first check
+POLL_MAX_INTERVAL = 30.0
+POLL_BACKOFF = 1.5
+POLL_TIMEOUT = 20 * 60.0  # a container still processing after this is given up on
+POLL_BATCH = 50  # ids per status call
+POLL_SLACK = 1.0  # containers due this soon are checked early, in the same call
+
+
+def _duration(seconds):
+    if seconds < 90:
+        return f"{seconds:.0f}s"
+    if seconds < 90 * 60:
+        return f"{seconds / 60:.0f} min"
+    return f"{seconds / 3600:.1f} h"
+
+
+def parse_scheduled_time(value):
+    """scheduled_time ( ISO 8601, local time unless it has an offset ) as a unix time, or None."""
+    if not value:
+        return None
+    try:
+        text = str(value).strip()
+        if text.endswith('Z'):
+            text = text[:-1] + '+00:00'
+        return datetime.fromisoformat(text).timestamp()
+    except (ValueError, OverflowError, OSError):
+        return None
+
+
+class ScheduleIndex:
+    """Posts waiting for their scheduled_time, in a heap keyed by due time.
+
+    Entries for posts that were discarded or re-added are skipped lazily when they
+      reach the top, so changing one post never means re-sorting the rest.
+    """
+
+    def __init__(self):
+        self._heap = []  # (due, seq, post)
+        self._live = {}  # id(post) -> seq of its current entry
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return len(self._live)
+
+    def add(self, post, due):
+        seq = next(self._seq)
+        self._live[id(post)] = seq
+        heapq.heappush(self._heap, (due, seq, post))
+
+    def discard(self, post):
+        self._live.pop(id(post), None)
+
+    def _prune(self):
+        while self._heap and self._live.get(id(self._heap[0][2])) != self._heap[0][1]:
+            heapq.heappop(self._heap)
+
+    def next_due(self):
+        self._prune()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now):
+        """[(due, post)] for every post due at or before now."""
+        due = []
+        self._prune()
+        while self._heap and self._heap[0][0] <= now:
+            when, _, post = heapq.heappop(self._heap)
+            del self._live[id(post)]
+            due.append((when, post))
+            self._prune()
+        return due
+
+
+class TokenBucket:
+    """capacity tokens, refilled continuously at capacity / window per second."""
+
+    def __init__(self, capacity=PUBLISH_LIMIT, window=PUBLISH_WINDOW):
+        self.capacity = capacity
+        self.rate = capacity / window
+        self.tokens = float(capacity)
+        self.stamp = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def take(self):
+        self._refill()
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    def give_back(self):
+        # a publish that never happened
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+    def available(self):
+        # whole publishes that could go out now
+        self._refill()
+        return int(self.tokens)
+
+    def wait_time(self):
+        """Seconds until a token is available."""
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def set_used(self, used, capacity=None, window=None):
+        # sync with the usage the API reports
+        window = window or self.capacity / self.rate
+        if capacity:
+            self.capacity = capacity
+        self.rate = self.capacity / window
+        self.tokens = float(max(0, self.capacity - used))
+        self.stamp = time.monotonic()
+
+    def drain(self):
+        # the API said the limit is reached, whatever our count says
+        self._refill()
+        self.tokens = min(self.tokens, 0.0)
+
+
+class Pending:
+    """Returned by a publish step whose containers are still processing.
+
+    resume() is called once they're all FINISHED and returns the same kinds of
+      results as the publish step did. expected is the longest video's duration,
+      to pace the first status check.
+    """
+
+    def __init__(self, container_ids, resume, expected=0):
+        self.container_ids = [cid for cid in container_ids if cid]
+        self.resume = resume
+        self.expected = expected or 0
+
+
+class ContainerPoller:
+    """Tracks processing containers and reports each waiting group once it's ready."""
+
+    def __init__(self, client, log=print):
+        self.client = client
+        self.log = log
+        self.entries = {}  # container id -> {'due', 'interval', 'deadline', 'groups'}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, container_ids, callback, expected=0):
+        """callback(error) runs once all container_ids are FINISHED ( error None ) or one fails."""
+        group = {'waiting': set(container_ids), 'callback': callback, 'done': False}
+        if not group['waiting']:
+            callback(None)
+            return
+        now = time.monotonic()
+        first = min(POLL_MAX_INTERVAL, max(POLL_FIRST_DELAY, expected / 4))
+        for cid in container_ids:
+            entry = self.entries.setdefault(cid, {'due': now + first, 'interval': first,
+                                                  'deadline': now + POLL_TIMEOUT, 'groups': []})
+            entry['groups'].append(group)
+
+    def next_due(self):
+        if not self.entries:
+            return None
+        return min(e['due'] for e in self.entries.values())
+
+    def _resolve(self, cid, error):
+        entry = self.entries.pop(cid)
+        for group in entry['groups']:
+            if group['done']:
+                continue
+            group['waiting'].discard(cid)
+            if error or not group['waiting']:
+                group['done'] = True
+                # drop the group's other containers from the poll unless another group wants them
+                for other in group['waiting']:
+                    e = self.entries.get(other)
+                    if e and group in e['groups']:
+                        e['groups'].remove(group)
+                        if not e['groups']:
+                            del self.entries[other]
+                group['callback'](error)
+
+    def poll(self):
+        """Check every container that's due, in batches of POLL_BATCH ids per call."""
+        now = time.monotonic()
+        due = [cid for cid, e in self.entries.items() if e['due'] <= now + POLL_SLACK]
+        for start in range(0, len(due), POLL_BATCH):
+            batch = due[start:start + POLL_BATCH]
+            try:
+                statuses = self.client.container_status(batch)
+            except GraphApiError as e:
+                self.log(f"Container status check failed : {e}")
+                statuses = {}
+            now = time.monotonic()
+            for cid in batch:
+                if cid not in self.entries:
+                    continue
+                code, text = statuses.get(cid, (None, ''))
+                if code in ('FINISHED', 'PUBLISHED'):
+                    self._resolve(cid, None)
+                elif code in ('ERROR', 'EXPIRED'):
+                    self._resolve(cid, f"Container {cid} {code.lower()} : {text}".rstrip(' :'))
+                elif now >= self.entries[cid]['deadline']:
+                    self._resolve(cid, f"Container {cid} still processing after {_duration(POLL_TIMEOUT)}")
+                else:
+                    # IN_PROGRESS, or the lookup failed; check back less often each time
+                    entry = self.entries[cid]
+                    entry['interval'] = min(POLL_MAX_INTERVAL, entry['interval'] * POLL_BACKOFF)
+                    entry['due'] = now + entry['interval']
+
+
+class PublishScheduler:
+    """Publishes queued posts as fast as each account's budget allows.
+
+    publish(post, account_id) returns the media_publish result ( a dict with 'id' on
+      success, None or an error dict otherwise ), a Pending to wait on processing
+      containers, or raises GraphApiError to be retried.
+    on_done(post, result) is called once per post with the final result.
+    A post's budget token is taken when it starts and given back if it doesn't publish,
+      so posts waiting on videos keep their place in the budget. A failed publish that
+      went out after all is corrected by the API's publishing limit error ( drain ).
+    """
+
+    def __init__(self, publish, on_done=None, limit=PUBLISH_LIMIT, window=PUBLISH_WINDOW,
+                 retries=POST_RETRIES, log=print, poller=None):
+        self.publish = publish
+        self.on_done = on_done
+        self.poller = poller
+        self.limit = limit
+        self.window = window
+        self.retries = retries
+        self.log = log
+        self.buckets = {}  # account id -> TokenBucket
+        self._heap = []  # (ready time, priority, seq, job)
+        self._seq = itertools.count()
+        self._stop = threading.Event()
+        self._waiting = set()  # accounts already reported as out of budget
+
+    def __len__(self):
+        return len(self._heap)
+
+    def bucket(self, account_id):
+        if account_id not in self.buckets:
+            self.buckets[account_id] = TokenBucket(self.limit, self.window)
+        return self.buckets[account_id]
+
+    def seed(self, account_id, used, total=None, window=None):
+        """Start an account's bucket from the API's content_publishing_limit."""
+        self.bucket(account_id).set_used(used, total, window)
+
+    def add(self, post, account_id, priority=()):
+        """Queue a post; lower priority tuples go first."""
+        job = {'post': post, 'account': account_id, 'priority': priority, 'attempts': 0,
+               'step': None, 'waits': 0}
+        self._push(job, 0.0)
+
+    def _push(self, job, ready):
+        heapq.heappush(self._heap, (ready, job['priority'], next(self._seq), job))
+
+    def stop(self):
+        self._stop.set()
+
+    def stopped(self):
+        return self._stop.is_set()
+
+    def _finish(self, job, result):
+        if self.on_done:
+            self.on_done(job['post'], result)
+
+    def _park(self, job, pending):
+        # wait on processing containers; the job comes back to the heap when they're done
+        job['waits'] += 1
+        if self.poller is None or job['waits'] > POST_MAX_WAITS:
+            self.bucket(job['account']).give_back()
+            self._finish(job, {'error': {'message': 'Containers never became ready to publish'}})
+            return
+        job['step'] = pending.resume
+
+        def ready(error):
+            if error:
+                self.log(error)
+                self.bucket(job['account']).give_back()
+                self._finish(job, {'error': {'message': error}})
+            else:
+                self._push(job, 0.0)
+        self.poller.add(pending.container_ids, ready, pending.expected)
+
+    def _next_wake(self):
+        times = []
+        if self._heap:
+            times.append(self._heap[0][0])
+        if self.poller is not None and len(self.poller):
+            times.append(self.poller.next_due())
+        return min(times) if times else None
+
+    def run(self, until=None):
+        """Publish until the queue is empty and nothing is processing, or stop() is called.
+
+        With until ( a time.monotonic() deadline ) it returns once nothing is due before
+          it instead, so a caller can add posts and call run again.
+        """
+        waiting = self._waiting
+        while not self._stop.is_set():
+            wake = self._next_wake()
+            now = time.monotonic()
+            if wake is None or wake > now:
+                if until is None:
+                    if wake is None:
+                        break
+                else:
+                    if now >= until:
+                        break
+                    wake = until if wake is None else min(wake, until)
+                self._stop.wait(wake - now)
+                continue
+            if self.poller is not None and len(self.poller) and self.poller.next_due() <= now:
+                self.poller.poll()
+                continue
+            _, _, _, job = heapq.heappop(self._heap)
+            account = job['account']
+            bucket = self.bucket(account)
+            step = job['step']
+            if step is None:
+                wait = bucket.wait_time()
+                if wait > 0:
+                    if account not in waiting:
+                        waiting.add(account)
+                        self.log(f"Publishing limit reached for {account}; next post in {_duration(wait)}")
+                    self._push(job, now + wait)
+                    continue
+                waiting.discard(account)
+                bucket.take()
+            try:
+                result = step() if step else self.publish(job['post'], account)
+            except GraphApiError as e:
+                if e.publish_limit:
+                    # doesn't count against the post; it just waits for budget
+                    bucket.drain()
+                    self._push(job, time.monotonic() + bucket.wait_time())
+                    continue
+                job['attempts'] += 1
+                if job['attempts'] > self.retries:
+                    bucket.give_back()
+                    self._finish(job, {'error': e.error})
+                    continue
+                if step is None:
+                    bucket.give_back()
+                delay = max(e.retry_after or 0, backoff_delay(job['attempts'], POST_RETRY_DELAY, POST_RETRY_MAX_DELAY))
+                self.log(f"Post retry {job['attempts']}/{self.retries} in {delay:.0f}s : {e}")
+                self._push(job, time.monotonic() + delay)
+                continue
+            if isinstance(result, Pending):
+                self._park(job, result)
+                continue
+            if not (result and result.get('id')):
+                # nothing was published
+                bucket.give_back()
+            self._finish(job, result)
@@ -0,0 +1,120 @@
+import json
+import time
+import itertools
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlparse
+
+# Local stand-in for the Instagram Graph API, enough for GraphClient's calls
+#
+# POST /<account>/media makes a container ( video_url ones process for `processing` seconds ),
+#   POST /<account>/media_publish publishes one, GET /?ids= reads container status and
+#   GET /<account>/content_publishing_limit answers with the limit.
+# POST / with a batch form runs each item as its own call and answers with their
+#   {code, body} entries, like the Graph API's batch requests; batch_items keeps them.
+# script[url or path substring] is a list of (status, body) answers to give before behaving
+#   normally, ie [(500, {'error': {'code': 2}})] for one transient failure. In a batch a
+#   status of None answers the item with null, as for an item the batch didn't get to.
+#   A third item adds response headers, ie {'Retry-After': '120'}.
+# headers are sent with every response, ie a usage header.
+# status[container id] overrides a container's status_code, ie 'ERROR' or 'EXPIRED'.
+# Every request is kept in calls as (method, path, form, client port).
+
+
+class GraphStandIn:
+    def __init__(self, processing=0.0):
+        self.processing = processing
+        self.calls = []
+        self.containers = {}  # id -> (ready time, payload)
+        self.script = {}
+        self.batch_items = []
+        self.headers = {}
+        self.status = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                n = int(self.headers.get('Content-Length') or 0)
+                url = urlparse(self.path)
+                form = {k: v[0] for k, v in parse_qs(self.rfile.read(n).decode() or url.query).items()}
+                with standin._lock:
+                    standin.calls.append((self.command, url.path, form, self.client_address[1]))
+                headers = dict(standin.headers)
+                if self.command == 'POST' and 'batch' in form:
+                    status, body = 200, standin.handle_batch(url.path, json.loads(form['batch']))
+                else:
+                    status, body, *extra = standin.handle(self.command, url.path, form)
+                    if status is None:
+                        status, body = 500, {'error': {'message': 'timed out', 'code': 2}}
+                    headers.update(*extra)
+                out = json.dumps(body).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(out)))
+                self.end_headers()
+                self.wfile.write(out)
+
+            do_GET = do_POST
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/v21.0"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _scripted(self, method, path, form):
+        target = form.get('image_url') or form.get('video_url') or ''
+        with self._lock:
+            for key, answers in self.script.items():
+                if answers and (key in target or key in path):
+                    return answers.pop(0)
+        return None
+
+    def handle(self, method, path, form):
+        now = time.monotonic()
+        scripted = self._scripted(method, path, form)
+        if scripted is not None:
+            return scripted
+        if method == 'GET' and path.rstrip('/').endswith('v21.0'):
+            return 200, {cid: {'id': cid, 'status_code': self.status.get(cid) or
+                               ('FINISHED' if now >= self.containers[cid][0] else 'IN_PROGRESS')}
+                         for cid in form['ids'].split(',') if cid in self.containers}
+        if path.endswith('content_publishing_limit'):
+            return 200, {'data': [{'config': {'quota_total': 25, 'quota_duration': 86400}, 'quota_usage': 0}]}
+        if path.endswith('/media'):
+            if form.get('media_type') == 'CAROUSEL':
+                if any(self.containers[c][0] > now for c in form['children'].split(',')):
+                    return 400, {'error': {'message': 'child not ready', 'code': 100}}
+            cid = str(next(self._ids))
+            self.containers[cid] = (now + (self.processing if 'video_url' in form else 0), form)
+            return 200, {'id': cid}
+        if path.endswith('media_publish'):
+            cid = form['creation_id']
+            if self.containers[cid][0] > now:
+                return 400, {'error': {'message': 'not ready', 'code': 9007, 'error_subcode': 2207027}}
+            return 200, {'id': 'pub' + cid}
+        return 404, {'error': {'message': f'unknown path {path}', 'code': 100}}
+
+    def handle_batch(self, path, items):
+        answers = []
+        for item in items:
+            form = {k: v[0] for k, v in parse_qs(item.get('body', '')).items()}
+            with self._lock:
+                self.batch_items.append((item['method'], item['relative_url'], form))
+            status, body, *_ = self.handle(item['method'], path.rstrip('/') + '/' + item['relative_url'], form)
+            answers.append(None if status is None else {'code': status, 'body': json.dumps(body)})
+        return answers
+
+    def media_calls(self):
+        return [c for c in self.calls if c[1].endswith('/media')]
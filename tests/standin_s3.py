@@ -0,0 +1,112 @@
+import re
+import hmac
+import uuid
+import hashlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qsl, quote
+
+# Local stand-in for an S3-compatible bucket ( path-style ), enough for pxlMediaHost
+#
+# Every request's Signature Version 4 is checked against secret_key, and refused with a
+#   403 like S3 does when it doesn't match. Supports HEAD, PUT, and multipart uploads
+#   ( initiate, upload part, complete, abort ).
+# objects maps /bucket/key to (body, content type); calls keeps (method, path, query).
+
+
+def _signature_ok(headers, method, raw_path, body, secret):
+    match = re.match(r'AWS4-HMAC-SHA256 Credential=([^/]+)/(\d{8})/([^/]+)/s3/aws4_request, '
+                     r'SignedHeaders=([^,]+), Signature=([0-9a-f]+)$', headers.get('Authorization', ''))
+    if not match:
+        return False
+    _, datestamp, region, signed, signature = match.groups()
+    payload_hash = headers.get('x-amz-content-sha256', '')
+    if hashlib.sha256(body).hexdigest() != payload_hash:
+        return False
+    url = urlsplit(raw_path)
+    query = '&'.join(f"{quote(k, safe='-_.~')}={quote(v, safe='-_.~')}"
+                     for k, v in sorted(parse_qsl(url.query, keep_blank_values=True)))
+    signed = signed.split(';')
+    canonical = '\n'.join([method, url.path, query,
+                           ''.join(f"{h}:{(headers.get(h) or '').strip()}\n" for h in signed),
+                           ';'.join(signed), payload_hash])
+    to_sign = '\n'.join(['AWS4-HMAC-SHA256', headers.get('x-amz-date', ''), f"{datestamp}/{region}/s3/aws4_request",
+                         hashlib.sha256(canonical.encode()).hexdigest()])
+    key = ('AWS4' + secret).encode()
+    for part in (datestamp, region, 's3', 'aws4_request'):
+        key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+    return hmac.compare_digest(hmac.new(key, to_sign.encode(), hashlib.sha256).hexdigest(), signature)
+
+
+class S3StandIn:
+    def __init__(self, secret_key='secret'):
+        self.secret_key = secret_key
+        self.objects = {}
+        self.uploads = {}  # upload id -> {part number: body}
+        self.calls = []
+        self._lock = threading.Lock()
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body=b'', headers=None):
+                self.send_response(status)
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if self.command != 'HEAD':
+                    self.wfile.write(body)
+
+            def _handle(self):
+                n = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(n) if n else b''
+                url = urlsplit(self.path)
+                query = dict(parse_qsl(url.query, keep_blank_values=True))
+                with standin._lock:
+                    standin.calls.append((self.command, url.path, query))
+                if not _signature_ok(self.headers, self.command, self.path, body, standin.secret_key):
+                    return self._send(403, b'<Error><Code>SignatureDoesNotMatch</Code></Error>')
+                self._send(*standin.handle(self.command, url.path, query, body, self.headers))
+
+            do_HEAD = do_PUT = do_POST = do_DELETE = _handle
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.endpoint = f"http://127.0.0.1:{self.server.server_port}"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def handle(self, method, path, query, body, headers):
+        with self._lock:
+            if method == 'HEAD':
+                return (200,) if path in self.objects else (404,)
+            if method == 'PUT' and 'partNumber' in query:
+                self.uploads[query['uploadId']][int(query['partNumber'])] = body
+                return 200, b'', {'ETag': '"%s"' % hashlib.md5(body).hexdigest()}
+            if method == 'PUT':
+                self.objects[path] = (body, headers.get('content-type'))
+                return (200,)
+            if method == 'POST' and 'uploads' in query:
+                upload_id = uuid.uuid4().hex
+                self.uploads[upload_id] = {}
+                return 200, ('<?xml version="1.0" encoding="UTF-8"?><InitiateMultipartUploadResult '
+                             'xmlns="http://s3.amazonaws.com/doc/2006-03-01/"><UploadId>%s</UploadId>'
+                             '</InitiateMultipartUploadResult>' % upload_id).encode()
+            if method == 'POST' and 'uploadId' in query:
+                parts = self.uploads.pop(query['uploadId'])
+                numbers = [int(x) for x in re.findall(rb'<PartNumber>(\d+)</PartNumber>', body)]
+                if numbers != sorted(parts):
+                    return 400, b'<Error><Code>InvalidPart</Code></Error>'
+                self.objects[path] = (b''.join(parts[i] for i in numbers), 'multipart')
+                return 200, b'<CompleteMultipartUploadResult/>'
+            if method == 'DELETE':
+                self.uploads.pop(query.get('uploadId'), None)
+                return (204,)
+        return 400, b'<Error><Code>NotImplemented</Code></Error>'
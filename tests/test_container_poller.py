@@ -0,0 +1,81 @@
+import time
+
+import pytest
+
+import pxlGraphApi
+import pxlPublishScheduler
+from pxlGraphApi import GraphClient
+from pxlPublishScheduler import ContainerPoller
+from standin_graph import GraphStandIn
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    monkeypatch.setattr(pxlGraphApi, 'backoff_delay', lambda *a, **k: 0.0)
+    monkeypatch.setattr(pxlPublishScheduler, 'POLL_FIRST_DELAY', 0.02)
+    monkeypatch.setattr(pxlPublishScheduler, 'POLL_MAX_INTERVAL', 0.05)
+    standin = GraphStandIn(processing=0.3)
+    yield standin
+    standin.close()
+
+
+def video(n):
+    return {'URL': f'http://media/{n}.mp4', 'type': 'video'}
+
+
+def status_calls(graph):
+    return [c for c in graph.calls if c[0] == 'GET' and 'ids' in c[2]]
+
+
+def drain(poller, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while len(poller) and time.monotonic() < deadline:
+        time.sleep(max(0.0, poller.next_due() - time.monotonic()))
+        poller.poll()
+
+
+def test_poller_stops_once_containers_finish(graph):
+    client = GraphClient('token', graph.url, log=None)
+    ids = [client.create_media_container('123', video(n)) for n in range(3)]
+    ready = time.monotonic() + 0.3
+    for cid in ids:
+        graph.containers[cid] = (ready, graph.containers[cid][1])
+    poller = ContainerPoller(client, log=None)
+    errors = []
+    poller.add(ids[:2], errors.append)
+    poller.add(ids[1:], errors.append)
+    drain(poller)
+    assert errors == [None, None] and len(poller) == 0
+    # every due container is checked in the same call, and nothing is checked after
+    assert all(c[2]['ids'] == ','.join(ids) for c in status_calls(graph))
+    calls = len(status_calls(graph))
+    poller.poll()
+    time.sleep(0.1)
+    poller.poll()
+    assert len(status_calls(graph)) == calls
+
+
+@pytest.mark.parametrize('code', ['ERROR', 'EXPIRED'])
+def test_poller_stops_on_a_failed_container(graph, code):
+    client = GraphClient('token', graph.url, log=None)
+    ids = [client.create_media_container('123', video(n)) for n in range(2)]
+    graph.status[ids[0]] = code
+    poller = ContainerPoller(client, log=None)
+    errors = []
+    poller.add(ids, errors.append)
+    drain(poller)
+    # reported once, and the group's other container isn't polled any longer
+    assert len(errors) == 1 and code.lower() in errors[0] and ids[0] in errors[0]
+    assert len(poller) == 0 and len(status_calls(graph)) == 1
+
+
+def test_poller_gives_up_after_the_timeout(graph, monkeypatch):
+    monkeypatch.setattr(pxlPublishScheduler, 'POLL_TIMEOUT', 0.1)
+    client = GraphClient('token', graph.url, log=None)
+    cid = client.create_media_container('123', video(1))
+    graph.containers[cid] = (time.monotonic() + 60, graph.containers[cid][1])
+    poller = ContainerPoller(client, log=None)
+    errors = []
+    poller.add([cid], errors.append)
+    drain(poller)
+    assert len(errors) == 1 and 'still processing' in errors[0] and len(poller) == 0
@@ -0,0 +1,121 @@
+import os
+import time
+
+import pytest
+
+pytest.importorskip('PyQt6.QtWidgets')
+
+from pxlPostPrepper import DirectoryImportWorker, new_import_manifest, manifest_path_key
+
+
+def write(path, data=b'media'):
+    with open(path, 'wb') as f:
+        f.write(data)
+    return str(path)
+
+
+def age(path, seconds=60):
+    t = time.time() - seconds
+    os.utime(path, (t, t))
+
+
+def scan(folder, manifest, referenced=(), **kwargs):
+    """Run an import pass like the GUI does; returns the emitted paths and merges the manifest."""
+    worker = DirectoryImportWorker(str(folder), recursive=True, manifest=manifest,
+                                   referenced={manifest_path_key(p) for p in referenced}, **kwargs)
+    found = []
+    worker.batch_ready.connect(found.extend)
+    worker.run()
+    manifest['files'].update(worker.updates['files'])
+    manifest['dirs'].update(worker.updates['dirs'])
+    return sorted(os.path.basename(p) for p in found), worker
+
+
+def test_reimport_skips_unchanged_and_used_files(tmp_path):
+    sub = tmp_path / 'sub'
+    sub.mkdir()
+    a = write(tmp_path / 'a.jpg')
+    write(tmp_path / 'b.png')
+    write(tmp_path / 'notes.txt')
+    used = write(sub / 'used.jpg')
+    manifest = new_import_manifest()
+    found, _ = scan(tmp_path, manifest, referenced=[used])
+    assert found == ['a.jpg', 'b.png']
+    assert manifest_path_key(used) in manifest['files']
+
+    # nothing changed: both folders are skipped without being listed
+    found, worker = scan(tmp_path, manifest)
+    assert found == [] and worker.updates == {'files': {}, 'dirs': {}}
+
+    # a new file is the only new post; a re-written one keeps its post and refreshes its entry
+    write(a, b'edited media')
+    write(tmp_path / 'c.jpg')
+    found, worker = scan(tmp_path, manifest)
+    assert found == ['c.jpg']
+    assert set(worker.updates['files']) == {manifest_path_key(a), manifest_path_key(tmp_path / 'c.jpg')}
+    assert manifest['files'][manifest_path_key(a)]['size'] == len(b'edited media')
+    assert scan(tmp_path, manifest)[0] == []
+
+
+def test_file_still_being_written_is_picked_up_later(tmp_path):
+    manifest = new_import_manifest()
+    age(write(tmp_path / 'old.jpg'))
+    fresh = write(tmp_path / 'fresh.mp4')
+    found, worker = scan(tmp_path, manifest, settle_seconds=30, new_only=True)
+    assert found == ['old.jpg'] and worker.deferred == 1
+    # the folder wasn't recorded, so the next pass lists it again once the file settles
+    assert manifest_path_key(tmp_path) not in manifest['dirs']
+    age(fresh)
+    found, _ = scan(tmp_path, manifest, settle_seconds=30, new_only=True)
+    assert found == ['fresh.mp4']
+    assert scan(tmp_path, manifest, settle_seconds=30, new_only=True)[0] == []
+
+
+def test_changed_filters_list_the_folder_again(tmp_path):
+    manifest = new_import_manifest()
+    write(tmp_path / 'a.jpg')
+    write(tmp_path / 'a_draft.jpg')
+    assert scan(tmp_path, manifest, exclude=['*_draft*'])[0] == ['a.jpg']
+    assert scan(tmp_path, manifest)[0] == ['a_draft.jpg']
+
+
+def test_watch_pass_lists_only_changed_and_new_folders(tmp_path):
+    deep = tmp_path / 'sub' / 'deep'
+    deep.mkdir(parents=True)
+    write(tmp_path / 'a.jpg')
+    write(tmp_path / 'sub' / 'b.jpg')
+    write(deep / 'c.jpg')
+    manifest = new_import_manifest()
+    assert scan(tmp_path, manifest, new_only=True)[0] == ['a.jpg', 'b.jpg', 'c.jpg']
+
+    write(tmp_path / 'sub' / 'new.jpg')
+    found, worker = scan(tmp_path, manifest, new_only=True, changed_dirs=[str(tmp_path / 'sub')])
+    assert found == ['new.jpg'] and worker.visited_dirs == [str(tmp_path / 'sub')]
+
+    # a new folder is walked from the folder it appeared in; known ones are left to their own watch
+    (tmp_path / 'added').mkdir()
+    write(tmp_path / 'added' / 'x.jpg')
+    write(deep / 'd.jpg')
+    found, worker = scan(tmp_path, manifest, new_only=True, changed_dirs=[str(tmp_path)])
+    assert found == ['x.jpg'] and worker.visited_dirs == [str(tmp_path), str(tmp_path / 'added')]
+    assert scan(tmp_path, manifest, new_only=True, changed_dirs=[str(deep)])[0] == ['d.jpg']
+
+
+def test_folder_watcher_reports_the_changed_folders(tmp_path):
+    from PyQt6.QtCore import QCoreApplication, QEventLoop, QTimer
+    from pxlPostPrepper import FolderWatcher
+    app = QCoreApplication.instance() or QCoreApplication([])  # noqa: F841, needed for the event loop
+    (tmp_path / 'a').mkdir()
+    (tmp_path / 'b').mkdir()
+    watcher = FolderWatcher(debounce_ms=100, poll_ms=50)
+    watcher.add_dirs([str(tmp_path / 'a'), str(tmp_path / 'b')])
+    seen = []
+    loop = QEventLoop()
+    watcher.changed.connect(lambda dirs: (seen.append(dirs), loop.quit()))
+    QTimer.singleShot(5000, loop.quit)
+    write(tmp_path / 'a' / 'one.jpg')
+    write(tmp_path / 'a' / 'two.jpg')
+    loop.exec()
+    # one signal for the burst, naming only the folder that changed
+    assert seen == [[str(tmp_path / 'a')]]
+    watcher.stop()
@@ -0,0 +1,105 @@
+import time
+import json
+
+import pytest
+
+import pxlGraphApi
+from pxlGraphApi import GraphClient, CONTAINER_TTL, _payload_key
+from standin_graph import GraphStandIn
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    monkeypatch.setattr(pxlGraphApi, 'backoff_delay', lambda *a, **k: 0.0)
+    standin = GraphStandIn()
+    yield standin
+    standin.close()
+
+
+def payload(name):
+    return {'image_url': f'http://media/{name}.jpg'}
+
+
+def test_batch_retries_throttled_and_unprocessed_items(graph):
+    graph.script['throttled'] = [(400, {'error': {'message': 'slow down', 'code': 4}})]
+    graph.script['skipped'] = [(None, None)]
+    graph.script['reject'] = [(400, {'error': {'message': 'Invalid image', 'code': 100}})]
+    client = GraphClient('token', graph.url, log=None)
+    names = ['ok', 'throttled', 'skipped', 'reject']
+    results = client.batch([('POST', '123/media', payload(n)) for n in names])
+    assert [bool(r.get('id')) for r in results] == [True, True, True, False]
+    assert results[3]['error']['code'] == 100
+    # one batch for all four, one more for the two that can be retried
+    assert len(graph.calls) == 2 and len(graph.batch_items) == 6
+    assert (client.api_calls, client.round_trips) == (6, 2)
+
+
+def test_batch_splits_at_the_batch_limit(graph):
+    client = GraphClient('token', graph.url, log=None)
+    results = client.batch([('POST', '123/media', payload(n)) for n in range(120)])
+    assert all(r.get('id') for r in results)
+    assert len(graph.calls) == 3
+
+
+def test_batch_entries_without_a_code(monkeypatch):
+    client = GraphClient('token', 'http://127.0.0.1:9/v21.0', log=None, retries=0)
+    answer = [{'code': None, 'body': json.dumps({'error': {'message': 'x', 'code': 100}})},
+              {'code': 400, 'body': json.dumps({'error': 'plain text'})},
+              {'code': 200, 'body': json.dumps({'id': '9'})}]
+    monkeypatch.setattr(client, 'request', lambda *a, **k: answer)
+    results = client.batch([('POST', '123/media', payload(n)) for n in range(3)])
+    assert results == [{'error': {'message': 'x', 'code': 100}}, {'error': {'message': 'plain text'}}, {'id': '9'}]
+
+
+def test_create_containers_maps_results_to_items(graph):
+    graph.script['reject'] = [(400, {'error': {'message': 'Invalid image', 'code': 100}})]
+    client = GraphClient('token', graph.url, log=None)
+    items = [(payload('a'), 'a'), (payload('reject'), 'reject'), (payload('b'), 'b'), (payload('a'), 'a again')]
+    ids = client.create_containers('123', items)
+    # the same payload twice gets two containers; each can only be published once
+    assert ids[1] is None and len({ids[0], ids[2], ids[3]}) == 3
+    for cid, (p, _) in zip(ids, items):
+        if cid:
+            assert graph.containers[cid][1]['image_url'] == p['image_url']
+    assert len(graph.calls) == 1 and len(graph.batch_items) == 4
+    # create_container picks the results up, errors included, without requests of its own
+    assert client.create_container('123', payload('b')) == ids[2]
+    assert client.create_container('123', payload('reject')) is None
+    assert [client.create_container('123', payload('a')) for _ in range(2)] == [ids[0], ids[3]]
+    assert len(graph.calls) == 1
+
+
+def test_prepared_containers_expire_and_clear(graph):
+    client = GraphClient('token', graph.url, log=None)
+    [cid] = client.create_containers('123', [(payload('a'), 'a')])
+    key = ('123', _payload_key(payload('a')))
+    client._prepared[key] = [(result, time.time() - CONTAINER_TTL - 1) for result, _ in client._prepared[key]]
+    assert client.create_container('123', payload('a')) not in (None, cid)
+    client.create_containers('123', [(payload('b'), 'b')])
+    client.clear_prepared()
+    calls = len(graph.calls)
+    assert client.create_container('123', payload('b'))
+    assert len(graph.calls) == calls + 1
+
+
+def test_batch_mode_publishes_a_project(graph, tmp_path, monkeypatch):
+    import postToInstagram
+    monkeypatch.setattr(postToInstagram, 'GRAPH_API_URL', graph.url)
+    image = lambda name: {'URL': f'http://media/{name}.jpg', 'type': 'image'}
+    posts = [{'caption': f'set {k}', 'post_kind': 'carousel', 'media': [image(f'{k}_{j}') for j in range(5)]}
+             for k in range(4)]
+    posts += [{'caption': 'single', 'media': [image('one')]}, {'caption': 'single again', 'media': [image('one')]}]
+    project = tmp_path / 'posts.json'
+    project.write_text(json.dumps(posts))
+    account = postToInstagram.Account('123', 'token', str(project), str(tmp_path / 'posted'), batch=True)
+    postToInstagram.run_account(account)
+    account.ledger.close()
+    assert all(p['posted'] for p in postToInstagram.load_json(str(project)))
+    published = [graph.containers[c[2]['creation_id']][1] for c in graph.calls if c[1].endswith('media_publish')]
+    assert len(published) == 6
+    for k in range(4):
+        [parent] = [p for p in published if p.get('caption') == f'set {k}']
+        urls = [graph.containers[c][1]['image_url'] for c in parent['children'].split(',')]
+        assert urls == [f'http://media/{k}_{j}.jpg' for j in range(5)]
+    # every container went out in a batch: children and singles in one, the parents in another
+    assert len(graph.media_calls()) == 0 and len(graph.batch_items) == 20 + 2 + 4
@@ -0,0 +1,77 @@
+import pytest
+
+import pxlGraphApi
+from pxlGraphApi import GraphClient
+from standin_graph import GraphStandIn
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    monkeypatch.setattr(pxlGraphApi, 'backoff_delay', lambda *a, **k: 0.0)
+    standin = GraphStandIn()
+    yield standin
+    standin.close()
+
+
+def image(n):
+    return {'URL': f'http://media/{n}.jpg', 'type': 'image'}
+
+
+def test_carousel_children_in_media_order_over_pooled_connections(graph):
+    with GraphClient('token', graph.url, max_workers=4, log=None) as client:
+        parent = client.create_carousel('123', {'caption': 'hi', 'media': [image(n) for n in range(8)]})
+    children = graph.containers[parent][1]['children'].split(',')
+    assert [graph.containers[c][1]['image_url'] for c in children] == [f'http://media/{n}.jpg' for n in range(8)]
+    assert len(graph.media_calls()) == 9
+    # connections are reused: no more than one per worker plus the parent call
+    assert len({c[3] for c in graph.calls}) <= 5
+
+
+def test_transient_error_is_retried(graph):
+    graph.script['flaky'] = [(500, {'error': {'message': 'try again', 'code': 2, 'is_transient': True}})]
+    client = GraphClient('token', graph.url, log=None)
+    assert client.create_media_container('123', image('flaky'))
+    assert len(graph.media_calls()) == 2
+
+
+def test_permanent_error_is_returned(graph):
+    graph.script['bad'] = [(400, {'error': {'message': 'Invalid image', 'code': 100}})]
+    client = GraphClient('token', graph.url, log=None)
+    assert client.create_media_container('123', image('bad')) is None
+    assert len(graph.media_calls()) == 1
+
+
+def test_publish_is_not_repeated_after_a_5xx(graph):
+    client = GraphClient('token', graph.url, log=None)
+    cid = client.create_media_container('123', image(1))
+    graph.script['media_publish'] = [(500, {'error': {'message': 'unknown', 'code': 1}})]
+    assert 'error' in client.publish_container('123', cid)
+    assert sum(1 for c in graph.calls if c[1].endswith('media_publish')) == 1
+
+
+def test_container_status_is_one_call(graph):
+    client = GraphClient('token', graph.url, log=None)
+    ids = [client.create_media_container('123', image(n)) for n in range(3)]
+    before = len(graph.calls)
+    status = client.container_status(ids)
+    assert {cid: code for cid, (code, _) in status.items()} == {cid: 'FINISHED' for cid in ids}
+    assert len(graph.calls) == before + 1
+
+
+def test_cached_container_serves_one_caller(graph, tmp_path):
+    from pxlPostingLedger import PostingLedger
+    path = str(tmp_path / 'posts.ledger.jsonl')
+    first = GraphClient('token', graph.url, log=None)
+    first.containers = PostingLedger(path)
+    first_parent = first.create_carousel('123', {'caption': 'once', 'media': [image('same'), image('other')]})
+    cid = graph.containers[first_parent][1]['children'].split(',')[0]
+    first.containers.close()
+    # a restarted run reuses the container once; the same image again gets a new one
+    client = GraphClient('token', graph.url, log=None)
+    client.containers = PostingLedger(path)
+    parent = client.create_carousel('123', {'caption': 'twice', 'media': [image('same'), image('same')]})
+    children = graph.containers[parent][1]['children'].split(',')
+    assert cid in children and len(set(children)) == 2
+    again = client.create_carousel('123', {'caption': 'again', 'media': [image('same'), image('other')]})
+    assert graph.containers[again][1]['children'].split(',')[0] not in children
+    client.containers.close()
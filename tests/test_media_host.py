@@ -0,0 +1,97 @@
+import os
+import json
+
+import pytest
+
+pytest.importorskip('PyQt6.QtGui')  # pxlMediaHost hashes with pxlMediaTools
+
+import pxlMediaHost
+from pxlMediaHost import S3Bucket, MediaHost, MediaHostError, build_host_jobs, apply_host_results
+from standin_s3 import S3StandIn
+
+
+@pytest.fixture
+def s3():
+    standin = S3StandIn()
+    yield standin
+    standin.close()
+
+
+def make_host(s3, secret='secret'):
+    return MediaHost(S3Bucket(s3.endpoint, 'bucket', 'access', secret), prefix='media/',
+                     public_url='https://cdn.example.com')
+
+
+def write(path, size):
+    with open(path, 'wb') as f:
+        f.write(os.urandom(size))
+    return str(path)
+
+
+def test_signed_put_and_head(s3):
+    bucket = S3Bucket(s3.endpoint, 'bucket', 'access', 'secret')
+    assert not bucket.exists('media/a b.jpg')
+    bucket.put('media/a b.jpg', b'data', {'content-type': 'image/jpeg'})
+    assert bucket.exists('media/a b.jpg')
+    assert s3.objects['/bucket/media/a%20b.jpg'] == (b'data', 'image/jpeg')
+
+
+def test_wrong_secret_is_refused(s3):
+    bucket = S3Bucket(s3.endpoint, 'bucket', 'access', 'wrong')
+    with pytest.raises(MediaHostError, match='403'):
+        bucket.put('media/a.jpg', b'data')
+    assert not s3.objects
+
+
+def test_existing_object_is_not_uploaded_again(s3, tmp_path):
+    host = make_host(s3)
+    path = write(tmp_path / 'a.jpg', 2000)
+    url, key, content_hash, status = host.upload(path)
+    assert status == 'uploaded'
+    assert url == f'https://cdn.example.com/{key}' and key == f'media/{content_hash}.jpg'
+    s3.calls.clear()
+    assert host.upload(path)[3] == 'exists'
+    assert [c[0] for c in s3.calls] == ['HEAD']
+
+
+def test_multipart_upload(s3, tmp_path, monkeypatch):
+    monkeypatch.setattr(pxlMediaHost, 'MULTIPART_THRESHOLD', 100 * 1024)
+    monkeypatch.setattr(pxlMediaHost, 'PART_SIZE', 32 * 1024)
+    path = write(tmp_path / 'clip.mp4', 200 * 1024 + 17)
+    [(_, _, job)] = jobs = build_host_jobs([{'media': [{'file_path': path, 'type': 'video'}]}])
+    [result] = make_host(s3).run(jobs)
+    assert result['status'] == 'uploaded'
+    with open(path, 'rb') as f:
+        assert s3.objects['/bucket/' + result['key']] == (f.read(), 'multipart')
+    assert sum(1 for c in s3.calls if 'partNumber' in c[2]) == 7
+    assert not s3.uploads
+
+
+def test_results_map_back_to_media(s3, tmp_path):
+    a = write(tmp_path / 'a.jpg', 1000)
+    b = write(tmp_path / 'b.jpg', 1000)
+    posts = [{'media': [{'file_path': a}, {'file_path': b}]}, {'posted': True, 'media': [{'file_path': a}]}]
+    jobs = build_host_jobs(posts)
+    assert [(p, i) for p, i, _ in jobs] == [(0, 0), (0, 1)]
+    results = make_host(s3).run(jobs)
+    assert apply_host_results(posts, jobs, results) == [posts[0]]
+    for m, res in zip(posts[0]['media'], results):
+        assert m['URL'] == res['url'] and m['hosted']['hash'] == res['hash']
+    assert 'URL' not in posts[1]['media'][0]
+    # a second pass reuses the stored hashes and changes nothing
+    jobs = build_host_jobs(posts)
+    assert all(job['content_hash'] for _, _, job in jobs)
+    assert apply_host_results(posts, jobs, make_host(s3).run(jobs)) == []
+
+
+def test_main_rewrites_the_project_atomically(s3, tmp_path, monkeypatch):
+    monkeypatch.setattr(MediaHost, 'from_env', classmethod(lambda cls, env_path='.env': make_host(s3)))
+    project = tmp_path / 'posts.json'
+    project.write_text(json.dumps([{'media': [{'file_path': write(tmp_path / 'a.jpg', 1000)}]}]))
+    inode = os.stat(project).st_ino
+    assert pxlMediaHost.main([str(project)]) == 0
+    [post] = json.loads(project.read_text())
+    assert post['media'][0]['URL'].startswith('https://cdn.example.com/media/')
+    # written next to the project and renamed over it, never truncated in place
+    assert os.stat(project).st_ino != inode
+    assert sorted(os.listdir(tmp_path)) == ['a.jpg', 'posts.json']
@@ -0,0 +1,50 @@
+import pytest
+
+pytest.importorskip('PyQt6.QtWidgets')
+
+from PyQt6.QtGui import QImage, QColor
+
+import pxlMediaTools
+from pxlMediaTools import probe_media, file_content_hash
+from pxlExport import build_export_jobs, export_media_job
+from pxlMediaHost import build_host_jobs
+from pxlPostPrepper import remember_content_hash
+
+
+def image(path, width, height):
+    img = QImage(width, height, QImage.Format.Format_RGB32)
+    img.fill(QColor(40, 90, 160))
+    assert img.save(str(path), 'JPG')
+    return str(path)
+
+
+def test_probe_reads_headers_only_and_export_fills_in_the_hash(tmp_path, monkeypatch):
+    src = image(tmp_path / 'a.jpg', 1080, 1350)
+
+    def no_hashing(path, *args, **kwargs):
+        raise AssertionError('probing read the whole file')
+    monkeypatch.setattr(pxlMediaTools, 'file_content_hash', no_hashing)
+    meta = probe_media(src)
+    assert (meta['width'], meta['height'], meta['hash']) == (1080, 1350, None)
+    # current metadata isn't probed again, hash or not
+    assert probe_media(src, meta) is None
+    monkeypatch.undo()
+
+    post = {'media': [{'file_path': src, 'metadata': meta}]}
+    (tmp_path / 'out').mkdir()
+    [(_, _, job)] = build_export_jobs([post], str(tmp_path / 'out'))
+    assert job['content_hash'] is None
+    result = export_media_job(job)
+    assert result['status'] == 'written' and result['hash'] == file_content_hash(src)
+    assert remember_content_hash(post['media'][0], job['src'], job['bytes'], job['mtime'], result['hash'])
+    # the next export and upload reuse it instead of reading the file again
+    [(_, _, job)] = build_export_jobs([post], str(tmp_path / 'out'))
+    assert job['content_hash'] == result['hash']
+    [(_, _, host_job)] = build_host_jobs([post])
+    assert host_job['content_hash'] == result['hash']
+
+    # a changed file drops the hash on the next probe
+    image(src, 1080, 1080)
+    meta = probe_media(src, post['media'][0]['metadata'])
+    assert (meta['height'], meta['hash']) == (1080, None)
+    assert not remember_content_hash(post['media'][0], job['src'], job['bytes'], job['mtime'], result['hash'])
@@ -0,0 +1,55 @@
+import random
+
+import pytest
+
+pytest.importorskip('PyQt6.QtGui')  # pxlMediaTools decodes images with Qt
+
+import pxlMediaTools
+from pxlMediaTools import find_near_duplicates, DUPLICATE_DISTANCE
+
+
+def library(seed, count=400):
+    # random hashes, plus copies of some with a few bits flipped, up to and past the limit
+    rng = random.Random(seed)
+    hashes = {f'img{n}.jpg': rng.getrandbits(64) for n in range(count)}
+    for n in range(count // 4):
+        value = hashes[f'img{rng.randrange(count)}.jpg']
+        for bit in rng.sample(range(64), rng.randint(0, DUPLICATE_DISTANCE + 2)):
+            value ^= 1 << bit
+        hashes[f'near{n}.jpg'] = value
+    return hashes
+
+
+def brute_force(hashes, max_distance):
+    paths = list(hashes)
+    matches = {}
+    for x, a in enumerate(paths):
+        for b in paths[x + 1:]:
+            d = (hashes[a] ^ hashes[b]).bit_count()
+            if d <= max_distance:
+                matches.setdefault(a, set()).add((b, d))
+                matches.setdefault(b, set()).add((a, d))
+    return matches
+
+
+@pytest.mark.parametrize('numpy', [True, False])
+@pytest.mark.parametrize('max_distance', [0, 3, DUPLICATE_DISTANCE])
+def test_multi_index_search_matches_a_brute_force_scan(monkeypatch, numpy, max_distance):
+    if numpy:
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(pxlMediaTools, 'np', None)
+    hashes = library(max_distance)
+    found = find_near_duplicates(hashes, max_distance)
+    assert {p: set(m) for p, m in found.items()} == brute_force(hashes, max_distance)
+    assert any(found.values())
+    for matches in found.values():
+        # closest first, each other image once
+        assert [d for _, d in matches] == sorted(d for _, d in matches)
+        assert len({p for p, _ in matches}) == len(matches)
+
+
+def test_identical_hashes_all_match_each_other():
+    found = find_near_duplicates({'a': 5, 'b': 5, 'c': 5, 'd': 5 ^ ((1 << 64) - 1)})
+    assert sorted(found) == ['a', 'b', 'c']
+    assert sorted(found['a']) == [('b', 0), ('c', 0)]
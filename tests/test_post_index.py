@@ -0,0 +1,84 @@
+import random
+
+import pytest
+
+pytest.importorskip('PyQt6.QtWidgets')
+
+from pxlPostPrepper import PostIndex
+
+WORDS = ['alpha', 'alps', 'bravo', 'brave', 'cave', 'caves', 'delta', 'echo']
+
+
+def make_post(rng, n):
+    return {'caption': ' '.join(rng.sample(WORDS, rng.randint(0, 3))),
+            'local_data': {'post_name': f'post{n}', 'keywords': rng.sample(WORDS, rng.randint(0, 2)),
+                           'has_posted': rng.random() < 0.3},
+            'media': [{'type': rng.choice(['image', 'video'])} for _ in range(rng.randint(1, 3))]}
+
+
+def matches(post, term):
+    # the search syntax, one post at a time
+    local = post['local_data']
+    if term.startswith('kw:'):
+        return term[3:] in local['keywords']
+    if term.startswith('is:'):
+        return local['has_posted'] == (term == 'is:posted')
+    if term.startswith('type:'):
+        return any(m['type'] == term[5:] for m in post['media'])
+    if term.startswith('media:'):
+        count, spec = len(post['media']), term[6:]
+        return count > int(spec[1:]) if spec[0] == '>' else count < int(spec[1:]) if spec[0] == '<' else count == int(spec)
+    words = set(post['caption'].split()) | set(local['keywords']) | {local['post_name']}
+    return any(w.startswith(term) for w in words)
+
+
+def brute_force(posts, query):
+    return [row for row, post in enumerate(posts) if all(matches(post, t) for t in query.split())]
+
+
+QUERIES = ['al', 'alps', 'cave', 'caves', 'brav', 'al cave', 'kw:alps', 'kw:al', 'is:unposted', 'is:posted',
+           'type:video', 'media:>1', 'media:1', 'media:<3', 'br is:unposted type:image', 'post1', 'zulu',
+           'kw:delta echo media:>1']
+
+
+def check(index, posts):
+    for query in QUERIES:
+        assert index.search(query) == brute_force(posts, query), query
+    assert index.unposted_count() == sum(1 for p in posts if not p['local_data']['has_posted'])
+
+
+def test_search_matches_a_scan_through_edits_and_removals():
+    rng = random.Random(11)
+    posts = [make_post(rng, n) for n in range(200)]
+    index = PostIndex()
+    index.add_posts(posts, 0)
+    check(index, posts)
+    for _ in range(5):
+        for post in rng.sample(posts, 30):
+            post.update(make_post(rng, rng.randrange(1000)))
+            index.update(post)
+        for post in rng.sample(posts, 10):
+            posts.remove(post)
+        posts[:0] = [make_post(rng, 1000 + n) for n in range(5)]
+        rng.shuffle(posts)
+        index.sync(posts)
+        check(index, posts)
+    # freed slots are reused instead of growing the bitsets
+    assert index._next_slot <= 200 + 5 * 5
+
+
+def test_random_unposted_only_picks_unposted_rows():
+    rng = random.Random(3)
+    posts = [make_post(rng, n) for n in range(50)]
+    index = PostIndex()
+    index.add_posts(posts, 0)
+    unposted = {row for row, p in enumerate(posts) if not p['local_data']['has_posted']}
+    picks = {index.random_unposted() for _ in range(2000)}
+    assert picks == unposted
+    for row in unposted:
+        posts[row]['local_data']['has_posted'] = True
+        index.update(posts[row])
+    assert index.random_unposted() is None and index.unposted_count() == 0
+    posts[7]['local_data']['has_posted'] = False
+    index.update(posts[7])
+    assert index.random_unposted() == 7
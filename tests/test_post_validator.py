@@ -0,0 +1,70 @@
+import pytest
+
+import pxlPostValidator
+from pxlPostValidator import validate_posts, ERROR, WARNING
+
+
+def media(path, width=None, height=None, size=1000, duration=None, kind=None):
+    meta = {'bytes': size}
+    if width is not None:
+        meta.update(width=width, height=height)
+    if duration is not None:
+        meta['duration'] = duration
+    m = {'file_path': path, 'metadata': meta}
+    if kind:
+        m['type'] = kind
+    return m
+
+
+POSTS = [
+    {'media': [media('a.jpg', 1080, 1349)]},  # 4:5 after rounding, inside the tolerance
+    {'media': [media('b.jpg', 1080, 1400)]},  # taller than 4:5
+    {'media': [media('c.jpg', 1080, 1920)]},  # 9:16 is for videos only
+    {'media': [media('d.mp4', 1080, 1920, duration=12)]},
+    {'media': [media('e.jpg'), media('f.mp4', 0, 0)], 'post_kind': 'carousel'},  # unknown sizes
+    {'media': [media('g.png', 1080, 1080)]},
+    {'media': [media('h.webm', 1080, 1080, duration=12)]},
+    {'media': [media('i.mp4', 1080, 1080)]},  # no duration probed yet
+    {'media': [media('j.mp4', 1080, 1080, duration=0.5), media('k.mov', 1080, 1080, duration=90)],
+     'post_kind': 'carousel'},
+    {'media': [media('l.jpg', 1080, 1080, size=9 << 20), media('m', 1080, 1080, kind='video', duration=5)],
+     'post_kind': 'carousel'},
+    {'media': []},
+]
+
+EXPECTED = [
+    [],
+    [(ERROR, 'Media 1: aspect 1080x1400 ( 0.77 ) is outside 4:5 to 1.91:1')],
+    [(ERROR, 'Media 1: aspect 1080x1920 ( 0.56 ) is outside 4:5 to 1.91:1')],
+    [],
+    [],
+    [(WARNING, 'Media 1: .png needs converting to JPEG before posting')],
+    [(ERROR, 'Media 1: unsupported file type .webm')],
+    [],
+    [(ERROR, 'Media 1: video is 0.5s; at least 3s is needed'), (ERROR, 'Media 2: video is 90.0s; feed videos can be 60s')],
+    [(ERROR, 'Media 1: 9.0 MB image; the limit is 8 MB'), (ERROR, 'Media 2: unsupported file type ( none )')],
+    [(ERROR, 'No media')],
+]
+
+
+@pytest.mark.parametrize('numpy', [True, False])
+def test_validate_posts_with_and_without_numpy(monkeypatch, numpy):
+    if numpy:
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(pxlPostValidator, 'np', None)
+    assert validate_posts(POSTS) == EXPECTED
+
+
+def test_numpy_and_python_checks_agree(monkeypatch):
+    pytest.importorskip('numpy')
+    # every combination of the edge values, in one project
+    posts = [{'media': [media(f'x{ext}', w, h, size, duration, kind)]}
+             for ext in ('.jpg', '.png', '.mp4', '.webm', '')
+             for w, h in ((1080, 1349), (1080, 1351), (1080, 565), (1080, 566), (1080, 1920), (0, 0), (None, None))
+             for size in (1000, 9 << 20, 101 << 20)
+             for duration in (None, 0, 2.99, 3, 60, 60.5)
+             for kind in (None, 'video')]
+    with_numpy = validate_posts(posts)
+    monkeypatch.setattr(pxlPostValidator, 'np', None)
+    assert validate_posts(posts) == with_numpy
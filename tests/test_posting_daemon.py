@@ -0,0 +1,122 @@
+import json
+import os
+import time
+from datetime import datetime
+
+import pytest
+
+import pxlGraphApi
+import postToInstagram
+from pxlPublishScheduler import ScheduleIndex
+from standin_graph import GraphStandIn
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    monkeypatch.setattr(pxlGraphApi, 'backoff_delay', lambda *a, **k: 0.0)
+    standin = GraphStandIn()
+    monkeypatch.setattr(postToInstagram, 'GRAPH_API_URL', standin.url)
+    yield standin
+    standin.close()
+
+
+def at(seconds):
+    return datetime.fromtimestamp(time.time() + seconds).isoformat(timespec='milliseconds')
+
+
+def post(n, seconds):
+    return {'caption': f'post {n}', 'scheduled_time': at(seconds), 'local_data': {'post_id': f'id{n}'},
+            'media': [{'URL': f'http://media/{n}.jpg', 'type': 'image'}]}
+
+
+def write(path, posts):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(posts, f, indent=2)
+    # a rewrite within the file system's timestamp granularity still reads as a change
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1000))
+
+
+def read(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def step(daemon):
+    # one pass of PostingDaemon.run
+    for _, due in daemon.index.pop_due(time.time()):
+        daemon._schedule(due)
+    daemon.scheduler.run(until=time.monotonic() + 0.1)
+    daemon.reload()
+
+
+def published(graph):
+    return [graph.containers[c[2]['creation_id']][1]['image_url'] for c in graph.calls if c[1].endswith('media_publish')]
+
+
+def test_schedule_index_skips_replaced_and_discarded_entries():
+    index = ScheduleIndex()
+    a, b, c = {'n': 'a'}, {'n': 'b'}, {'n': 'c'}
+    index.add(a, 10)
+    index.add(b, 20)
+    index.add(c, 30)
+    index.add(a, 25)  # rescheduled later
+    index.discard(b)
+    assert len(index) == 2 and index.next_due() == 25
+    assert index.pop_due(26) == [(25, a)]
+    assert index.pop_due(100) == [(30, c)] and len(index) == 0 and index.next_due() is None
+
+
+def test_reload_picks_up_added_edited_and_removed_posts(graph, tmp_path):
+    path = str(tmp_path / 'posts.json')
+    posts = [post(1, 3600), post(2, 3600), post(3, 3600)]
+    write(path, posts)
+    account = postToInstagram.Account('123', 'token', path, str(tmp_path / 'posted'))
+    account.log = lambda text: None
+    account.client.log = None
+    account.use_ledger()
+    daemon = postToInstagram.PostingDaemon(account)
+    daemon.reload()
+    assert len(daemon.index) == 3
+
+    # 1 is brought forward, 2 is removed, 4 is added for later
+    posts = [dict(posts[0], scheduled_time=at(0.2)), posts[2], post(4, 0.4)]
+    write(path, posts)
+    daemon.reload()
+    assert len(daemon.index) == 3
+    kept = {p['caption']: p for p in daemon.posts}
+    assert kept['post 3'] is not posts[2]  # unchanged posts keep their loaded copy
+    deadline = time.time() + 3
+    while len(published(graph)) < 2 and time.time() < deadline:
+        step(daemon)
+    assert published(graph) == ['http://media/1.jpg', 'http://media/4.jpg']
+
+    # the file now records them as posted; more passes and an untouched rewrite fire nothing
+    assert [p.get('posted', False) for p in read(path)] == [True, False, True]
+    write(path, read(path))
+    for _ in range(3):
+        step(daemon)
+    assert len(published(graph)) == 2 and len(daemon.index) == 1 and not daemon.in_flight
+    account.ledger.close()
+
+
+def test_edit_while_publishing_does_not_fire_twice(graph, tmp_path):
+    path = str(tmp_path / 'posts.json')
+    write(path, [post(1, -1)])
+    account = postToInstagram.Account('123', 'token', path, str(tmp_path / 'posted'))
+    account.log = lambda text: None
+    account.client.log = None
+    account.use_ledger()
+    daemon = postToInstagram.PostingDaemon(account)
+    daemon.reload()
+    assert len(daemon.in_flight) == 1 and len(daemon.scheduler) == 1
+    # the caption is edited before the queued post goes out
+    write(path, [dict(post(1, -1), caption='edited')])
+    daemon.reload()
+    assert len(daemon.scheduler) == 1
+    step(daemon)
+    step(daemon)
+    assert len(published(graph)) == 1
+    [saved] = read(path)
+    assert saved['posted'] and saved['caption'] == 'edited'
+    account.ledger.close()
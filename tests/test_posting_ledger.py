@@ -0,0 +1,129 @@
+import json
+import time
+
+import pytest
+
+import pxlGraphApi
+import postToInstagram
+from pxlPostingLedger import PostingLedger, CONTAINER_TTL, _digest
+from standin_graph import GraphStandIn
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    monkeypatch.setattr(pxlGraphApi, 'backoff_delay', lambda *a, **k: 0.0)
+    standin = GraphStandIn()
+    monkeypatch.setattr(postToInstagram, 'GRAPH_API_URL', standin.url)
+    yield standin
+    standin.close()
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'posts.ledger.jsonl')
+
+
+def image(n):
+    return {'image_url': f'http://media/{n}.jpg'}
+
+
+def test_torn_last_line_is_ignored(path):
+    ledger = PostingLedger(path)
+    ledger.put('123', image(1), 'c1')
+    ledger.publishing('123', ('post', 1), 'c1')
+    ledger.close()
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"event": "published", "account": "123", "po')
+    ledger = PostingLedger(path)
+    assert ledger.get('123', image(1)) == 'c1'
+    assert ledger.attempt_for('123', ('post', 1)) == 'c1'
+    # a record written after the torn line survives the next reopen
+    ledger.put('123', image(2), 'c2')
+    ledger.close()
+    ledger = PostingLedger(path)
+    assert ledger.get('123', image(2)) == 'c2'
+    ledger.close()
+
+
+def test_published_post_is_never_republished(graph, tmp_path):
+    project = tmp_path / 'posts.json'
+    post = {'caption': 'once', 'media': [{'URL': 'http://media/once.jpg', 'type': 'image'}]}
+    project.write_text(json.dumps([post]))
+    account = postToInstagram.Account('123', 'token', str(project), str(tmp_path / 'posted'))
+    account.use_ledger()
+    result = postToInstagram.process_post(post, account)
+    account.ledger.close()
+    assert result.get('id')
+    # the project was never saved as posted; a new run must answer from the ledger
+    calls = len(graph.calls)
+    account = postToInstagram.Account('123', 'token', str(project), str(tmp_path / 'posted'))
+    account.use_ledger()
+    assert postToInstagram.process_post(post, account) == result
+    account.ledger.close()
+    assert len(graph.calls) == calls
+
+
+def test_unresolved_attempt_survives_a_reopen(path):
+    ledger = PostingLedger(path)
+    ledger.publishing('123', ('post', 1), 'c1')
+    ledger.record_result('123', ('post', 1), 'c1', {'error': {'message': 'timed out'}})
+    ledger.close()
+    ledger = PostingLedger(path)
+    # a failed call may still have published; the attempt stays open
+    assert ledger.attempt_for('123', ('post', 1)) == 'c1'
+    assert ledger.attempted('123', 'c1')
+    ledger.record_result('123', ('post', 1), 'c1', {'error': {'message': 'container error'}}, resolved=True)
+    ledger.close()
+    ledger = PostingLedger(path)
+    assert ledger.attempt_for('123', ('post', 1)) is None
+    assert ledger.post_result('123', ('post', 1)) is None
+    ledger.close()
+
+
+def test_published_container_and_children_are_dropped(path):
+    ledger = PostingLedger(path)
+    ledger.put('123', image(1), 'c1')
+    ledger.put('123', image(2), 'c2')
+    ledger.put('123', image(3), 'c3')
+    parent = {'media_type': 'CAROUSEL', 'children': 'c1,c2'}
+    ledger.put('123', parent, 'p1')
+    ledger.publishing('123', ('post', 1), 'p1')
+    ledger.record_result('123', ('post', 1), 'p1', {'id': 'm1'})
+    for reopened in (False, True):
+        if reopened:
+            ledger.close()
+            ledger = PostingLedger(path)
+        assert [ledger.get('123', p) for p in (image(1), image(2), parent)] == [None] * 3
+        assert ledger.get('123', image(3)) == 'c3'
+        assert ledger.post_result('123', ('post', 1)) == {'id': 'm1'}
+        assert 'p1' not in ledger.children
+    ledger.close()
+
+
+def test_compact_keeps_what_is_still_needed(path):
+    ledger = PostingLedger(path)
+    old = time.time() - CONTAINER_TTL - 60
+    ledger._append({'event': 'container', 'account': '123', 'payload': _digest(image('old')), 'id': 'c0', 'time': old})
+    ledger._append({'event': 'container', 'account': '123', 'payload': _digest({'children': 'c0'}),
+                    'id': 'p0', 'children': ['c0'], 'time': old})
+    ledger.put('123', image(1), 'c1')
+    ledger.put('123', {'children': 'c1'}, 'p1')
+    ledger.put('123', image(2), 'c2')
+    ledger.discard('123', image(2))
+    ledger.publishing('123', ('post', 1), 'c9')
+    ledger.publishing('123', ('post', 2), 'c8')
+    ledger.record_result('123', ('post', 2), 'c8', {'id': 'm2'})
+    ledger.compact()
+    ledger.close()
+    with open(path, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert sorted(r['id'] for r in records if r['event'] == 'container') == ['c1', 'p1']
+    assert [r['container'] for r in records if r['event'] == 'publishing'] == ['c9']
+    assert [r['container'] for r in records if r['event'] == 'published'] == ['c8']
+    ledger = PostingLedger(path)
+    assert ledger.get('123', image(1)) == 'c1' and ledger.get('123', image('old')) is None
+    assert ledger.get('123', image(2)) is None
+    assert ledger.children == {'p1': ['c1']}
+    assert ledger.attempt_for('123', ('post', 1)) == 'c9'
+    assert ledger.post_result('123', ('post', 2)) == {'id': 'm2'}
+    ledger.close()
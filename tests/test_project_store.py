@@ -0,0 +1,71 @@
+import json
+
+from pxlProjectStore import ProjectStore, post_doc
+
+
+def make_post(n, **extra):
+    post = {'post_kind': 'single', 'caption': f'post {n}', 'local_data': {'post_name': f'p{n}', 'keywords': ['caves']},
+            'media': [{'file_path': f'/media/{n}.jpg', 'type': 'image'}]}
+    post.update(extra)
+    return post
+
+
+def rowids(store):
+    # doc -> sorted row ids
+    rows = {}
+    for rowid, doc in store.conn.execute("SELECT id, doc FROM posts"):
+        rows.setdefault(doc, []).append(rowid)
+    return {doc: sorted(ids) for doc, ids in rows.items()}
+
+
+def test_save_posts_round_trip(tmp_path):
+    path = str(tmp_path / 'project.db')
+    posts = [make_post(n) for n in range(6)] + [make_post(0)]  # a duplicate doc
+    store = ProjectStore(path)
+    assert store.save_post_dicts(posts) == (7, 0, 0)
+    before = rowids(store)
+    assert before[post_doc(posts[0])] and len(before[post_doc(posts[0])]) == 2
+
+    # reorder, edit 1, delete 2 and 4, and add another copy of the duplicate
+    posts = [posts[3], posts[0], make_post(1, caption='edited'), posts[6], posts[5], make_post(0)]
+    inserted, deleted, moved = store.save_post_dicts(posts)
+    assert (inserted, deleted) == (2, 3)
+    after = rowids(store)
+    # unchanged posts kept their rows; only the edit and the third copy are new
+    for n in (3, 5):
+        assert after[post_doc(make_post(n))] == before[post_doc(make_post(n))]
+    dup = after[post_doc(make_post(0))]
+    assert len(dup) == 3 and set(before[post_doc(make_post(0))]) < set(dup)
+    assert post_doc(make_post(2)) not in after and post_doc(make_post(4)) not in after
+    assert store.load_posts() == posts
+    store.close()
+
+    # a fresh store reads the same project; an unchanged save writes nothing
+    store = ProjectStore(path)
+    assert store.load_posts() == posts
+    assert store.save_post_dicts(posts) == (0, 0, 0)
+    assert rowids(store) == after
+    # indexed columns follow the edits
+    assert store.query_positions(keyword='caves') == list(range(len(posts)))
+    assert store.query_positions(file_path='/media/1.jpg') == [2]
+
+    out = tmp_path / 'posts.json'
+    store.export_json(str(out))
+    store.close()
+    assert out.read_text(encoding='utf-8') == json.dumps(posts, indent=2)
+
+
+def test_import_json_keeps_the_file(tmp_path):
+    src = tmp_path / 'posts.json'
+    posts = [make_post(n) for n in range(3)]
+    src.write_text(json.dumps(posts, indent=2), encoding='utf-8')
+    store = ProjectStore(str(tmp_path / 'project.db'))
+    store.import_json(str(src))
+    store.export_json(str(tmp_path / 'out.json'))
+    store.close()
+    assert (tmp_path / 'out.json').read_text(encoding='utf-8') == src.read_text(encoding='utf-8')
+    # an empty project exports as json.dump would write it too
+    store = ProjectStore(str(tmp_path / 'empty.db'))
+    store.export_json(str(tmp_path / 'empty.json'))
+    store.close()
+    assert (tmp_path / 'empty.json').read_text(encoding='utf-8') == json.dumps([], indent=2)
@@ -0,0 +1,97 @@
+import json
+import time
+
+import pytest
+
+import pxlGraphApi
+import pxlPublishScheduler
+import postToInstagram
+from pxlPublishScheduler import TokenBucket
+from standin_graph import GraphStandIn
+
+LIMIT_BODY = {'data': [{'config': {'quota_total': 25, 'quota_duration': 86400}, 'quota_usage': 0}]}
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    monkeypatch.setattr(pxlGraphApi, 'backoff_delay', lambda *a, **k: 0.0)
+    monkeypatch.setattr(pxlPublishScheduler, 'backoff_delay', lambda *a, **k: 0.0)
+    standin = GraphStandIn()
+    monkeypatch.setattr(postToInstagram, 'GRAPH_API_URL', standin.url)
+    yield standin
+    standin.close()
+
+
+def single(n):
+    return {'caption': f'post {n}', 'media': [{'URL': f'http://media/{n}.jpg', 'type': 'image'}]}
+
+
+def scheduled(graph, tmp_path, posts, retries=None):
+    account = postToInstagram.Account('123', 'token', str(tmp_path / 'posts.json'), str(tmp_path / 'posted'))
+    account.log = lambda text: None
+    account.client.log = None
+    if retries is not None:
+        account.client.retries = retries
+    results = []
+    scheduler = postToInstagram.make_scheduler(account, lambda post, result: results.append((post, result)))
+    for n, post in enumerate(posts):
+        scheduler.add(post, account, (n,))
+    return account, scheduler, results
+
+
+def test_token_bucket_refills_over_the_window():
+    bucket = TokenBucket(capacity=2, window=1.0)
+    assert bucket.take() and bucket.take() and not bucket.take()
+    assert 0 < bucket.wait_time() <= 0.5
+    time.sleep(0.55)
+    assert bucket.take()
+    bucket.set_used(2)
+    assert bucket.available() == 0
+    bucket.give_back()
+    assert bucket.available() == 1
+    bucket.drain()
+    assert bucket.available() == 0 and bucket.wait_time() > 0
+
+
+def test_429_pauses_the_account(graph, tmp_path):
+    graph.script['123/media'] = [(429, {'error': {'message': 'Application request limit reached', 'code': 4}},
+                                  {'Retry-After': '120'})]
+    account, scheduler, results = scheduled(graph, tmp_path, [single(1), single(2)])
+    scheduler.run(until=time.monotonic() + 0.5)
+    # one refused call; the other post waits without calling the API
+    assert len(graph.media_calls()) == 1 and results == []
+    assert len(scheduler) == 2 and account.client.blocked_until > time.monotonic() + 100
+    assert scheduler.bucket(account).available() == 25
+    assert min(ready for ready, *_ in scheduler._heap) > time.monotonic() + 100
+
+
+def test_usage_header_pauses_the_account(graph, tmp_path):
+    usage = {'123': [{'type': 'instagram', 'call_count': 100, 'estimated_time_to_regain_access': 5}]}
+    graph.script['content_publishing_limit'] = [(200, LIMIT_BODY, {'X-Business-Use-Case-Usage': json.dumps(usage)})]
+    account, scheduler, results = scheduled(graph, tmp_path, [single(1)])
+    scheduler.run(until=time.monotonic() + 0.5)
+    assert graph.media_calls() == [] and results == [] and len(scheduler) == 1
+    assert account.client.throttle_delay() > 4 * 60
+
+
+def test_retries_stop_at_the_limit(graph, tmp_path, monkeypatch):
+    monkeypatch.setattr(pxlPublishScheduler, 'POST_RETRY_DELAY', 0.0)
+    graph.script['123/media'] = [(500, {'error': {'message': 'unavailable', 'code': 2}})] * 100
+    account, scheduler, results = scheduled(graph, tmp_path, [single(1)], retries=1)
+    scheduler.retries = 2
+    scheduler.run()
+    # three attempts of two calls each, then the error is handed back
+    assert len(graph.media_calls()) == 6
+    assert [r['error']['code'] for _, r in results] == [2]
+    assert scheduler.bucket(account).available() == 25
+
+
+def test_failed_publish_returns_its_token(graph, tmp_path):
+    graph.script['bad'] = [(400, {'error': {'message': 'Invalid image', 'code': 100}})]
+    graph.script['media_publish'] = [(400, {'error': {'message': 'Media not allowed', 'code': 100}})]
+    account, scheduler, results = scheduled(graph, tmp_path, [single('bad'), single(2), single(3)])
+    scheduler.run()
+    # no container, a refused media_publish, then a post that goes out
+    assert [r and (r.get('id') or r['error']['code']) for _, r in results] == [None, 100, 'pub2']
+    # only the post that went out used the budget
+    assert scheduler.bucket(account).available() == 24